@@ -1,60 +1,177 @@
 # coding=utf-8
 from __future__ import absolute_import
 
+import base64
+import contextlib
 import datetime
+import functools
+import hashlib
+import io
+import json
 import logging
+import operator
 import os
 import shutil
 import sqlite3
+import threading
 
 from octoprint_PrintJobHistory.WrappedLoggingHandler import WrappedLoggingHandler
 from octoprint_PrintJobHistory.api import TransformPrintJob2JSON
 from octoprint_PrintJobHistory.common import StringUtils
+from octoprint_PrintJobHistory.common.ResultCache import ResultCache
+from octoprint_PrintJobHistory.common.ChangeFeed import ChangeFeed
+from octoprint_PrintJobHistory.common.SlicerSettingsParser import getSlicerSettingsMatcher
 from octoprint_PrintJobHistory.models.CostModel import CostModel
 from octoprint_PrintJobHistory.models.FilamentModel import FilamentModel
 from octoprint_PrintJobHistory.models.PrintJobModel import PrintJobModel
 from octoprint_PrintJobHistory.models.PluginMetaDataModel import PluginMetaDataModel
+from octoprint_PrintJobHistory.models.PrintJobSearchModel import PrintJobSearchModel
+from octoprint_PrintJobHistory.models.StatisticRollupModel import StatisticRollupModel
+from octoprint_PrintJobHistory.models.SlicerSettingModel import SlicerSettingModel
 # from octoprint_PrintJobHistory.models.PrintJobSpoolMapModel import PrintJobSpoolMapModel
 from octoprint_PrintJobHistory.models.TemperatureModel import TemperatureModel
 from peewee import *
+from playhouse.pool import PooledPostgresqlDatabase, PooledSqliteDatabase
+
+# PostgreSQL driver is optional, only needed for an external database
+try:
+	import psycopg2
+except ImportError:
+	psycopg2 = None
 
 
 FORCE_CREATE_TABLES = False
 SQL_LOGGING = False
 
-CURRENT_DATABASE_SCHEME_VERSION = 8
+CURRENT_DATABASE_SCHEME_VERSION = 12
+
+# Connection settings of the SQLite database, could be overwritten by the plugin settings (see SettingsKeys)
+# - WAL: readers (UI) are not blocked by a writer (capture, CSV import) and vice versa
+# - the WAL-file is checkpointed automatically after walAutoCheckpoint pages and explicit before a backup/download
+DEFAULT_CONNECTION_SETTINGS = {
+	"journalMode": "wal",		# wal, delete, truncate, persist (wal needs a local filesystem)
+	"synchronous": "normal",	# off, normal, full (normal is safe with wal)
+	"cacheSizeKB": 8192,
+	"mmapSizeMB": 32,			# 0 = disabled
+	"busyTimeout": 10,			# seconds to wait for a locked database (and for a free connection of the pool)
+	"walAutoCheckpoint": 1000,	# pages
+	"maxConnections": 8,		# connection pool: max. connections at the same time (one per thread)
+	"staleTimeout": 300			# connection pool: seconds until a connection is recycled
+}
+ALLOWED_JOURNAL_MODES = ["wal", "delete", "truncate", "persist"]
+ALLOWED_SYNCHRONOUS = ["off", "normal", "full"]
+
+# External database (plugin setting "datbaseSettings"), only PostgreSQL is supported, since V11
+# The pool settings (maxConnections, staleTimeout, busyTimeout) of DEFAULT_CONNECTION_SETTINGS are used as well
+DATABASE_TYPE_POSTGRES = "postgres"
+DEFAULT_EXTERNAL_DATABASE_SETTINGS = {
+	"useExternal": "false",
+	"type": DATABASE_TYPE_POSTGRES,
+	"host": "localhost",
+	"port": 5432,
+	"databaseName": "PrintJobDatabase",
+	"user": "",
+	"password": ""
+}
+
+# Time-series statistic, bucket of the printjob start : (SQLite strftime format, PostgreSQL to_char format)
+# the week bucket is the monday of the week
+STATISTIC_TIME_SERIES_BUCKETS = {
+	"hour": ("%Y-%m-%d %H:00", "YYYY-MM-DD HH24:00"),
+	"day": ("%Y-%m-%d", "YYYY-MM-DD"),
+	"week": ("%Y-%m-%d", "YYYY-MM-DD"),
+	"month": ("%Y-%m", "YYYY-MM")
+}
+# max. number of cached endpoint results (different queries), the cache is cleared after each change of the printjobs
+RESULT_CACHE_SIZE = 100
+# number of printjob changes a client could be behind, before a complete reload is needed
+CHANGE_FEED_SIZE = 200
+# number of printjobs per transaction, during the rebuild of the slicer settings table
+SLICER_SETTINGS_REBUILD_BATCH_SIZE = 200
 
 # List all Models
-MODELS = [PluginMetaDataModel, PrintJobModel, FilamentModel, TemperatureModel, CostModel]
+MODELS = [PluginMetaDataModel, PrintJobModel, FilamentModel, TemperatureModel, CostModel, StatisticRollupModel, SlicerSettingModel]
+
+# All indexes needed by the table-query (filter, sorting) and the relation loading, since V9
+# indexName : (tableName, columns, create statement)
+# columns are used to detect already present indexes with an other name (e.g. peewee foreign-key indexes)
+DATABASE_INDEXES = {
+	"pjh_filamentmodel_printJob_id": ("pjh_filamentmodel", ["printJob_id"],
+		'CREATE INDEX IF NOT EXISTS "pjh_filamentmodel_printJob_id" ON "pjh_filamentmodel" ("printJob_id")'),
+	"pjh_temperaturemodel_printJob_id": ("pjh_temperaturemodel", ["printJob_id"],
+		'CREATE INDEX IF NOT EXISTS "pjh_temperaturemodel_printJob_id" ON "pjh_temperaturemodel" ("printJob_id")'),
+	"pjh_costmodel_printJob_id": ("pjh_costmodel", ["printJob_id"],
+		'CREATE INDEX IF NOT EXISTS "pjh_costmodel_printJob_id" ON "pjh_costmodel" ("printJob_id")'),
+	"pjh_printjobmodel_printStartDateTime": ("pjh_printjobmodel", ["printStartDateTime"],
+		'CREATE INDEX IF NOT EXISTS "pjh_printjobmodel_printStartDateTime" ON "pjh_printjobmodel" ("printStartDateTime")'),
+	"pjh_printjobmodel_printStatusResult_printStartDateTime": ("pjh_printjobmodel", ["printStatusResult", "printStartDateTime"],
+		'CREATE INDEX IF NOT EXISTS "pjh_printjobmodel_printStatusResult_printStartDateTime" ON "pjh_printjobmodel" ("printStatusResult", "printStartDateTime")'),
+	"pjh_printjobmodel_lower_fileName": ("pjh_printjobmodel", None,
+		'CREATE INDEX IF NOT EXISTS "pjh_printjobmodel_lower_fileName" ON "pjh_printjobmodel" (lower("fileName"))'),
+	# since V11
+	"pjh_statisticrollupmodel_day": ("pjh_statisticrollupmodel", ["day"],
+		'CREATE INDEX IF NOT EXISTS "pjh_statisticrollupmodel_day" ON "pjh_statisticrollupmodel" ("day")'),
+	# since V12, no index of the value (could be very long, e.g. start gcode)
+	"pjh_slicersettingmodel_printJob_id": ("pjh_slicersettingmodel", ["printJob_id"],
+		'CREATE INDEX IF NOT EXISTS "pjh_slicersettingmodel_printJob_id" ON "pjh_slicersettingmodel" ("printJob_id")'),
+	"pjh_slicersettingmodel_key": ("pjh_slicersettingmodel", ["key"],
+		'CREATE INDEX IF NOT EXISTS "pjh_slicersettingmodel_key" ON "pjh_slicersettingmodel" ("key")'),
+}
+
+
+# Decorator for all public database methods, see DatabaseManager._databaseConnection
+def withDatabaseConnection(databaseMethod):
+	@functools.wraps(databaseMethod)
+	def wrapper(self, *args, **kwargs):
+		with self._databaseConnection():
+			return databaseMethod(self, *args, **kwargs)
+	return wrapper
 
 
 class DatabaseManager(object):
 
-	def __init__(self, parentLogger, sqlLoggingEnabled):
+	def __init__(self, parentLogger, sqlLoggingEnabled, connectionSettings = None, externalDatabaseSettings = None):
 
 		self.sqlLoggingEnabled = sqlLoggingEnabled
+		self._connectionSettings = dict(DEFAULT_CONNECTION_SETTINGS)
+		if (connectionSettings != None):
+			self._connectionSettings.update(connectionSettings)
+		self._externalDatabaseSettings = dict(DEFAULT_EXTERNAL_DATABASE_SETTINGS)
+		if (externalDatabaseSettings != None):
+			self._externalDatabaseSettings.update(externalDatabaseSettings)
 		self._logger = logging.getLogger(parentLogger.name + "." + self.__class__.__name__)
 		self._sqlLogger = logging.getLogger(parentLogger.name + "." + self.__class__.__name__ + ".SQL")
 
 		self._database = None
 		self._databaseFileLocation = None
+		self._fullTextSearchAvailable = False
+		self._threadLocal = threading.local()
+		self._resultCache = ResultCache(RESULT_CACHE_SIZE)
+		self._changeFeed = ChangeFeed(CHANGE_FEED_SIZE)
+		# last known change counter of the external database, see checkExternalChanges
+		self._externalChangeCounter = None
+		self._externalChangeCounterLock = threading.Lock()
+		self._printJobChangeListener = None
 		self._sendDataToClient = None
+		# expressions of the plugin settings and the hash of the expressions the slicer settings table is filled with
+		self._slicerSettingsExpressions = ""
+		self._slicerSettingTableExpressionsHash = None
+		self._slicerSettingsRebuildLock = threading.Lock()
 
 	################################################################################################## private functions
 
 	def _createOrUpgradeSchemeIfNecessary(self):
 		schemeVersionFromDatabaseModel = None
 		try:
-			schemeVersionFromDatabaseModel = PluginMetaDataModel.get(PluginMetaDataModel.key == PluginMetaDataModel.KEY_DATABASE_SCHEME_VERSION)
-			pass
-		except Exception as e:
-			errorMessage = str(e)
-			if errorMessage.startswith("no such table"):
-
+			# dialect-neutral check, the "no such table" error message is SQLite specific
+			if (PluginMetaDataModel.table_exists() == False):
 				self._logger.info("Create database-table, because didn't exists")
 				self._createDatabaseTables()
 			else:
-				self._logger.error(str(e))
+				schemeVersionFromDatabaseModel = PluginMetaDataModel.get(PluginMetaDataModel.key == PluginMetaDataModel.KEY_DATABASE_SCHEME_VERSION)
+			pass
+		except Exception as e:
+			self._logger.error(str(e))
 
 		if not schemeVersionFromDatabaseModel == None:
 			currentDatabaseSchemeVersion = int(schemeVersionFromDatabaseModel.value)
@@ -82,7 +199,9 @@ class DatabaseManager(object):
 							  self._upgradeFrom6To7,
 							  self._upgradeFrom7To8,
 							  self._upgradeFrom8To9,
-							  self._upgradeFrom9To10
+							  self._upgradeFrom9To10,
+							  self._upgradeFrom10To11,
+							  self._upgradeFrom11To12
 							  ]
 
 		for migrationMethodIndex in range(currentDatabaseSchemeVersion -1, targetDatabaseSchemeVersion -1):
@@ -91,13 +210,79 @@ class DatabaseManager(object):
 			pass
 		pass
 
+	# Migrations until V9 are SQLite only (directly on the database-file), an external database is always created
+	# with the current scheme. Newer migrations must be dialect-neutral: only peewee/execute_sql with the bound database
+	# and _updateDatabaseSchemeVersion
+	def _upgradeFrom11To12(self):
+		self._logger.info(" Starting 11 -> 12")
+		# What is changed:
+		# - Slicer settings table (SlicerSettingModel), filled with the key-values of all existing printjobs (in batches)
+
+		self._database.create_tables([SlicerSettingModel])
+		self._createMissingDatabaseIndexes()
+		self.rebuildSlicerSettings()
+
+		self._updateDatabaseSchemeVersion(12)
+
+		self._logger.info(" Successfully 11 -> 12")
+		pass
+
+	def _upgradeFrom10To11(self):
+		self._logger.info(" Starting 10 -> 11")
+		# What is changed:
+		# - Statistic rollup table (StatisticRollupModel), filled with all existing printjobs
+
+		self._database.create_tables([StatisticRollupModel])
+		self._createMissingDatabaseIndexes()
+		self.rebuildStatisticRollup()
+
+		self._updateDatabaseSchemeVersion(11)
+
+		self._logger.info(" Successfully 10 -> 11")
+		pass
+
+	def _updateDatabaseSchemeVersion(self, schemeVersion):
+		PluginMetaDataModel.update(value=schemeVersion).where(
+			PluginMetaDataModel.key == PluginMetaDataModel.KEY_DATABASE_SCHEME_VERSION).execute()
+
 	def _upgradeFrom9To10(self):
 		self._logger.info(" Starting 9 -> 10")
+		# What is changed:
+		# - Full-text search table for the table-search (PrintJobSearchModel), filled with all existing printjobs
+
+		if (self._fullTextSearchAvailable == True):
+			self._database.create_tables([PrintJobSearchModel])
+			self._rebuildPrintJobSearchIndex()
+		else:
+			self._logger.warning(" SQLite FTS5 not available, table-search will use the slow filename search")
+
+		self._updateDatabaseSchemeVersion(10)
+
 		self._logger.info(" Successfully 9 -> 10")
 		pass
 
 	def _upgradeFrom8To9(self):
 		self._logger.info(" Starting 8 -> 9")
+		# What is changed:
+		# - Indexes for relation loading (printJob_id) and for the table-query (filter/sorting), see DATABASE_INDEXES
+
+		self._createMissingDatabaseIndexes()
+
+		connection = sqlite3.connect(self._databaseFileLocation)
+		cursor = connection.cursor()
+
+		sql = """
+		PRAGMA foreign_keys=off;
+		BEGIN TRANSACTION;
+
+			UPDATE 'pjh_pluginmetadatamodel' SET value=9 WHERE key='databaseSchemeVersion';
+		COMMIT;
+		PRAGMA foreign_keys=on;
+		"""
+		cursor.executescript(sql)
+
+		connection.close()
+
 		self._logger.info(" Successfully 8 -> 9")
 		pass
 
@@ -351,14 +536,282 @@ class DatabaseManager(object):
 
 
 	def _createDatabaseTables(self):
-		self._database.connect(reuse_if_open=True)
 		self._database.drop_tables(MODELS)
 		self._database.create_tables(MODELS)
+		self._createDatabaseIndexes(self._findMissingDatabaseIndexes())
+		if (self._fullTextSearchAvailable == True):
+			self._database.drop_tables([PrintJobSearchModel])
+			self._database.create_tables([PrintJobSearchModel])
 
 		PluginMetaDataModel.create(key=PluginMetaDataModel.KEY_DATABASE_SCHEME_VERSION, value=CURRENT_DATABASE_SCHEME_VERSION)
-		self._database.close()
+		# no printjobs, so the empty slicer settings table matches the current expressions
+		self._storeSlicerSettingTableExpressionsHash(self._buildSlicerSettingsExpressionsHash(self._slicerSettingsExpressions))
 		self._logger.info("Database tables created")
 
+	def _createDatabaseIndexes(self, indexNames):
+		for indexName in indexNames:
+			self._database.execute_sql(DATABASE_INDEXES[indexName][2])
+
+	# return: list of all index names (from DATABASE_INDEXES) which are not present in the database
+	def _findMissingDatabaseIndexes(self):
+		presentTableNames = self._database.get_tables()
+		presentIndexNames = set()
+		presentIndexColumns = set()
+		for tableName in presentTableNames:
+			for indexMetadata in self._database.get_indexes(tableName):
+				presentIndexNames.add(indexMetadata.name)
+				presentIndexColumns.add((tableName, tuple(indexMetadata.columns)))
+
+		missingIndexNames = []
+		for indexName, (tableName, columns, createStatement) in DATABASE_INDEXES.items():
+			# e.g. during the migration, the table is created by a later migration step
+			if (tableName not in presentTableNames):
+				continue
+			if (indexName in presentIndexNames):
+				continue
+			if (columns != None and (tableName, tuple(columns)) in presentIndexColumns):
+				continue
+			missingIndexNames.append(indexName)
+		return missingIndexNames
+
+	def _createMissingDatabaseIndexes(self):
+		missingIndexNames = self._findMissingDatabaseIndexes()
+		if (len(missingIndexNames) != 0):
+			self._logger.info("Creating database indexes: " + str(missingIndexNames))
+			self._createDatabaseIndexes(missingIndexNames)
+		return missingIndexNames
+
+	# Check if all needed indexes are present, missing indexes are created (e.g. after a failed migration)
+	def _verifyDatabaseIndexes(self):
+		try:
+			missingIndexNames = self._createMissingDatabaseIndexes()
+			if (len(missingIndexNames) == 0):
+				self._logger.info("All database indexes present")
+			else:
+				self._logger.warning("Database indexes were missing and are created now: " + str(missingIndexNames))
+		except Exception as e:
+			self._logger.error("Could not verify database indexes!")
+			self._logger.exception(e)
+
+	# Check if the full-text search table is present, if not (e.g. after a failed migration) create and fill it
+	def _verifyPrintJobSearchIndex(self):
+		if (self.isExternalDatabase() == True):
+			self._logger.info("Full-text search is only available with SQLite, table-search will use the filename search")
+			return
+		if (self._fullTextSearchAvailable == False):
+			self._logger.warning("SQLite FTS5 not available, table-search will use the slow filename search")
+			return
+		try:
+			if (PrintJobSearchModel.table_exists() == False):
+				self._logger.warning("Full-text search table was missing and is created now")
+				self._database.create_tables([PrintJobSearchModel])
+				self._rebuildPrintJobSearchIndex()
+		except Exception as e:
+			self._logger.error("Could not verify full-text search table!")
+			self._logger.exception(e)
+
+	# Fill the full-text search table with all printjobs (one statement, no model loading)
+	def _rebuildPrintJobSearchIndex(self):
+		with self._database.atomic():
+			PrintJobSearchModel.delete().execute()
+			self._database.execute_sql(
+				'INSERT INTO "pjh_printjobsearchmodel" ("rowid", "fileName", "filePathName", "noteText", "userName", "spoolNames", "materials") '
+				'SELECT p."databaseId", p."fileName", p."filePathName", p."noteText", p."userName", '
+				'(SELECT group_concat(f."spoolName", \' \') FROM "pjh_filamentmodel" AS f WHERE f."printJob_id" = p."databaseId"), '
+				'(SELECT group_concat(f."material", \' \') FROM "pjh_filamentmodel" AS f WHERE f."printJob_id" = p."databaseId") '
+				'FROM "pjh_printjobmodel" AS p')
+		self._logger.info("Full-text search table rebuild for " + str(PrintJobSearchModel.select().count()) + " printjobs")
+
+	# Insert or replace the search-row of the printjob, must be called inside the insert/update transaction
+	def _updatePrintJobSearchIndex(self, printJobModel):
+		if (self._fullTextSearchAvailable == False):
+			return
+		searchRow = self._buildPrintJobSearchRow(printJobModel, printJobModel.getFilamentModels())
+		PrintJobSearchModel.insert(searchRow).on_conflict_replace().execute()
+
+	def _buildPrintJobSearchRow(self, printJobModel, filamentModels):
+		spoolNames = []
+		materials = []
+		for filamentModel in filamentModels:
+			if (StringUtils.isNotEmpty(filamentModel.spoolName)):
+				spoolNames.append(filamentModel.spoolName)
+			if (StringUtils.isNotEmpty(filamentModel.material)):
+				materials.append(filamentModel.material)
+
+		return {
+			"rowid": printJobModel.get_id(),
+			"fileName": printJobModel.fileName,
+			"filePathName": printJobModel.filePathName,
+			"noteText": printJobModel.noteText,
+			"userName": printJobModel.userName,
+			"spoolNames": " ".join(spoolNames),
+			"materials": " ".join(materials)
+		}
+
+	# Each word of the search-query is a prefix, all words must match (in any column)
+	# e.g. 'benchy pla' -> '"benchy"* "pla"*'
+	# return: FTS5 match expression or None if there is no word to search for
+	def _buildSearchMatchExpression(self, searchQueryValue):
+		searchTerms = []
+		for searchWord in searchQueryValue.split():
+			# quotes are the only special character inside a FTS5 string
+			searchWord = searchWord.replace('"', '""')
+			# words without any letter/digit (e.g. '-') would be an empty phrase -> syntax error
+			if (any(c.isalnum() for c in searchWord) == False):
+				continue
+			searchTerms.append('"' + searchWord + '"*')
+		if (len(searchTerms) == 0):
+			return None
+		return " ".join(searchTerms)
+
+	# Check if the statistic rollup table is present, if not (e.g. after a failed migration) create and fill it
+	def _verifyStatisticRollup(self):
+		try:
+			if (StatisticRollupModel.table_exists() == False):
+				self._logger.warning("Statistic rollup table was missing and is created now")
+				self._database.create_tables([StatisticRollupModel])
+				self._createMissingDatabaseIndexes()
+				self.rebuildStatisticRollup()
+		except Exception as e:
+			self._logger.error("Could not verify statistic rollup table!")
+			self._logger.exception(e)
+
+	# Aggregate the printjobs and filaments into the rollup table
+	# printJobCondition: only the printjobs matching the condition (e.g. some days) or None for all printjobs
+	def _insertStatisticRollup(self, printJobCondition):
+		dayExpression = fn.DATE(PrintJobModel.printStartDateTime)
+		now = datetime.datetime.now()
+
+		printJobQuery = PrintJobModel.select(Value(StatisticRollupModel.ROLLUP_TYPE_PRINTJOB),
+											 dayExpression,
+											 PrintJobModel.printStatusResult,
+											 fn.COUNT(PrintJobModel.databaseId),
+											 fn.SUM(PrintJobModel.duration),
+											 fn.SUM(fn.COALESCE(PrintJobModel.fileSize, 0)),
+											 fn.MIN(PrintJobModel.printStartDateTime),
+											 Value(now))
+		if (printJobCondition is not None):
+			printJobQuery = printJobQuery.where(printJobCondition)
+		printJobQuery = printJobQuery.group_by(dayExpression, PrintJobModel.printStatusResult)
+		StatisticRollupModel.insert_from(printJobQuery, [StatisticRollupModel.rollupType,
+														 StatisticRollupModel.day,
+														 StatisticRollupModel.printStatusResult,
+														 StatisticRollupModel.itemCount,
+														 StatisticRollupModel.duration,
+														 StatisticRollupModel.fileSize,
+														 StatisticRollupModel.firstStartDateTime,
+														 StatisticRollupModel.created]).execute()
+
+		# - filament, exclude totals, otherwise everything is counted twice
+		filamentQuery = FilamentModel.select(Value(StatisticRollupModel.ROLLUP_TYPE_FILAMENT),
+											 dayExpression,
+											 PrintJobModel.printStatusResult,
+											 FilamentModel.material,
+											 FilamentModel.spoolName,
+											 fn.COUNT(FilamentModel.databaseId),
+											 fn.SUM(FilamentModel.usedLength),
+											 fn.SUM(FilamentModel.usedWeight),
+											 fn.MIN(PrintJobModel.printStartDateTime),
+											 fn.MIN(FilamentModel.databaseId),
+											 Value(now))
+		filamentQuery = filamentQuery.join(PrintJobModel).where(FilamentModel.toolId.is_null() | (FilamentModel.toolId != "total"))
+		if (printJobCondition is not None):
+			filamentQuery = filamentQuery.where(printJobCondition)
+		filamentQuery = filamentQuery.group_by(dayExpression, PrintJobModel.printStatusResult, FilamentModel.material, FilamentModel.spoolName)
+		StatisticRollupModel.insert_from(filamentQuery, [StatisticRollupModel.rollupType,
+														 StatisticRollupModel.day,
+														 StatisticRollupModel.printStatusResult,
+														 StatisticRollupModel.material,
+														 StatisticRollupModel.spoolName,
+														 StatisticRollupModel.itemCount,
+														 StatisticRollupModel.usedLength,
+														 StatisticRollupModel.usedWeight,
+														 StatisticRollupModel.firstStartDateTime,
+														 StatisticRollupModel.firstFilamentId,
+														 StatisticRollupModel.created]).execute()
+
+	# Recalculate the rollup rows of the days, must be called inside the insert/update/delete transaction
+	# days: datetime.date or None (printjobs without start)
+	def _refreshStatisticRollup(self, days):
+		printJobConditions = []
+		rollupConditions = []
+		for day in set(days):
+			if (day == None):
+				printJobConditions.append(PrintJobModel.printStartDateTime.is_null())
+				rollupConditions.append(StatisticRollupModel.day.is_null())
+			else:
+				# range instead of DATE(printStartDateTime), so the index could be used
+				dayStartDateTime = datetime.datetime.combine(day, datetime.time())
+				printJobConditions.append((PrintJobModel.printStartDateTime >= dayStartDateTime) &
+										  (PrintJobModel.printStartDateTime < dayStartDateTime + datetime.timedelta(days=1)))
+				rollupConditions.append(StatisticRollupModel.day == day)
+		if (len(printJobConditions) == 0):
+			return
+		StatisticRollupModel.delete().where(functools.reduce(operator.or_, rollupConditions)).execute()
+		self._insertStatisticRollup(functools.reduce(operator.or_, printJobConditions))
+
+	# Check if the slicer settings table is present and filled with the current expressions, if not (e.g. after a failed
+	# migration or the expressions were changed while the plugin was stopped) create and fill it
+	def _verifySlicerSettingTable(self):
+		try:
+			if (SlicerSettingModel.table_exists() == False):
+				self._logger.warning("Slicer settings table was missing and is created now")
+				self._database.create_tables([SlicerSettingModel])
+				self._createMissingDatabaseIndexes()
+			self._slicerSettingTableExpressionsHash = self._loadSlicerSettingTableExpressionsHash()
+			if (self.isSlicerSettingTableUpToDate() == False):
+				self._logger.warning("Slicer settings table is not filled with the current slicer expressions and is rebuild now")
+				self.rebuildSlicerSettings()
+		except Exception as e:
+			self._logger.error("Could not verify slicer settings table!")
+			self._logger.exception(e)
+
+	def _buildSlicerSettingsExpressionsHash(self, slicerSettingsExpressions):
+		return hashlib.sha1(slicerSettingsExpressions.encode("utf-8")).hexdigest()
+
+	def _loadSlicerSettingTableExpressionsHash(self):
+		metaDataModel = PluginMetaDataModel.get_or_none(PluginMetaDataModel.key == PluginMetaDataModel.KEY_SLICER_SETTINGS_EXPRESSIONS_HASH)
+		return metaDataModel.value if (metaDataModel != None) else None
+
+	def _storeSlicerSettingTableExpressionsHash(self, expressionsHash):
+		updatedCount = PluginMetaDataModel.update(value=expressionsHash).where(
+			PluginMetaDataModel.key == PluginMetaDataModel.KEY_SLICER_SETTINGS_EXPRESSIONS_HASH).execute()
+		if (updatedCount == 0):
+			PluginMetaDataModel.create(key=PluginMetaDataModel.KEY_SLICER_SETTINGS_EXPRESSIONS_HASH, value=expressionsHash)
+		self._slicerSettingTableExpressionsHash = expressionsHash
+
+	# All key-values of the settings text (same as SlicerSettingsService.parseKeyValues: the last value of a key wins)
+	# return: list of row-dicts
+	def _buildSlicerSettingRows(self, printJobId, slicerSettingsAsText):
+		if (StringUtils.isEmpty(slicerSettingsAsText) or StringUtils.isEmpty(self._slicerSettingsExpressions)):
+			return []
+		slicerSettingsMatcher = getSlicerSettingsMatcher(self._slicerSettingsExpressions, self._logger)
+		keyValues = dict(slicerSettingsMatcher.matchAllKeyValues(slicerSettingsAsText))
+		now = datetime.datetime.now()
+		return [{"printJob": printJobId, "key": key, "value": value, "created": now} for key, value in keyValues.items()]
+
+	# Replace the slicer settings rows of the printjob, must be called inside the insert/update transaction
+	def _updateSlicerSettingRows(self, printJobModel):
+		SlicerSettingModel.delete().where(SlicerSettingModel.printJob == printJobModel.get_id()).execute()
+		self._insertSlicerSettingRows(self._buildSlicerSettingRows(printJobModel.get_id(), printJobModel.slicerSettingsAsText))
+
+	# chunked, SQLite < 3.32 allows max. 999 parameters per statement
+	def _insertSlicerSettingRows(self, slicerSettingRows):
+		for slicerSettingRowsChunk in chunked(slicerSettingRows, 200):
+			SlicerSettingModel.insert_many(slicerSettingRowsChunk).execute()
+
+	# return: day of the printjob start (the rollup day) or None
+	def _toStatisticRollupDay(self, printStartDateTime):
+		if (printStartDateTime == None):
+			return None
+		if (isinstance(printStartDateTime, datetime.datetime) == False):
+			printStartDateTime = PrintJobModel.printStartDateTime.python_value(printStartDateTime)
+		return printStartDateTime.date()
+
+	# return: rollup day of the printjob in the database (e.g. before update/delete)
+	def _loadStatisticRollupDay(self, databaseId):
+		printStartDateTime = PrintJobModel.select(PrintJobModel.printStartDateTime).where(PrintJobModel.databaseId == databaseId).scalar()
+		return self._toStatisticRollupDay(printStartDateTime)
 
 
 
@@ -385,27 +838,25 @@ class DatabaseManager(object):
 			)
 		else:
 			databaseToTest = SqliteDatabase(self._databaseFileLocation)
-		DatabaseManager.db = databaseToTest
-		databaseToTest.bind(MODELS)
 		# self._logger.info("Check if database-scheme upgrade needed.")
 		# self._createOrUpgradeSchemeIfNecessary()
 
 		schemeVersion = None
 		jobCount = None
+		schemeVersionFromDatabaseModel = None
 		try:
 			databaseToTest.connect(reuse_if_open=True)
 
-			schemeVersionFromDatabaseModel = None
+			# the MODELS are not (re)bound, only the queries are executed with the database to test
+			# otherwise all other threads would use the database to test
 			try:
 				# scheme version
-				schemeVersionFromDatabaseModel = PluginMetaDataModel.get(
-					PluginMetaDataModel.key == PluginMetaDataModel.KEY_DATABASE_SCHEME_VERSION)
+				schemeVersionFromDatabaseModel = PluginMetaDataModel.select().where(
+					PluginMetaDataModel.key == PluginMetaDataModel.KEY_DATABASE_SCHEME_VERSION).bind(databaseToTest).get()
 				schemeVersionFromDatabaseModel = int(schemeVersionFromDatabaseModel.value)
 
 				# job count
-				jobCount = self.countPrintJobsByQuery({
-					"filterName" : "all"
-				})
+				jobCount = PrintJobModel.select().bind(databaseToTest).count()
 				pass
 			except Exception as e:
 				errorMessage = str(e)
@@ -432,9 +883,11 @@ class DatabaseManager(object):
 
 
 	# datapasePath '/Users/o0632/Library/Application Support/OctoPrint/data/PrintJobHistory'
-	def initDatabase(self, databasePath, sendErrorMessageToClient):
+	# printJobChangeListener(change) is called after each committed change, see ChangeFeed.addChange
+	def initDatabase(self, databasePath, sendErrorMessageToClient, printJobChangeListener = None):
 		self._logger.info("Init DatabaseManager")
 		self.sendErrorMessageToClient = sendErrorMessageToClient
+		self._printJobChangeListener = printJobChangeListener
 		self._databasePath = databasePath
 		self._databaseFileLocation = os.path.join(databasePath, "printJobHistory.db")
 
@@ -470,7 +923,12 @@ class DatabaseManager(object):
 			self._sqlLogger.setLevel(logging.ERROR)
 
 
+	# return: path of the backup-file or None for an external database (use the backup tools of the database-server)
+	@withDatabaseConnection
 	def backupDatabaseFile(self, backupFolder):
+		if (self.isExternalDatabase() == True):
+			self._logger.info("No backup-file created for the external database")
+			return None
 		now = datetime.datetime.now()
 		currentDate = now.strftime("%Y%m%d-%H%M")
 		currentSchemeVersion = "unknown"
@@ -483,6 +941,8 @@ class DatabaseManager(object):
 		backupDatabaseFileName = "printJobHistory-backup-"+currentDate+"-V"+currentSchemeVersion +".db"
 		backupDatabaseFilePath = os.path.join(backupFolder, backupDatabaseFileName)
 		if not os.path.exists(backupDatabaseFilePath):
+			# all changes from the WAL-file into the database-file, otherwise they are missing in the copy
+			self.checkpointDatabase()
 			shutil.copy(self._databaseFileLocation, backupDatabaseFilePath)
 			self._logger.info("Backup of printjobhistory database created '"+backupDatabaseFilePath+"'")
 		else:
@@ -490,30 +950,293 @@ class DatabaseManager(object):
 		return backupDatabaseFilePath
 
 
+	# Pragmas are executed by peewee for each new connection
+	def _buildConnectionPragmas(self):
+		journalMode = str(self._connectionSettings["journalMode"]).lower()
+		if (journalMode not in ALLOWED_JOURNAL_MODES):
+			self._logger.warning("Not supported database journal mode '" + journalMode + "', using '" + DEFAULT_CONNECTION_SETTINGS["journalMode"] + "'")
+			journalMode = DEFAULT_CONNECTION_SETTINGS["journalMode"]
+		synchronous = str(self._connectionSettings["synchronous"]).lower()
+		if (synchronous not in ALLOWED_SYNCHRONOUS):
+			self._logger.warning("Not supported database synchronous mode '" + synchronous + "', using '" + DEFAULT_CONNECTION_SETTINGS["synchronous"] + "'")
+			synchronous = DEFAULT_CONNECTION_SETTINGS["synchronous"]
+
+		return [
+			("journal_mode", journalMode),
+			("synchronous", synchronous),
+			("cache_size", -self._getConnectionSettingAsInt("cacheSizeKB")),	# negative == KiB
+			("mmap_size", self._getConnectionSettingAsInt("mmapSizeMB") * 1024 * 1024),
+			("temp_store", "memory"),
+			("foreign_keys", 1),
+			("busy_timeout", self._getConnectionSettingAsInt("busyTimeout") * 1000),
+			("wal_autocheckpoint", self._getConnectionSettingAsInt("walAutoCheckpoint"))
+		]
+
+	def _getConnectionSettingAsInt(self, key):
+		value = StringUtils.transformToIntOrNone(self._connectionSettings[key])
+		if (value == None or value < 0):
+			self._logger.warning("Not valid database setting '" + key + "': '" + str(self._connectionSettings[key]) + "', using '" + str(DEFAULT_CONNECTION_SETTINGS[key]) + "'")
+			value = DEFAULT_CONNECTION_SETTINGS[key]
+		return value
+
+	# The outermost public method of a thread takes a connection from the pool and gives it back at the end,
+	# nested calls (e.g. public method calls public method) use the same connection
+	@contextlib.contextmanager
+	def _databaseConnection(self):
+		if (self._database == None):
+			yield
+			return
+		connectionDepth = getattr(self._threadLocal, "connectionDepth", 0)
+		self._threadLocal.connectionDepth = connectionDepth + 1
+		try:
+			if (connectionDepth == 0):
+				self._database.connect(reuse_if_open=True)
+			yield
+		finally:
+			self._threadLocal.connectionDepth = connectionDepth
+			if (connectionDepth == 0 and self._database.in_transaction() == False):
+				self._database.close()
+
 	def _createDatabase(self, forceCreateTables):
-		self._database = SqliteDatabase(self._databaseFileLocation)
+		if (self._database != None):
+			# e.g. reCreateDatabase, connections of the old pool are not used anymore
+			self._database.close_idle()
+		self._database = None
+		if (self._isExternalDatabaseSelected() == True):
+			self._database = self._createPostgresDatabase()
+		if (self._database == None):
+			# one connection per thread, "timeout" is the time to wait for a free connection (busy_timeout see pragmas)
+			# a connection is only used by one thread at a time, but could be reused by an other thread later
+			# no autoconnect: a query outside of withDatabaseConnection (e.g. lazy backref) fails instead of taking a connection that is never returned
+			self._database = PooledSqliteDatabase(self._databaseFileLocation,
+												  max_connections=self._getConnectionSettingAsInt("maxConnections"),
+												  stale_timeout=self._getConnectionSettingAsInt("staleTimeout"),
+												  timeout=self._getConnectionSettingAsInt("busyTimeout"),
+												  pragmas=self._buildConnectionPragmas(),
+												  check_same_thread=False,
+												  autoconnect=False)
 		DatabaseManager.db = self._database
 		self._database.bind(MODELS)
-
-		if forceCreateTables:
-			self._logger.info("Creating new database-tables, because FORCE == TRUE!")
-			self._createDatabaseTables()
-		else:
-			# check, if we need an scheme upgrade
-			self._logger.info("Check if database-scheme upgrade needed.")
-			self._createOrUpgradeSchemeIfNecessary()
+		self._fullTextSearchAvailable = False
+		# one connection for the scheme check/upgrade (the pool has no autoconnect), the scheme methods don't connect
+		with self._databaseConnection():
+			if (self.isExternalDatabase() == False):
+				self._database.bind([PrintJobSearchModel])
+				self._fullTextSearchAvailable = PrintJobSearchModel.fts5_installed()
+
+			if forceCreateTables:
+				self._logger.info("Creating new database-tables, because FORCE == TRUE!")
+				self._createDatabaseTables()
+			else:
+				# check, if we need an scheme upgrade
+				self._logger.info("Check if database-scheme upgrade needed.")
+				self._createOrUpgradeSchemeIfNecessary()
+				self._verifyDatabaseIndexes()
+				self._verifyPrintJobSearchIndex()
+				self._verifyStatisticRollup()
+				self._verifySlicerSettingTable()
+			self._externalChangeCounter = self._loadExternalChangeCounter()
+		self._resultCache.invalidate()
+		self._notifyPrintJobChange(ChangeFeed.CHANGE_TYPE_RELOAD)
 		self._logger.info("Done DatabaseManager.createDatabase")
 
 
+	def _isExternalDatabaseSelected(self):
+		return (str(self._externalDatabaseSettings["useExternal"]).lower() == "true" and
+				self._externalDatabaseSettings["type"] == DATABASE_TYPE_POSTGRES)
+
+	# Same pool behaviour as for SQLite (one connection per thread)
+	# return: PostgreSQL database or None if not possible (e.g. driver not installed), then the local SQLite is used
+	def _createPostgresDatabase(self):
+		if (psycopg2 == None):
+			self._logger.error("External PostgreSQL database selected, but driver 'psycopg2' is not installed. Using local SQLite database!")
+			self.sendErrorMessageToClient("PJH-DatabaseManager", "PostgreSQL driver 'psycopg2' is not installed, the local database is used. See OctoPrint.log for details!")
+			return None
+		port = StringUtils.transformToIntOrNone(self._externalDatabaseSettings["port"])
+		if (port == None):
+			port = DEFAULT_EXTERNAL_DATABASE_SETTINGS["port"]
+		self._logger.info("Using external PostgreSQL database '" + str(self._externalDatabaseSettings["databaseName"]) + "' on '" +
+						  str(self._externalDatabaseSettings["host"]) + ":" + str(port) + "'")
+		return PooledPostgresqlDatabase(self._externalDatabaseSettings["databaseName"],
+										user=self._externalDatabaseSettings["user"],
+										password=self._externalDatabaseSettings["password"],
+										host=self._externalDatabaseSettings["host"],
+										port=port,
+										max_connections=self._getConnectionSettingAsInt("maxConnections"),
+										stale_timeout=self._getConnectionSettingAsInt("staleTimeout"),
+										timeout=self._getConnectionSettingAsInt("busyTimeout"),
+										autoconnect=False)
+
+	def isExternalDatabase(self):
+		return isinstance(self._database, PostgresqlDatabase)
+
+	# return: location of the SQLite database-file or a description of the external database
+	# Cache for the results of the query endpoints, invalidated after each change of the printjobs
+	def getResultCache(self):
+		return self._resultCache
+
+	def getChangeFeed(self):
+		return self._changeFeed
+
+	# The external database is shared with other OctoPrint instances (other printers), their changes are not part of the
+	# result cache generation and the change feed of this instance. So each write transaction increments a change
+	# counter in the database and each request compares it once with the last known counter.
+	# After a change of an other instance the result cache is invalidated and the clients must reload the table.
+	@withDatabaseConnection
+	def checkExternalChanges(self):
+		if (self.isExternalDatabase() == False):
+			return
+		self._acceptExternalChangeCounter(self._loadExternalChangeCounter(), 0)
+
+	# return: current counter or None (local database)
+	def _loadExternalChangeCounter(self):
+		if (self.isExternalDatabase() == False):
+			return None
+		metaDataModel = PluginMetaDataModel.get_or_none(PluginMetaDataModel.key == PluginMetaDataModel.KEY_PRINTJOB_CHANGE_COUNTER)
+		return int(metaDataModel.value) if (metaDataModel != None) else 0
+
+	# must be called inside the write transaction, the row lock of the update serializes the writes of all instances
+	# return: new counter or None (local database)
+	def _incrementExternalChangeCounter(self):
+		if (self.isExternalDatabase() == False):
+			return None
+		updatedCount = PluginMetaDataModel.update(value=(PluginMetaDataModel.value.cast("INTEGER") + 1).cast("VARCHAR(255)"))\
+											.where(PluginMetaDataModel.key == PluginMetaDataModel.KEY_PRINTJOB_CHANGE_COUNTER).execute()
+		if (updatedCount == 0):
+			PluginMetaDataModel.create(key=PluginMetaDataModel.KEY_PRINTJOB_CHANGE_COUNTER, value="1")
+		return self._loadExternalChangeCounter()
+
+	# ownChangeCount: 1 after an own (committed) write, 0 for a check
+	def _acceptExternalChangeCounter(self, changeCounter, ownChangeCount):
+		if (changeCounter == None):
+			return
+		with self._externalChangeCounterLock:
+			lastChangeCounter = self._externalChangeCounter if (self._externalChangeCounter != None) else 0
+			isOtherInstanceChange = changeCounter > lastChangeCounter + ownChangeCount
+			if (changeCounter > lastChangeCounter):
+				self._externalChangeCounter = changeCounter
+		if (isOtherInstanceChange == True):
+			self._logger.info("Printjobs changed by an other instance of the external database")
+			self._resultCache.invalidate()
+			self._notifyPrintJobChange(ChangeFeed.CHANGE_TYPE_RELOAD)
+
+	def _notifyPrintJobChange(self, changeType, databaseId = None):
+		change = self._changeFeed.addChange(changeType, databaseId)
+		if (self._printJobChangeListener != None):
+			try:
+				self._printJobChangeListener(change)
+			except Exception as e:
+				# the change itself is already committed
+				self._logger.exception("Could not notify printjob change:" + str(e))
+
 	def getDatabaseFileLocation(self):
+		if (self.isExternalDatabase() == True):
+			return ("postgresql://" + str(self._externalDatabaseSettings["user"]) + "@" + str(self._externalDatabaseSettings["host"]) + ":" +
+					str(self._externalDatabaseSettings["port"]) + "/" + str(self._externalDatabaseSettings["databaseName"]))
 		return self._databaseFileLocation
 
+	# Write all changes of the WAL-file into the database-file and truncate the WAL-file, e.g. before the database-file
+	# is copied or after a huge import. Nothing to do without WAL.
+	@withDatabaseConnection
+	def checkpointDatabase(self):
+		if (self._database == None or self.isExternalDatabase() == True):
+			return
+		try:
+			self._database.connect(reuse_if_open=True)
+			journalMode = self._database.execute_sql("PRAGMA journal_mode").fetchone()[0]
+			if (journalMode == "wal"):
+				# busy, logPages, checkpointedPages
+				checkpointResult = self._database.execute_sql("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+				if (checkpointResult[0] != 0):
+					self._logger.warning("Database checkpoint not complete, database is busy")
+		except Exception as e:
+			self._logger.exception("Could not checkpoint database:" + str(e))
+
+	# not possible for an external database, it is shared with the other printers (and there is no backup file)
+	# return: False, if not recreated
 	def reCreateDatabase(self):
+		if (self.isExternalDatabase() == True):
+			self._logger.error("Database not recreated, the printjobs are stored in an external database")
+			return False
 		self._logger.info("ReCreating Database")
 		self._createDatabase(True)
+		return True
+
+	# Fill the statistic rollup table from scratch (one statement per rollup type, no model loading)
+	@withDatabaseConnection
+	def rebuildStatisticRollup(self):
+		try:
+			with self._database.atomic():
+				StatisticRollupModel.delete().execute()
+				self._insertStatisticRollup(None)
+			self._logger.info("Statistic rollup table rebuild with " + str(StatisticRollupModel.select().count()) + " rows")
+		except Exception as e:
+			self._logger.error("Could not rebuild statistic rollup table!")
+			self._logger.exception(e)
+
+	# Expressions of the plugin settings, must be set before initDatabase (migration)
+	# After a change, the compare parses the settings text again, until rebuildSlicerSettings is done
+	def setSlicerSettingsExpressions(self, slicerSettingsExpressions):
+		self._slicerSettingsExpressions = slicerSettingsExpressions if (slicerSettingsExpressions != None) else ""
+
+	# True, if the slicer settings table contains the key-values of the expressions (default: current slicer expressions)
+	def isSlicerSettingTableUpToDate(self, slicerSettingsExpressions = None):
+		if (slicerSettingsExpressions == None):
+			slicerSettingsExpressions = self._slicerSettingsExpressions
+		return self._slicerSettingTableExpressionsHash == self._buildSlicerSettingsExpressionsHash(slicerSettingsExpressions)
+
+	# Fill the slicer settings table with the current expressions, one transaction per batch of printjobs (keyset
+	# pagination), so the database is not locked for a long time. Printjobs inserted in the meantime are part of a
+	# later batch.
+	# Only one rebuild at a time (e.g. the settings are saved several times), a waiting rebuild is skipped if the
+	# table is already filled with the current expressions
+	def rebuildSlicerSettings(self, batchSize = SLICER_SETTINGS_REBUILD_BATCH_SIZE):
+		# the lock before the connection, so a waiting rebuild doesn't hold a connection of the pool
+		with self._slicerSettingsRebuildLock:
+			if (self.isSlicerSettingTableUpToDate() == True):
+				self._logger.info("Slicer settings table is already filled with the current slicer expressions")
+				return
+			self._rebuildSlicerSettingTable(batchSize)
+
+	@withDatabaseConnection
+	def _rebuildSlicerSettingTable(self, batchSize):
+		slicerSettingsExpressions = self._slicerSettingsExpressions
+		try:
+			# not up to date during the rebuild
+			self._storeSlicerSettingTableExpressionsHash("")
+			lastDatabaseId = 0
+			rowCount = 0
+			while True:
+				printJobRows = list(PrintJobModel.select(PrintJobModel.databaseId, PrintJobModel.slicerSettingsAsText)
+									.where(PrintJobModel.databaseId > lastDatabaseId)
+									.order_by(PrintJobModel.databaseId)
+									.limit(batchSize)
+									.tuples())
+				if (len(printJobRows) == 0):
+					break
+				with self._database.atomic():
+					printJobIds = [databaseId for databaseId, slicerSettingsAsText in printJobRows]
+					SlicerSettingModel.delete().where(SlicerSettingModel.printJob << printJobIds).execute()
+					slicerSettingRows = []
+					for databaseId, slicerSettingsAsText in printJobRows:
+						slicerSettingRows.extend(self._buildSlicerSettingRows(databaseId, slicerSettingsAsText))
+					self._insertSlicerSettingRows(slicerSettingRows)
+				rowCount += len(slicerSettingRows)
+				lastDatabaseId = printJobRows[-1][0]
+			# orphans (e.g. printjob deleted during the rebuild)
+			SlicerSettingModel.delete().where(SlicerSettingModel.printJob.not_in(PrintJobModel.select(PrintJobModel.databaseId))).execute()
+			if (slicerSettingsExpressions == self._slicerSettingsExpressions):
+				self._storeSlicerSettingTableExpressionsHash(self._buildSlicerSettingsExpressionsHash(slicerSettingsExpressions))
+			self._logger.info("Slicer settings table rebuild with " + str(rowCount) + " rows")
+		except Exception as e:
+			self._logger.error("Could not rebuild slicer settings table!")
+			self._logger.exception(e)
+		self._resultCache.invalidate()
 
+	@withDatabaseConnection
 	def insertPrintJob(self, printJobModel):
 		databaseId = None
+		changeCounter = None
 		with self._database.atomic() as transaction:  # Opens new transaction.
 			try:
 				printJobModel.save()
@@ -530,6 +1253,13 @@ class DatabaseManager(object):
 				# - Costs
 				if (printJobModel.getCosts() != None):
 					printJobModel.getCosts().save()
+				# - Search
+				self._updatePrintJobSearchIndex(printJobModel)
+				# - Slicer Settings
+				self._updateSlicerSettingRows(printJobModel)
+				# - Statistic
+				self._refreshStatisticRollup([self._toStatisticRollupDay(printJobModel.printStartDateTime)])
+				changeCounter = self._incrementExternalChangeCounter()
 
 				# do expicit commit
 				transaction.commit()
@@ -540,15 +1270,184 @@ class DatabaseManager(object):
 				transaction.rollback()
 				databaseId = None
 				self._logger.exception("Could not insert printJob into database:" + str(e))
+				# the ids of the rolled back inserts are already assigned, without reset a second try would be an update
+				self._resetDatabaseIds(printJobModel)
 
 				self.sendErrorMessageToClient("PJH-DatabaseManager", "Could not insert the printjob into the database. See OctoPrint.log for details!")
 			pass
+		self._resultCache.invalidate()
+		if (databaseId != None):
+			self._acceptExternalChangeCounter(changeCounter, 1)
+			self._notifyPrintJobChange(ChangeFeed.CHANGE_TYPE_INSERT, databaseId)
 
 		return databaseId
 
+	def _resetDatabaseIds(self, printJobModel):
+		printJobModel.databaseId = None
+		for filamentModel in printJobModel.getFilamentModels():
+			filamentModel.databaseId = None
+		if (printJobModel.allTemperatures != None):
+			for temperatureModel in printJobModel.allTemperatures:
+				temperatureModel.databaseId = None
+		if (printJobModel.getCosts() != None):
+			printJobModel.getCosts().databaseId = None
+
+	# Bulk insert, e.g. for the CSV import
+	# - one transaction per batch (instead of one per printjob)
+	# - relations are inserted with one INSERT per table and batch
+	# - SQLite: during the import the database is not synced to disk after each transaction (a backup is made before the import)
+	# - PostgreSQL: the relations are transferred with COPY
+	# insertedCallback(numberOfInsertedPrintJobs) is called after each batch
+	# return: number of inserted printjobs, if not all are inserted an error occurred (already logged)
+	@withDatabaseConnection
+	def insertPrintJobs(self, printJobModels, batchSize = 500, insertedCallback = None):
+		insertedCount = 0
+		self._database.connect(reuse_if_open=True)
+		isSQLite = self.isExternalDatabase() == False
+		if (isSQLite == True):
+			previousSynchronous = self._database.execute_sql("PRAGMA synchronous").fetchone()[0]
+			previousJournalMode = self._database.execute_sql("PRAGMA journal_mode").fetchone()[0]
+			self._database.execute_sql("PRAGMA synchronous = OFF")
+			if (previousJournalMode != "wal"):
+				self._database.execute_sql("PRAGMA journal_mode = MEMORY")
+		try:
+			batch = []
+			for printJobModel in printJobModels:
+				batch.append(printJobModel)
+				if (len(batch) == batchSize):
+					insertedCount += self._insertPrintJobBatch(batch)
+					batch = []
+					if (insertedCallback != None):
+						insertedCallback(insertedCount)
+			if (len(batch) != 0):
+				insertedCount += self._insertPrintJobBatch(batch)
+				if (insertedCallback != None):
+					insertedCallback(insertedCount)
+		except Exception as e:
+			self._logger.exception("Could not insert printJobs into database, inserted '" + str(insertedCount) + "' printJobs:" + str(e))
+			self.sendErrorMessageToClient("PJH-DatabaseManager", "Could not insert all printjobs into the database. See OctoPrint.log for details!")
+		finally:
+			if (isSQLite == True):
+				if (previousJournalMode != "wal"):
+					self._database.execute_sql("PRAGMA journal_mode = " + previousJournalMode)
+				self._database.execute_sql("PRAGMA synchronous = " + str(previousSynchronous))
+		# the rollup is not maintained per printjob during the import, one rebuild is faster
+		if (insertedCount != 0):
+			self.rebuildStatisticRollup()
+		self._resultCache.invalidate()
+		if (insertedCount != 0):
+			self._notifyPrintJobChange(ChangeFeed.CHANGE_TYPE_RELOAD)
+		# the WAL-file could be very large now
+		self.checkpointDatabase()
+		return insertedCount
+
+	# All or nothing, exception is raised after the rollback
+	# The statements are build once per batch and executed with plain (many) parameter-sets, because
+	# the peewee SQL generation (save/insert_many) is much slower than SQLite itself
+	# PostgreSQL: the id of the printjob is read with RETURNING and the relations are inserted with COPY
+	# return: number of inserted printjobs
+	def _insertPrintJobBatch(self, printJobModels):
+		printJobStatement, printJobFields = self._buildInsertStatement(PrintJobModel)
+		filamentStatement, filamentFields = self._buildInsertStatement(FilamentModel)
+		temperatureStatement, temperatureFields = self._buildInsertStatement(TemperatureModel)
+		costStatement, costFields = self._buildInsertStatement(CostModel)
+		slicerSettingStatement, slicerSettingFields = self._buildInsertStatement(SlicerSettingModel)
+
+		filamentValues = []
+		temperatureValues = []
+		costValues = []
+		slicerSettingValues = []
+		searchValues = []
+		with self._database.atomic():
+			cursor = self._database.cursor()
+			for printJobModel in printJobModels:
+				cursor.execute(printJobStatement, self._toInsertValues(printJobModel, printJobFields))
+				if (self.isExternalDatabase() == True):
+					printJobModel.databaseId = cursor.fetchone()[0]
+				else:
+					printJobModel.databaseId = cursor.lastrowid
+				# the relation-models are read directly, because the getters would also query the database
+				filamentModels = list(printJobModel.filamentModelsByToolId.values())
+				for filamentModel in filamentModels:
+					filamentModel.printJob = printJobModel
+					filamentValues.append(self._toInsertValues(filamentModel, filamentFields))
+				if (printJobModel.allTemperatures != None):
+					for temperatureModel in printJobModel.allTemperatures:
+						temperatureModel.printJob = printJobModel
+						temperatureValues.append(self._toInsertValues(temperatureModel, temperatureFields))
+				if (printJobModel.costModel != None):
+					printJobModel.costModel.printJob = printJobModel
+					costValues.append(self._toInsertValues(printJobModel.costModel, costFields))
+				for slicerSettingRow in self._buildSlicerSettingRows(printJobModel.databaseId, printJobModel.slicerSettingsAsText):
+					slicerSettingValues.append(tuple(field.db_value(slicerSettingRow.get(field.name)) for field in slicerSettingFields))
+				if (self._fullTextSearchAvailable == True):
+					searchRow = self._buildPrintJobSearchRow(printJobModel, filamentModels)
+					searchValues.append(tuple(searchRow.values()))
+
+			if (self.isExternalDatabase() == True):
+				self._copyRows(cursor, FilamentModel, filamentFields, filamentValues)
+				self._copyRows(cursor, TemperatureModel, temperatureFields, temperatureValues)
+				self._copyRows(cursor, CostModel, costFields, costValues)
+				self._copyRows(cursor, SlicerSettingModel, slicerSettingFields, slicerSettingValues)
+			else:
+				cursor.executemany(filamentStatement, filamentValues)
+				cursor.executemany(temperatureStatement, temperatureValues)
+				cursor.executemany(costStatement, costValues)
+				cursor.executemany(slicerSettingStatement, slicerSettingValues)
+			if (len(searchValues) != 0):
+				searchColumns = self._buildPrintJobSearchRow(printJobModels[0], []).keys()
+				cursor.executemany('INSERT INTO "' + PrintJobSearchModel._meta.table_name + '" (' +
+								   ", ".join('"' + column + '"' for column in searchColumns) + ') VALUES (' +
+								   ", ".join("?" for column in searchColumns) + ')',
+								   searchValues)
+			changeCounter = self._incrementExternalChangeCounter()
+		self._acceptExternalChangeCounter(changeCounter, 1)
+		return len(printJobModels)
+
+	# return: (INSERT statement, fields in parameter order) all fields without databaseId
+	def _buildInsertStatement(self, modelClass):
+		insertFields = [field for field in modelClass._meta.sorted_fields if field.name != "databaseId"]
+		insertStatement = ('INSERT INTO "' + modelClass._meta.table_name + '" (' +
+						   ", ".join('"' + field.column_name + '"' for field in insertFields) + ') VALUES (' +
+						   ", ".join(self._database.param for field in insertFields) + ')')
+		if (self.isExternalDatabase() == True):
+			insertStatement += ' RETURNING "databaseId"'
+		return insertStatement, insertFields
+
+	# PostgreSQL only, all rows with one COPY (CSV format) instead of one INSERT per row
+	def _copyRows(self, cursor, modelClass, insertFields, rows):
+		if (len(rows) == 0):
+			return
+		copyData = io.StringIO()
+		for row in rows:
+			copyData.write(",".join(self._toCopyValue(value) for value in row))
+			copyData.write("\n")
+		copyData.seek(0)
+		cursor.copy_expert('COPY "' + modelClass._meta.table_name + '" (' +
+						   ", ".join('"' + field.column_name + '"' for field in insertFields) + ') FROM STDIN WITH (FORMAT csv)',
+						   copyData)
+
+	# unquoted empty value is NULL, strings are always quoted (so an empty string is not NULL)
+	def _toCopyValue(self, value):
+		if (value == None):
+			return ""
+		if (isinstance(value, str)):
+			return '"' + value.replace('"', '""') + '"'
+		return str(value)
+
+	def _toInsertValues(self, model, insertFields):
+		return tuple(field.db_value(model.__data__.get(field.name)) for field in insertFields)
+
+	@withDatabaseConnection
 	def updatePrintJob(self, printJobModel, rollbackHandler = None):
+		isUpdated = False
+		changeCounter = None
 		with self._database.atomic() as transaction:  # Opens new transaction.
 			try:
+				# the start could be changed, so the rollup of the previous day must be refreshed as well
+				previousRollupDay = self._loadStatisticRollupDay(printJobModel.get_id())
+				# field names, a field comparison would be a peewee expression
+				isSlicerSettingsChanged = "slicerSettingsAsText" in [field.name for field in printJobModel.dirty_fields]
 				printJobModel.save()
 				databaseId = printJobModel.get_id()
 				# save all relations
@@ -564,6 +1463,15 @@ class DatabaseManager(object):
 				# - Costs
 				if (printJobModel.getCosts() != None):
 					printJobModel.getCosts().save()
+				# - Search
+				self._updatePrintJobSearchIndex(printJobModel)
+				# - Slicer Settings
+				if (isSlicerSettingsChanged == True):
+					self._updateSlicerSettingRows(printJobModel)
+				# - Statistic
+				self._refreshStatisticRollup([previousRollupDay, self._toStatisticRollupDay(printJobModel.printStartDateTime)])
+				changeCounter = self._incrementExternalChangeCounter()
+				isUpdated = True
 			except Exception as e:
 				# Because this block of code is wrapped with "atomic", a
 				# new transaction will begin automatically after the call
@@ -573,82 +1481,40 @@ class DatabaseManager(object):
 				rollbackHandler()
 				self.sendErrorMessageToClient("PJH-DatabaseManager", "Could not update the printjob ('"+ printJobModel.fileName +"') into the database. See OctoPrint.log for details!")
 			pass
-
-	#
+		self._resultCache.invalidate()
+		if (isUpdated == True):
+			self._acceptExternalChangeCounter(changeCounter, 1)
+			self._notifyPrintJobChange(ChangeFeed.CHANGE_TYPE_UPDATE, databaseId)
+
+	# Statistic is calculated inside the database (COUNT/SUM/GROUP BY), so we don't need to load all
+	# printjobs and there filament-relations into memory
+	# Without a search-query the pre-aggregated values of the rollup table are used (O(days) instead of O(printjobs))
+	@withDatabaseConnection
 	def calculatePrintJobsStatisticByQuery(self, tableQuery):
 
-		printJobCount = 0
-		duration = 0
-		length = 0.0
-		weight = 0.0
-		fileSize = 0
-		statusDict = dict()
-		materialDict = dict()
-		spoolDict = dict()
-		firstDate = None
+		if (self._isStatisticRollupQuery(tableQuery) == True):
+			statisticValues = self._calculateStatisticValuesFromRollup(tableQuery)
+		else:
+			statisticValues = self._calculateStatisticValuesFromPrintJobs(tableQuery)
+		(printJobCount, duration, fileSize, firstDate, statusDict, length, weight, materialDict, spoolDict) = statisticValues
+
+		# - end of the last printjob (sorted by start)
+		lastDateQuery = PrintJobModel.select(PrintJobModel.printEndDateTime).where(PrintJobModel.printEndDateTime.is_null(False))
+		lastDateQuery = self._addTableQueryFilterToSelect(lastDateQuery, tableQuery)
+		lastDateQuery = lastDateQuery.order_by(PrintJobModel.printStartDateTime.desc(), PrintJobModel.databaseId.desc()).limit(1)
 		lastDate = None
-		newTableQuery = tableQuery.copy()
-		newTableQuery["sortColumn"] = "printStartDateTime"
-		newTableQuery["sortOrder"] = "asc"
-		newTableQuery["from"] = 0
-		newTableQuery["to"] = 999999
-		allJobModels = self.loadPrintJobsByQuery(newTableQuery)
-
-		for job in allJobModels:
-			printJobCount = printJobCount + 1
-			if (firstDate == None):
-				firstDate = job.printStartDateTime
-			if (job.printEndDateTime != None):
-				lastDate = job.printEndDateTime
-			tempJobFileSize = job.fileSize
-			if (tempJobFileSize == None):
-				tempJobFileSize = 0
-			fileSize = fileSize + tempJobFileSize
-			duration = duration + job.duration
-			statusResult = job.printStatusResult
-
-			if (statusResult in statusDict):
-				currentCount = statusDict[statusResult]
-				currentCount = currentCount + 1
-				statusDict[statusResult] = currentCount
-			else:
-				statusDict[statusResult] = 1
-
-			allFilaments = job.getFilamentModels()
-			if allFilaments != None:
-				for filla in allFilaments:
-					if filla.toolId == "total":
-						# exclude totals, otherwise everything is counted twice
-						continue
-					if (StringUtils.isEmpty(filla.usedLength) == False):
-						length = length + filla.usedLength
-					if (StringUtils.isEmpty(filla.usedWeight) == False):
-						weight = weight + filla.usedWeight
-
-					if (StringUtils.isEmpty(filla.spoolName) == False):
-						# spoolsSet.add(filla.spoolName)
-						if (filla.spoolName in spoolDict):
-							currentCount = spoolDict[filla.spoolName]
-							currentCount = currentCount + 1
-							spoolDict[filla.spoolName] = currentCount
-						else:
-							spoolDict[filla.spoolName] = 1
-
-					if (StringUtils.isEmpty(filla.material) == False):
-						# materialsSet.add(filla.material)
-						if (filla.material in materialDict):
-							currentCount = materialDict[filla.material]
-							currentCount = currentCount + 1
-							materialDict[filla.material] = currentCount
-						else:
-							materialDict[filla.material] = 1
+		for lastJob in lastDateQuery:
+			lastDate = lastJob.printEndDateTime
 
 		# do formatting
 		queryString = self._buildQueryString(tableQuery)
 		lastDateString = ""
 		if (lastDate != None):
 			lastDateString = lastDate.strftime('%d.%m.%Y %H:%M')
-		fromToString = firstDate.strftime('%d.%m.%Y %H:%M') + " - " + lastDateString
+		firstDateString = ""
+		if (firstDate != None):
+			firstDateString = firstDate.strftime('%d.%m.%Y %H:%M')
+		fromToString = firstDateString + " - " + lastDateString
 		durationString = StringUtils.secondsToText(duration)
 		lengthString = self._buildLengthString(length)
 		weightString = self._buildWeightString(weight)
@@ -669,6 +1535,210 @@ class DatabaseManager(object):
 			"spools": spoolString
 		}
 
+	# Statistic values per time bucket (hour/day/week/month of the printjob start), same filter as the table-query
+	# Printjobs without a start are not part of any bucket
+	# return: [{
+	#  bucket: "2021-01-04"
+	#  printJobCount: 3, successCount: 2, successRate: 0.67, printHours: 4.5
+	#  filamentLength: 1234.5, filamentWeight: 12.3 (without "total")
+	#  totalCosts: 1.2, filamentCost: 0.8, electricityCost: 0.1, printerCost: 0.3, otherCost: 0.0
+	# }, ...] sorted by bucket
+	@withDatabaseConnection
+	def calculatePrintJobsTimeSeriesByQuery(self, bucket, tableQuery):
+		bucketExpression = self._buildTimeBucketExpression(bucket)
+		# grouped by the alias, the expression contains parameters
+		bucketAlias = SQL('"timeBucket"')
+		series = dict()
+
+		# - printjob values
+		printJobQuery = PrintJobModel.select(bucketExpression.alias("timeBucket"),
+											 fn.COUNT(PrintJobModel.databaseId),
+											 fn.SUM(Case(None, [(PrintJobModel.printStatusResult == "success", 1)], 0)),
+											 fn.SUM(PrintJobModel.duration))
+		printJobQuery = self._addTableQueryFilterToSelect(printJobQuery, tableQuery)
+		printJobQuery = printJobQuery.where(PrintJobModel.printStartDateTime.is_null(False)).group_by(bucketAlias)
+		for (bucketValue, printJobCount, successCount, duration) in printJobQuery.tuples():
+			series[bucketValue] = {
+				"bucket": bucketValue,
+				"printJobCount": printJobCount,
+				"successCount": successCount,
+				"successRate": round(successCount / float(printJobCount), 4) if printJobCount != 0 else None,
+				"printHours": round((duration if duration != None else 0) / 3600.0, 2),
+				"filamentLength": 0.0,
+				"filamentWeight": 0.0,
+				"totalCosts": 0.0,
+				"filamentCost": 0.0,
+				"electricityCost": 0.0,
+				"printerCost": 0.0,
+				"otherCost": 0.0
+			}
+
+		# - filament, exclude totals, otherwise everything is counted twice
+		filamentQuery = FilamentModel.select(bucketExpression.alias("timeBucket"),
+											 fn.SUM(FilamentModel.usedLength),
+											 fn.SUM(FilamentModel.usedWeight))
+		filamentQuery = self._addFilamentQueryToSelect(filamentQuery, tableQuery)
+		filamentQuery = filamentQuery.where(PrintJobModel.printStartDateTime.is_null(False)).group_by(bucketAlias)
+		for (bucketValue, length, weight) in filamentQuery.tuples():
+			if (bucketValue in series):
+				series[bucketValue]["filamentLength"] = round(float(length), 2) if length != None else 0.0
+				series[bucketValue]["filamentWeight"] = round(float(weight), 2) if weight != None else 0.0
+
+		# - costs
+		costFields = [CostModel.totalCosts, CostModel.filamentCost, CostModel.electricityCost, CostModel.printerCost, CostModel.otherCost]
+		costQuery = CostModel.select(bucketExpression.alias("timeBucket"), *[fn.SUM(costField) for costField in costFields])
+		costQuery = self._addTableQueryFilterToSelect(costQuery.join(PrintJobModel), tableQuery)
+		costQuery = costQuery.where(PrintJobModel.printStartDateTime.is_null(False)).group_by(bucketAlias)
+		for costRow in costQuery.tuples():
+			if (costRow[0] in series):
+				for costField, costValue in zip(costFields, costRow[1:]):
+					series[costRow[0]][costField.name] = round(float(costValue), 2) if costValue != None else 0.0
+
+		return [series[bucketValue] for bucketValue in sorted(series.keys())]
+
+	# return: expression for the bucket of the printjob start as text, e.g. "2021-01-04 13:00"
+	def _buildTimeBucketExpression(self, bucket):
+		sqliteFormat, postgresFormat = STATISTIC_TIME_SERIES_BUCKETS[bucket]
+		if (self.isExternalDatabase() == True):
+			return fn.to_char(fn.date_trunc(bucket, PrintJobModel.printStartDateTime), postgresFormat)
+		if (bucket == "week"):
+			# monday of the week ('weekday 0' == next sunday or same day)
+			return fn.strftime(sqliteFormat, PrintJobModel.printStartDateTime, "weekday 0", "-6 days")
+		return fn.strftime(sqliteFormat, PrintJobModel.printStartDateTime)
+
+	# return: (printJobCount, duration, fileSize, firstDate, statusDict, length, weight, materialDict, spoolDict)
+	def _calculateStatisticValuesFromPrintJobs(self, tableQuery):
+
+		# - printjob values
+		summaryQuery = PrintJobModel.select(fn.COUNT(PrintJobModel.databaseId).alias("printJobCount"),
+											fn.SUM(PrintJobModel.duration).alias("duration"),
+											fn.SUM(fn.COALESCE(PrintJobModel.fileSize, 0)).alias("fileSize"),
+											fn.MIN(PrintJobModel.printStartDateTime).alias("firstDate"))
+		summaryQuery = self._addTableQueryFilterToSelect(summaryQuery, tableQuery)
+		summary = summaryQuery.dicts().get()
+
+		printJobCount = summary["printJobCount"]
+		duration = summary["duration"] if summary["duration"] != None else 0
+		fileSize = summary["fileSize"] if summary["fileSize"] != None else 0
+		firstDate = self._toDateTimeOrNone(summary["firstDate"])
+
+		# - status
+		statusDict = dict()
+		statusQuery = PrintJobModel.select(PrintJobModel.printStatusResult, fn.COUNT(PrintJobModel.databaseId).alias("statusCount"))
+		statusQuery = self._addTableQueryFilterToSelect(statusQuery, tableQuery)
+		statusQuery = statusQuery.group_by(PrintJobModel.printStatusResult)
+		for statusRow in statusQuery.tuples():
+			statusDict[statusRow[0]] = statusRow[1]
+
+		# - filament, exclude totals, otherwise everything is counted twice
+		filamentQuery = FilamentModel.select(fn.SUM(FilamentModel.usedLength).alias("length"),
+											 fn.SUM(FilamentModel.usedWeight).alias("weight"))
+		filamentQuery = self._addFilamentQueryToSelect(filamentQuery, tableQuery)
+		filamentSummary = filamentQuery.dicts().get()
+		length = float(filamentSummary["length"]) if filamentSummary["length"] != None else 0.0
+		weight = float(filamentSummary["weight"]) if filamentSummary["weight"] != None else 0.0
+
+		materialDict = self._countFilamentValues(FilamentModel.material, tableQuery)
+		spoolDict = self._countFilamentValues(FilamentModel.spoolName, tableQuery)
+
+		return (printJobCount, duration, fileSize, firstDate, statusDict, length, weight, materialDict, spoolDict)
+
+	# Rollup table contains only the status and the day, so it could not be used for a search-query
+	def _isStatisticRollupQuery(self, tableQuery):
+		if ("searchQuery" in tableQuery and len(tableQuery["searchQuery"]) > 0):
+			return False
+		return True
+
+	# return: same as _calculateStatisticValuesFromPrintJobs
+	def _calculateStatisticValuesFromRollup(self, tableQuery):
+
+		# - printjob values
+		summaryQuery = StatisticRollupModel.select(fn.SUM(StatisticRollupModel.itemCount).alias("printJobCount"),
+												   fn.SUM(StatisticRollupModel.duration).alias("duration"),
+												   fn.SUM(StatisticRollupModel.fileSize).alias("fileSize"),
+												   fn.MIN(StatisticRollupModel.firstStartDateTime).alias("firstDate"))
+		summaryQuery = self._addRollupQueryToSelect(summaryQuery, StatisticRollupModel.ROLLUP_TYPE_PRINTJOB, tableQuery)
+		summary = summaryQuery.dicts().get()
+
+		printJobCount = summary["printJobCount"] if summary["printJobCount"] != None else 0
+		duration = summary["duration"] if summary["duration"] != None else 0
+		fileSize = summary["fileSize"] if summary["fileSize"] != None else 0
+		firstDate = self._toDateTimeOrNone(summary["firstDate"])
+
+		# - status
+		statusDict = dict()
+		statusQuery = StatisticRollupModel.select(StatisticRollupModel.printStatusResult, fn.SUM(StatisticRollupModel.itemCount).alias("statusCount"))
+		statusQuery = self._addRollupQueryToSelect(statusQuery, StatisticRollupModel.ROLLUP_TYPE_PRINTJOB, tableQuery)
+		statusQuery = statusQuery.group_by(StatisticRollupModel.printStatusResult)
+		for statusRow in statusQuery.tuples():
+			statusDict[statusRow[0]] = statusRow[1]
+
+		# - filament, totals are not part of the rollup
+		filamentQuery = StatisticRollupModel.select(fn.SUM(StatisticRollupModel.usedLength).alias("length"),
+													fn.SUM(StatisticRollupModel.usedWeight).alias("weight"))
+		filamentQuery = self._addRollupQueryToSelect(filamentQuery, StatisticRollupModel.ROLLUP_TYPE_FILAMENT, tableQuery)
+		filamentSummary = filamentQuery.dicts().get()
+		length = float(filamentSummary["length"]) if filamentSummary["length"] != None else 0.0
+		weight = float(filamentSummary["weight"]) if filamentSummary["weight"] != None else 0.0
+
+		materialDict = self._countRollupFilamentValues(StatisticRollupModel.material, tableQuery)
+		spoolDict = self._countRollupFilamentValues(StatisticRollupModel.spoolName, tableQuery)
+
+		return (printJobCount, duration, fileSize, firstDate, statusDict, length, weight, materialDict, spoolDict)
+
+	# same as _countFilamentValues, but from the rollup table
+	def _countRollupFilamentValues(self, rollupField, tableQuery):
+		result = dict()
+		countQuery = StatisticRollupModel.select(rollupField, fn.SUM(StatisticRollupModel.itemCount))
+		countQuery = self._addRollupQueryToSelect(countQuery, StatisticRollupModel.ROLLUP_TYPE_FILAMENT, tableQuery)
+		countQuery = countQuery.where(rollupField.is_null(False) & (fn.TRIM(rollupField) != ""))
+		countQuery = countQuery.group_by(rollupField).order_by(fn.MIN(StatisticRollupModel.firstStartDateTime), fn.MIN(StatisticRollupModel.firstFilamentId))
+		for countRow in countQuery.tuples():
+			result[countRow[0]] = countRow[1]
+		return result
+
+	# same filter as _addTableQueryFilterToSelect (without search), the date range is compared by day
+	def _addRollupQueryToSelect(self, rollupQuery, rollupType, tableQuery):
+		rollupQuery = rollupQuery.where(StatisticRollupModel.rollupType == rollupType)
+
+		filterName = tableQuery["filterName"]
+		# - status
+		if (filterName == "onlySuccess"):
+			rollupQuery = rollupQuery.where(StatisticRollupModel.printStatusResult == "success")
+		elif (filterName == "onlyFailed"):
+			rollupQuery = rollupQuery.where(StatisticRollupModel.printStatusResult != "success")
+		# - date range
+		if ("startDate" in tableQuery):
+			startDate = tableQuery["startDate"]
+			endDate = tableQuery["endDate"]
+			if (len(startDate) > 0 and len(endDate) > 0):
+				startDay = datetime.datetime.strptime(startDate, "%d.%m.%Y").date()
+				endDay = datetime.datetime.strptime(endDate, "%d.%m.%Y").date()
+				rollupQuery = rollupQuery.where((StatisticRollupModel.day >= startDay) & (StatisticRollupModel.day <= endDay))
+		return rollupQuery
+
+	# count how often each (not empty) value of the filament field is used, e.g. {"PLA": 12, "PETG": 3}
+	# the order of the keys is the order of the first usage (like the former python-loop)
+	def _countFilamentValues(self, filamentField, tableQuery):
+		result = dict()
+		countQuery = FilamentModel.select(filamentField, fn.COUNT(FilamentModel.databaseId))
+		countQuery = self._addFilamentQueryToSelect(countQuery, tableQuery)
+		countQuery = countQuery.where(filamentField.is_null(False) & (fn.TRIM(filamentField) != ""))
+		countQuery = countQuery.group_by(filamentField).order_by(fn.MIN(PrintJobModel.printStartDateTime), fn.MIN(FilamentModel.databaseId))
+		for countRow in countQuery.tuples():
+			result[countRow[0]] = countRow[1]
+		return result
+
+	def _addFilamentQueryToSelect(self, filamentQuery, tableQuery):
+		filamentQuery = filamentQuery.join(PrintJobModel).where(FilamentModel.toolId.is_null() | (FilamentModel.toolId != "total"))
+		return self._addTableQueryFilterToSelect(filamentQuery, tableQuery)
+
+	def _toDateTimeOrNone(self, value):
+		# aggregate functions (e.g. MIN) on sqlite deliver the raw string
+		if (value == None or isinstance(value, datetime.datetime)):
+			return value
+		return PrintJobModel.printStartDateTime.python_value(value)
+
 	def _buildLengthString(self, length):
 		lengthString = StringUtils.formatFloatSave("{:.02f}", TransformPrintJob2JSON.convertMM2M(length), "-")
 		if (lengthString != "-"):
@@ -734,6 +1804,7 @@ class DatabaseManager(object):
 		return result
 
 
+	@withDatabaseConnection
 	def countPrintJobsByQuery(self, tableQuery):
 
 		# filterName = tableQuery["filterName"]
@@ -749,7 +1820,9 @@ class DatabaseManager(object):
 		return myQuery.count()
 
 
-	def loadPrintJobsByQuery(self, tableQuery):
+	# asDicts: plain rows incl. relations instead of models, see _prefetchRelationRows
+	@withDatabaseConnection
+	def loadPrintJobsByQuery(self, tableQuery, asDicts = False):
 		offset = int(tableQuery["from"])
 		limit = int(tableQuery["to"])
 		# sortColumn = tableQuery["sortColumn"]
@@ -787,23 +1860,163 @@ class DatabaseManager(object):
 		# 		# 						 ((PrintJobModel.printStartDateTime == endDate) | ( PrintJobModel.printStartDateTime <  startDate)) )
 		# 		myQuery = myQuery.where( ( ( PrintJobModel.printStartDateTime > startDateTime) & ( PrintJobModel.printStartDateTime < endDateTime))
 		# 								 )
-
-		return myQuery
+		if (asDicts):
+			return self._prefetchRelationRows(myQuery)
+		# executed now, with the connection of this method (incl. relations, no lazy loading after the connection is closed)
+		return self._prefetchRelations(myQuery)
+
+	# Keyset (seek) pagination: instead of OFFSET the next page starts after the last row of the previous page,
+	# identified by the opaque cursor (sort value + databaseId). So page 400 is as fast as page 1.
+	# - tableQuery["to"] is the page size
+	# - tableQuery["cursor"] is empty for the first page
+	# - only printStartDateTime and fileName sorting is supported
+	# - both columns could be NULL (e.g. CSV import with "-"): desc -> NULLs last, asc -> NULLs first, in both cases
+	#   ordered by databaseId (explicit, PostgreSQL sorts NULLs the other way round than SQLite)
+	# - asDicts: plain rows incl. relations instead of models, see _prefetchRelationRows
+	# return: (list of PrintJobModels, nextCursor or None if last page)
+	@withDatabaseConnection
+	def loadPrintJobsByCursor(self, tableQuery, asDicts = False):
+		pageSize = int(tableQuery["to"])
+		myQuery, sortColumn, sortOrder = self._buildPrintJobsCursorQuery(tableQuery)
+
+		if (asDicts):
+			allPrintJobModels = self._prefetchRelationRows(myQuery)
+		else:
+			allPrintJobModels = self._prefetchRelations(myQuery)
+
+		nextCursor = None
+		if (len(allPrintJobModels) > pageSize):
+			allPrintJobModels = allPrintJobModels[:pageSize]
+			lastPrintJobModel = allPrintJobModels[-1]
+			if (asDicts):
+				nextCursor = self._encodeCursor(sortColumn, sortOrder, lastPrintJobModel["cursorSortValue"], lastPrintJobModel["databaseId"])
+			else:
+				nextCursor = self._encodeCursor(sortColumn, sortOrder, lastPrintJobModel.cursorSortValue, lastPrintJobModel.databaseId)
+		return allPrintJobModels, nextCursor
+
+	# return: (query incl. seek predicate, order and limit, sortColumn, sortOrder), see loadPrintJobsByCursor
+	def _buildPrintJobsCursorQuery(self, tableQuery):
+		pageSize = int(tableQuery["to"])
+		sortColumn = tableQuery["sortColumn"] if tableQuery["sortColumn"] == "fileName" else "printStartDateTime"
+		sortOrder = "asc" if tableQuery["sortOrder"] == "asc" else "desc"
+		sortKey = fn.Lower(PrintJobModel.fileName) if sortColumn == "fileName" else PrintJobModel.printStartDateTime
+
+		myQuery = PrintJobModel.select(PrintJobModel, sortKey.alias("cursorSortValue"))
+		myQuery = self._addTableQueryFilterToSelect(myQuery, tableQuery)
+
+		cursorValues = self._decodeCursor(tableQuery.get("cursor"), sortColumn, sortOrder)
+		if (cursorValues != None):
+			lastSortValue = cursorValues[0]
+			lastDatabaseId = cursorValues[1]
+			# the first condition is redundant, but needed for an index range-scan
+			if ("desc" == sortOrder):
+				if (lastSortValue == None):
+					# only the remaining NULLs
+					myQuery = myQuery.where( sortKey.is_null() & (PrintJobModel.databaseId < lastDatabaseId) )
+				else:
+					myQuery = myQuery.where( ( (sortKey <= lastSortValue) &
+											   ( (sortKey < lastSortValue) | ((sortKey == lastSortValue) & (PrintJobModel.databaseId < lastDatabaseId)) ) )
+											 | sortKey.is_null() )
+			else:
+				if (lastSortValue == None):
+					# the remaining NULLs and all values
+					myQuery = myQuery.where( (sortKey.is_null() & (PrintJobModel.databaseId > lastDatabaseId)) | sortKey.is_null(False) )
+				else:
+					myQuery = myQuery.where( (sortKey >= lastSortValue) &
+											 ( (sortKey > lastSortValue) | ((sortKey == lastSortValue) & (PrintJobModel.databaseId > lastDatabaseId)) ) )
+
+		if ("desc" == sortOrder):
+			myQuery = myQuery.order_by(sortKey.desc(nulls="LAST"), PrintJobModel.databaseId.desc())
+		else:
+			myQuery = myQuery.order_by(sortKey.asc(nulls="FIRST"), PrintJobModel.databaseId)
+		# one more, to check if there is a next page
+		myQuery = myQuery.limit(pageSize + 1)
+		return myQuery, sortColumn, sortOrder
+
+	def _encodeCursor(self, sortColumn, sortOrder, lastSortValue, lastDatabaseId):
+		# NULL stays null (not "None"), see loadPrintJobsByCursor
+		cursorData = [sortColumn, sortOrder, None if lastSortValue == None else str(lastSortValue), lastDatabaseId]
+		return base64.urlsafe_b64encode(json.dumps(cursorData).encode("utf-8")).decode("ascii")
+
+	# return: (lastSortValue, lastDatabaseId) or None if no/invalid cursor or the cursor belongs to an other sorting
+	def _decodeCursor(self, cursor, sortColumn, sortOrder):
+		if (StringUtils.isEmpty(cursor)):
+			return None
+		try:
+			cursorData = json.loads(base64.urlsafe_b64decode(str(cursor).encode("ascii")).decode("utf-8"))
+			if (cursorData[0] != sortColumn or cursorData[1] != sortOrder):
+				self._logger.warning("Cursor does not match the current sorting, starting with first page")
+				return None
+			return (cursorData[2], int(cursorData[3]))
+		except Exception as e:
+			self._logger.warning("Invalid cursor '" + str(cursor) + "', starting with first page: " + str(e))
+		return None
+
+	# Loads the printjobs of the query and all relations (filaments, temperatures, costs) with one query per table,
+	# instead of one query per printjob and relation (lazy loading via backref).
+	# return: list of PrintJobModels
+	def _prefetchRelations(self, printJobQuery):
+		allPrintJobModels = list(printJobQuery)
+		if (len(allPrintJobModels) == 0):
+			return allPrintJobModels
+
+		printJobIdQuery = printJobQuery.select(PrintJobModel.databaseId)
+		filamentsByPrintJobId = self._loadRelationsByPrintJobId(FilamentModel, printJobIdQuery)
+		temperaturesByPrintJobId = self._loadRelationsByPrintJobId(TemperatureModel, printJobIdQuery)
+		costsByPrintJobId = self._loadRelationsByPrintJobId(CostModel, printJobIdQuery)
+
+		for printJobModel in allPrintJobModels:
+			databaseId = printJobModel.databaseId
+			printJobModel.assignPrefetchedRelations(filamentsByPrintJobId.get(databaseId, []),
+													temperaturesByPrintJobId.get(databaseId, []),
+													costsByPrintJobId.get(databaseId, []))
+		return allPrintJobModels
+
+	# Same as _prefetchRelations, but without model instances (the table page only needs the values for the JSON).
+	# The printjobs and relations are plain dicts (peewee .dicts()), the relations are added to each printjob row as
+	# "filamentRows", "temperatureRows" and "costRows", see TransformPrintJob2JSON.transformPrintJobRow
+	# return: list of printjob dicts
+	def _prefetchRelationRows(self, printJobQuery):
+		allPrintJobRows = list(printJobQuery.dicts())
+		if (len(allPrintJobRows) == 0):
+			return allPrintJobRows
+
+		printJobIdQuery = printJobQuery.select(PrintJobModel.databaseId)
+		filamentsByPrintJobId = self._loadRelationsByPrintJobId(FilamentModel, printJobIdQuery, True)
+		temperaturesByPrintJobId = self._loadRelationsByPrintJobId(TemperatureModel, printJobIdQuery, True)
+		costsByPrintJobId = self._loadRelationsByPrintJobId(CostModel, printJobIdQuery, True)
+
+		for printJobRow in allPrintJobRows:
+			databaseId = printJobRow["databaseId"]
+			printJobRow["filamentRows"] = filamentsByPrintJobId.get(databaseId, [])
+			printJobRow["temperatureRows"] = temperaturesByPrintJobId.get(databaseId, [])
+			printJobRow["costRows"] = costsByPrintJobId.get(databaseId, [])
+		return allPrintJobRows
+
+	def _loadRelationsByPrintJobId(self, relationModelClass, printJobIdQuery, asDicts = False):
+		result = dict()
+		relationQuery = relationModelClass.select().where(relationModelClass.printJob.in_(printJobIdQuery)).order_by(relationModelClass.databaseId)
+		if (asDicts):
+			relationQuery = relationQuery.dicts()
+		for relationModel in relationQuery:
+			printJobId = relationModel["printJob"] if asDicts else relationModel.__data__["printJob"]
+			if (printJobId in result):
+				result[printJobId].append(relationModel)
+			else:
+				result[printJobId] = [relationModel]
+		return result
 
 
 
 	def _addTableQueryToSelect(self, myQuery, tableQuery):
+		myQuery = self._addTableQueryFilterToSelect(myQuery, tableQuery)
+		myQuery = self._addTableQuerySortingToSelect(myQuery, tableQuery)
+		return myQuery
 
+	def _addTableQuerySortingToSelect(self, myQuery, tableQuery):
 		sortColumn = tableQuery["sortColumn"]
 		sortOrder = tableQuery["sortOrder"]
-		filterName = tableQuery["filterName"]
 
-		# - status
-		if (filterName == "onlySuccess"):
-			myQuery = myQuery.where(PrintJobModel.printStatusResult == "success")
-		elif (filterName == "onlyFailed"):
-			myQuery = myQuery.where(PrintJobModel.printStatusResult != "success")
-		# -sorting
 		if ("printStartDateTime" == sortColumn):
 			if ("desc" == sortOrder):
 				myQuery = myQuery.order_by(PrintJobModel.printStartDateTime.desc())
@@ -814,6 +2027,32 @@ class DatabaseManager(object):
 				myQuery = myQuery.order_by(fn.Lower(PrintJobModel.fileName).desc())
 			else:
 				myQuery = myQuery.order_by(fn.Lower(PrintJobModel.fileName))
+		if ("searchRank" == sortColumn):
+			# best matches first, only possible with a full-text search
+			searchMatchExpression = self._getSearchMatchExpression(tableQuery)
+			if (searchMatchExpression != None):
+				myQuery = myQuery.join(PrintJobSearchModel, on=(PrintJobSearchModel.rowid == PrintJobModel.databaseId))
+				myQuery = myQuery.where(PrintJobSearchModel.match(searchMatchExpression))
+				myQuery = myQuery.order_by(PrintJobSearchModel.rank(), PrintJobModel.printStartDateTime.desc())
+			else:
+				myQuery = myQuery.order_by(PrintJobModel.printStartDateTime.desc())
+		return myQuery
+
+	# return: FTS5 match expression of the searchQuery, or None if no search or no full-text search available
+	def _getSearchMatchExpression(self, tableQuery):
+		if (self._fullTextSearchAvailable == False or "searchQuery" not in tableQuery):
+			return None
+		return self._buildSearchMatchExpression(tableQuery["searchQuery"])
+
+	def _addTableQueryFilterToSelect(self, myQuery, tableQuery):
+
+		filterName = tableQuery["filterName"]
+
+		# - status
+		if (filterName == "onlySuccess"):
+			myQuery = myQuery.where(PrintJobModel.printStatusResult == "success")
+		elif (filterName == "onlyFailed"):
+			myQuery = myQuery.where(PrintJobModel.printStatusResult != "success")
 		# - date range
 		if ("startDate" in tableQuery):
 			startDate = tableQuery["startDate"]
@@ -828,27 +2067,68 @@ class DatabaseManager(object):
 				# 						 ((PrintJobModel.printStartDateTime == endDate) | ( PrintJobModel.printStartDateTime <  startDate)) )
 				myQuery = myQuery.where( ( ( PrintJobModel.printStartDateTime > startDateTime) & ( PrintJobModel.printStartDateTime < endDateTime))
 										 )
-		# - search query (only filename)
+		# - search query (full-text search over file, note, user, spool and material)
 		if ("searchQuery" in tableQuery):
 			searchQueryValue = tableQuery["searchQuery"]
 			if (len(searchQueryValue) > 0):
-				myQuery = myQuery.where(PrintJobModel.fileName.contains(searchQueryValue))
+				if (self._fullTextSearchAvailable == True):
+					searchMatchExpression = self._buildSearchMatchExpression(searchQueryValue)
+					if (searchMatchExpression != None):
+						searchQuery = PrintJobSearchModel.select(PrintJobSearchModel.rowid).where(PrintJobSearchModel.match(searchMatchExpression))
+						myQuery = myQuery.where(PrintJobModel.databaseId.in_(searchQuery))
+					elif (len(searchQueryValue.strip()) > 0):
+						# only words without any letter/digit (e.g. '-'), no printjob could match
+						myQuery = myQuery.where(SQL("1 = 0"))
+				else:
+					# fallback, only filename
+					myQuery = myQuery.where(PrintJobModel.fileName.contains(searchQueryValue))
 				pass
 		return myQuery
 
 
-	def loadSelectedPrintJobs(self, selectedDatabaseIds):
+	@withDatabaseConnection
+	def loadSelectedPrintJobs(self, selectedDatabaseIds, asDicts = False):
 		selectedDatabaseIdsSplitted = selectedDatabaseIds.split(',')
 		databaseArray = []
 
 		for dbId in selectedDatabaseIdsSplitted:
 			databaseArray.append(dbId)
 
-		return PrintJobModel.select().where(PrintJobModel.databaseId << databaseArray).order_by(PrintJobModel.printStartDateTime.desc())
+		myQuery = PrintJobModel.select().where(PrintJobModel.databaseId << databaseArray).order_by(PrintJobModel.printStartDateTime.desc())
+		if (asDicts):
+			return self._prefetchRelationRows(myQuery)
+		# executed now, with the connection of this method (incl. relations, no lazy loading after the connection is closed)
+		return self._prefetchRelations(myQuery)
 
 
+	# Slicer settings of the selected printjobs from the slicer settings table, without loading the settings text
+	# return: list of dicts (databaseId, fileName, keyValues), same order as loadSelectedPrintJobs
+	#         or None, if the table is not filled with the expressions (e.g. during the rebuild)
+	@withDatabaseConnection
+	def loadSelectedSlicerSettings(self, selectedDatabaseIds, slicerSettingsExpressions):
+		if (self.isSlicerSettingTableUpToDate(slicerSettingsExpressions) == False):
+			return None
+		databaseArray = selectedDatabaseIds.split(',')
+
+		printJobRows = list(PrintJobModel.select(PrintJobModel.databaseId, PrintJobModel.fileName)
+							.where(PrintJobModel.databaseId << databaseArray)
+							.order_by(PrintJobModel.printStartDateTime.desc())
+							.dicts())
+		keyValuesByPrintJobId = dict()
+		for printJobRow in printJobRows:
+			printJobRow["keyValues"] = keyValuesByPrintJobId[printJobRow["databaseId"]] = dict()
+		if (len(keyValuesByPrintJobId) != 0):
+			slicerSettingQuery = SlicerSettingModel.select(SlicerSettingModel.printJob, SlicerSettingModel.key, SlicerSettingModel.value)\
+												   .where(SlicerSettingModel.printJob << list(keyValuesByPrintJobId.keys()))
+			for printJobId, key, value in slicerSettingQuery.tuples():
+				keyValuesByPrintJobId[printJobId][key] = value
+		return printJobRows
+
+	@withDatabaseConnection
 	def loadAllPrintJobs(self):
-		return PrintJobModel.select().order_by(PrintJobModel.printStartDateTime.desc())
+		myQuery = PrintJobModel.select().order_by(PrintJobModel.printStartDateTime.desc())
+		# executed now, with the connection of this method (incl. relations, no lazy loading after the connection is closed)
+		return self._prefetchRelations(myQuery)
 
 		# return PrintJobModel.select().offset(offset).limit(limit).order_by(PrintJobModel.printStartDateTime.desc())
 		# all = PrintJobModel.select().join(FilamentModel).switch(PrintJobModel).join(TemperatureModel).order_by(PrintJobModel.printStartDateTime.desc())
@@ -857,27 +2137,58 @@ class DatabaseManager(object):
 		# return result
 		# return allDict
 
+	# Generator over all printjobs (newest first, the printjobs without start at the end) with relations, loaded in
+	# chunks via keyset pagination (see loadPrintJobsByCursor, databaseId as tie-breaker so each printjob is loaded once)
+	# Only one chunk is in memory and only 4 queries per chunk are needed (e.g. for the CSV export)
+	def iterateAllPrintJobs(self, chunkSize = 500):
+		tableQuery = {
+			"to": chunkSize,
+			"sortColumn": "printStartDateTime",
+			"sortOrder": "desc",
+			"filterName": "all",
+			"cursor": ""
+		}
+		while True:
+			printJobModels, nextCursor = self.loadPrintJobsByCursor(tableQuery)
+			for printJobModel in printJobModels:
+				yield printJobModel
+			if (nextCursor == None):
+				break
+			tableQuery["cursor"] = nextCursor
+
+	@withDatabaseConnection
 	def loadPrintJob(self, databaseId):
 		databaseIdAsInt = StringUtils.transformToIntOrNone(databaseId)
 		if (databaseIdAsInt == None):
 			self._logger.error("Could not load PrintJob, because not a valid databaseId '"+str(databaseId)+"' maybe not a number")
 			return None
-		return PrintJobModel.get_or_none(databaseIdAsInt)
+		printJobModels = self._prefetchRelations(PrintJobModel.select().where(PrintJobModel.databaseId == databaseIdAsInt))
+		return printJobModels[0] if (len(printJobModels) > 0) else None
 
+	@withDatabaseConnection
 	def deletePrintJob(self, databaseId):
 		databaseIdAsInt = StringUtils.transformToIntOrNone(databaseId)
 		if (databaseIdAsInt == None):
 			self._logger.error("Could not delete PrintJob, because not a valid databaseId '"+str(databaseId)+"' maybe not a number")
 			return None
 
+		isDeleted = False
+		changeCounter = None
 		with self._database.atomic() as transaction:  # Opens new transaction.
 			try:
+				rollupDay = self._loadStatisticRollupDay(databaseIdAsInt)
 				# first delete relations
 				n = FilamentModel.delete().where(FilamentModel.printJob == databaseIdAsInt).execute()
 				n = TemperatureModel.delete().where(TemperatureModel.printJob == databaseIdAsInt).execute()
 				n = CostModel.delete().where(CostModel.printJob == databaseIdAsInt).execute()
+				n = SlicerSettingModel.delete().where(SlicerSettingModel.printJob == databaseIdAsInt).execute()
+				if (self._fullTextSearchAvailable == True):
+					n = PrintJobSearchModel.delete().where(PrintJobSearchModel.rowid == databaseIdAsInt).execute()
 
 				PrintJobModel.delete_by_id(databaseIdAsInt)
+				self._refreshStatisticRollup([rollupDay])
+				changeCounter = self._incrementExternalChangeCounter()
+				isDeleted = True
 			except Exception as e:
 				# Because this block of code is wrapped with "atomic", a
 				# new transaction will begin automatically after the call
@@ -887,3 +2198,7 @@ class DatabaseManager(object):
 
 				self.sendErrorMessageToClient("PJH-DatabaseManager", "Could not delete the printjob ('"+ str(databaseId) +"') from the database. See OctoPrint.log for details!")
 			pass
+		self._resultCache.invalidate()
+		if (isDeleted == True):
+			self._acceptExternalChangeCounter(changeCounter, 1)
+			self._notifyPrintJobChange(ChangeFeed.CHANGE_TYPE_DELETE, databaseIdAsInt)
@@ -8,6 +8,7 @@ from queue import Queue
 
 import octoprint.plugin
 from octoprint.events import Events
+from octoprint.filemanager import FileDestinations
 
 import datetime
 import math
@@ -22,17 +23,19 @@ from octoprint_PrintJobHistory.models.FilamentModel import FilamentModel
 from octoprint_PrintJobHistory.models.PrintJobModel import PrintJobModel
 from octoprint_PrintJobHistory.models.TemperatureModel import TemperatureModel
 from octoprint_PrintJobHistory.models.CostModel import CostModel
-from peewee import DoesNotExist
+from peewee import DoesNotExist, DateTimeField
 
 from .common.SettingsKeys import SettingsKeys
-from .common.SlicerSettingsParser import SlicerSettingsParser
+from .common.ChangeFeed import ChangeFeed
+from .common.CaptureQueue import CaptureQueue
+from .common.SlicerSettingsCache import SlicerSettingsCache
 from .common.ResetAbleLogFileHandler import ResetAbleLogFileHandler
 from .api.PrintJobHistoryAPI import PrintJobHistoryAPI
 from .api import TransformPrintJob2JSON
 from .DatabaseManager import DatabaseManager
 from .CameraManager import CameraManager
 
-from octoprint_PrintJobHistory.common import StringUtils, DateTimeUtils
+from octoprint_PrintJobHistory.common import StringUtils, DateTimeUtils, PrintJobUtils
 
 class PrintJobHistoryPlugin(
 	PrintJobHistoryAPI,
@@ -67,8 +70,22 @@ class PrintJobHistoryPlugin(
 		# self.myInfoLogger("Start initializing")
 		# DATABASE
 		sqlLoggingEnabled = self._settings.get_boolean([SettingsKeys.SETTINGS_KEY_SQL_LOGGING_ENABLED])
-		self._databaseManager = DatabaseManager(self._logger, sqlLoggingEnabled)
-		self._databaseManager.initDatabase(pluginDataBaseFolder, self._sendErrorMessageToClient)
+		connectionSettings = {
+			"journalMode": self._settings.get([SettingsKeys.SETTINGS_KEY_DATABASE_JOURNAL_MODE]),
+			"synchronous": self._settings.get([SettingsKeys.SETTINGS_KEY_DATABASE_SYNCHRONOUS]),
+			"cacheSizeKB": self._settings.get([SettingsKeys.SETTINGS_KEY_DATABASE_CACHE_SIZE_KB]),
+			"mmapSizeMB": self._settings.get([SettingsKeys.SETTINGS_KEY_DATABASE_MMAP_SIZE_MB]),
+			"busyTimeout": self._settings.get([SettingsKeys.SETTINGS_KEY_DATABASE_BUSY_TIMEOUT]),
+			"walAutoCheckpoint": self._settings.get([SettingsKeys.SETTINGS_KEY_DATABASE_WAL_AUTOCHECKPOINT]),
+			"maxConnections": self._settings.get([SettingsKeys.SETTINGS_KEY_DATABASE_MAX_CONNECTIONS]),
+			"staleTimeout": self._settings.get([SettingsKeys.SETTINGS_KEY_DATABASE_STALE_TIMEOUT])
+		}
+		# external database (PostgreSQL) instead of the local SQLite database-file
+		externalDatabaseSettings = self._settings.get(["datbaseSettings"])
+		self._databaseManager = DatabaseManager(self._logger, sqlLoggingEnabled, connectionSettings, externalDatabaseSettings)
+		# needed for the slicer settings table (migration)
+		self._databaseManager.setSlicerSettingsExpressions(self._settings.get([SettingsKeys.SETTINGS_KEY_SLICERSETTINGS_KEYVALUE_EXPRESSION]))
+		self._databaseManager.initDatabase(pluginDataBaseFolder, self._sendErrorMessageToClient, self._sendPrintJobChangeToClient)
 
 		# CAMERA
 		self._cameraManager = CameraManager(self._logger)
@@ -88,6 +105,11 @@ class PrintJobHistoryPlugin(
 
 		self._resetableFileLogHandler = None
 
+		# CAPTURE, started after the log handler is available
+		self._captureQueue = CaptureQueue(self._logger, os.path.join(pluginDataBaseFolder, "pendingCaptures"), self._capturePendingPrintJob)
+		# SLICER SETTINGS, parsed after upload, so the capture only reads the cache
+		self._slicerSettingsCache = SlicerSettingsCache(self._logger)
+
 		self._logger.info("Done initializing")
 
 	def myInfoLogger(self, message):
@@ -130,6 +152,15 @@ class PrintJobHistoryPlugin(
 			}
 			self._sendDataToClient(payload)
 
+	# delta for the table of all browsers, see DatabaseManager._notifyPrintJobChange
+	def _sendPrintJobChangeToClient(self, change):
+		if (change["changeType"] == ChangeFeed.CHANGE_TYPE_RELOAD):
+			printJobChange = change
+		else:
+			printJobChange = self._buildPrintJobChanges([change])[0]
+		self._sendDataToClient(dict(action="printJobChanged",
+									printJobChange=printJobChange))
+
 	def _sendMessageConfirmToClient(self, title, message):
 		confirmMessageData = {
 			"title": title,
@@ -349,18 +380,13 @@ class PrintJobHistoryPlugin(
 
 		return version
 
-	# Grabs all informations for the filament attributes
-	def _createAndAssignFilamentModel(self, printJob, payload):
+	# Assigns all informations for the filament attributes, read at the end of the print (see _buildPendingCapture)
+	def _createAndAssignFilamentModel(self, printJob, fileData, filamentExtrusionArray, selectedSpoolDataDict):
 
-		self._logger.info("----- Start reading filament -----")
-		filePath = payload["path"]
-		fileData = self._file_manager.get_metadata(payload["origin"], filePath)
-
-		# - grab calcualted data for each tool
-		# - grap measured data for each tool
+		self._logger.info("----- Start assigning filament -----")
+		# - calcualted data for each tool
+		# - measured data for each tool
 		filamentCalculatedDict = self._readCalculatedFilamentMetaData(fileData)
-		filamentExtrusionArray = self._readMeasuredFilament()
-		selectedSpoolDataDict = self._getSelectedSpools()
 		# isMultiToolPrint = len(filamentCalculatedDict) > 1
 
 		# - add always "total"
@@ -501,7 +527,7 @@ class PrintJobHistoryPlugin(
 
 	def _readCalculatedFilamentMetaData(self, fileData):
 		filamentAnalyseDict = None
-		if "analysis" in fileData:
+		if fileData != None and "analysis" in fileData:
 			if "filament" in fileData["analysis"]:
 				filamentAnalyseDict = fileData["analysis"]["filament"]
 		if (filamentAnalyseDict == None):
@@ -929,15 +955,108 @@ class PrintJobHistoryPlugin(
 
 		self.alreadyCanceled = False
 		self._createPrintJobModel(payload)
+		# normally already parsed after the upload
+		self._addFileToSlicerSettingsCache(payload.get("origin"), payload.get("path"))
 
 	#### print job finished
 	# printStatus = "success", "failed", "canceled"
 	def _printJobFinished(self, printStatus, payload):
 		self._logger.info("PrintJob finished!")
+		if (self._currentPrintJobModel == None):
+			self._logger.error("PrintJob not captured, because the start of the print was not detected")
+			return
+		# only the current state is taken, the capture itself is done by the capture queue (not in the event thread)
+		self._currentPrintJobModel.printEndDateTime = datetime.datetime.now()
+		# the technical log belongs to this print, the next print resets the log file (maybe before the capture is done)
+		self._resetableFileLogHandler.stopLogging()
+		self._currentPrintJobModel.technicalLog = self._resetableFileLogHandler.readLogContent()
+		pendingCapture = self._buildPendingCapture(printStatus, payload, self._currentPrintJobModel)
+		# snapshot/thumbnail of this print, not of the state when the capture queue is done
+		if (self._isPrintToCapture(printStatus) == True):
+			try:
+				self._grabImage(payload, self._currentPrintJobModel)
+			except Exception as e:
+				# the printjob is captured without an image
+				self._logger.exception("Could not grab the image of the printjob:" + str(e))
+		self._captureQueue.addCapture(pendingCapture)
+
+	# only local files, the sd-card is not readable
+	def _addFileToSlicerSettingsCache(self, fileOrigin, filePath):
+		if (fileOrigin != FileDestinations.LOCAL or StringUtils.isEmpty(filePath)):
+			return
+		slicerSettingsExpressions = self._settings.get([SettingsKeys.SETTINGS_KEY_SLICERSETTINGS_KEYVALUE_EXPRESSION])
+		if (slicerSettingsExpressions != None and len(slicerSettingsExpressions) != 0):
+			self._slicerSettingsCache.addFile(self._file_manager.path_on_disk(fileOrigin, filePath), slicerSettingsExpressions)
 
-		self._capturePrintJobData(printStatus, payload)
+	def _removeFileFromSlicerSettingsCache(self, fileOrigin, filePath):
+		if (fileOrigin != FileDestinations.LOCAL or StringUtils.isEmpty(filePath)):
+			return
+		self._slicerSettingsCache.removeFile(self._file_manager.path_on_disk(fileOrigin, filePath))
+
+	# JSON serializable, see CaptureQueue
+	# Everything that changes after the print (file metadata, filament odometer, selected spools) is read now, the
+	# capture queue could be done later (e.g. next print already started or after a restart)
+	def _buildPendingCapture(self, printStatus, payload, printJobModel):
+		fileMetaData = None
+		try:
+			fileMetaData = self._file_manager.get_metadata(payload["origin"], payload["path"])
+		except Exception as e:
+			self._logger.exception("Could not read the metadata of the printed file:" + str(e))
+		measuredFilament = None
+		selectedSpools = None
+		try:
+			measuredFilament = self._readMeasuredFilament()
+			selectedSpools = self._getSelectedSpools()
+		except Exception as e:
+			# the printjob is captured without filament informations
+			self._logger.exception("Could not read the filament informations:" + str(e))
+
+		printJobValues = dict(printJobModel.__data__)
+		for fieldName, fieldValue in printJobValues.items():
+			if (isinstance(fieldValue, datetime.datetime)):
+				printJobValues[fieldName] = fieldValue.isoformat()
+		allTemperatures = []
+		if (printJobModel.allTemperatures != None):
+			for temperatureModel in printJobModel.allTemperatures:
+				allTemperatures.append([temperatureModel.sensorName, temperatureModel.sensorValue])
+		return {
+			"printStatus": printStatus,
+			"payload": payload,
+			"printJob": printJobValues,
+			"temperatures": allTemperatures,
+			"fileMetaData": fileMetaData,
+			"measuredFilament": measuredFilament,
+			"selectedSpools": selectedSpools
+		}
 
-	def _capturePrintJobData(self, printStatus, payload):
+	# called by the capture queue (worker thread), an exception means the capture is retried
+	def _capturePendingPrintJob(self, pendingCapture):
+		printJobModel = PrintJobModel()
+		for fieldName, fieldValue in pendingCapture["printJob"].items():
+			if (isinstance(PrintJobModel._meta.fields.get(fieldName), DateTimeField) and fieldValue != None):
+				fieldValue = datetime.datetime.fromisoformat(fieldValue)
+			setattr(printJobModel, fieldName, fieldValue)
+		for sensorName, sensorValue in pendingCapture["temperatures"]:
+			temperatureModel = TemperatureModel()
+			temperatureModel.sensorName = sensorName
+			temperatureModel.sensorValue = sensorValue
+			printJobModel.addTemperatureModel(temperatureModel)
+
+		self._capturePrintJobData(pendingCapture, printJobModel)
+
+	# depends on the capture mode of the plugin settings
+	def _isPrintToCapture(self, printStatus):
+		captureMode = self._settings.get([SettingsKeys.SETTINGS_KEY_CAPTURE_PRINTJOBHISTORY_MODE])
+		if (captureMode == SettingsKeys.KEY_CAPTURE_PRINTJOBHISTORY_MODE_NONE):
+			return False
+		if (captureMode == SettingsKeys.KEY_CAPTURE_PRINTJOBHISTORY_MODE_ALWAYS):
+			return True
+		# check status is neccessary
+		return printStatus == "success"
+
+	def _capturePrintJobData(self, pendingCapture, printJobModel):
+		printStatus = pendingCapture["printStatus"]
+		payload = pendingCapture["payload"]
 		captureMode = self._settings.get([SettingsKeys.SETTINGS_KEY_CAPTURE_PRINTJOBHISTORY_MODE])
 		self._logger.info("Print result:" + printStatus + ", CaptureMode:" + captureMode)
 
@@ -945,105 +1064,99 @@ class PrintJobHistoryPlugin(
 			self._logger.info("PrintJob not captured, because it is not enabled in plugin settings")
 			return None
 
-		captureThePrint = False
-		if (captureMode == SettingsKeys.KEY_CAPTURE_PRINTJOBHISTORY_MODE_ALWAYS):
-			captureThePrint = True
-		else:
-			# check status is neccessary
-			if (printStatus == "success"):
-				captureThePrint = True
+		captureThePrint = self._isPrintToCapture(printStatus)
 
 		databaseId = None
-		payLoadForClient = None
 		# capture the print
 		if (captureThePrint == True):
 			self._logger.info("----- Start capturing print job data... -----")
 
-			# - Core Data
-			self._currentPrintJobModel.printEndDateTime = datetime.datetime.now()
-			self._currentPrintJobModel.duration = (
-					self._currentPrintJobModel.printEndDateTime - self._currentPrintJobModel.printStartDateTime).total_seconds()
-			self._currentPrintJobModel.printStatusResult = printStatus
+			# - Core Data (printEndDateTime is already assigned at the end of the print)
+			# int, same value as stored in the database
+			printJobModel.duration = int((printJobModel.printEndDateTime - printJobModel.printStartDateTime).total_seconds())
+			printJobModel.printStatusResult = printStatus
 
-			# - Slicer Settings
-			selectedFilename = payload.get("path")
-			selectedFile = self._file_manager.path_on_disk(payload.get("origin"), selectedFilename)
-			slicerSettingsExpressions = self._settings.get([SettingsKeys.SETTINGS_KEY_SLICERSETTINGS_KEYVALUE_EXPRESSION])
-			if (slicerSettingsExpressions != None and len(slicerSettingsExpressions) != 0):
-				slicerSettings = SlicerSettingsParser(self._logger).extractSlicerSettings(selectedFile, slicerSettingsExpressions)
-				if (slicerSettings.settingsAsText != None and len(slicerSettings.settingsAsText) != 0):
-					self._currentPrintJobModel.slicerSettingsAsText = slicerSettings.settingsAsText
+			# - Slicer Settings, the printjob is captured without them if not readable (e.g. file deleted after the print)
+			try:
+				selectedFilename = payload.get("path")
+				selectedFile = self._file_manager.path_on_disk(payload.get("origin"), selectedFilename)
+				slicerSettingsExpressions = self._settings.get([SettingsKeys.SETTINGS_KEY_SLICERSETTINGS_KEYVALUE_EXPRESSION])
+				if (slicerSettingsExpressions != None and len(slicerSettingsExpressions) != 0):
+					slicerSettings = self._slicerSettingsCache.getSlicerSettings(selectedFile, slicerSettingsExpressions)
+					if (slicerSettings.settingsAsText != None and len(slicerSettings.settingsAsText) != 0):
+						printJobModel.slicerSettingsAsText = slicerSettings.settingsAsText
+			except Exception as e:
+				self._logger.exception("Could not read the slicer settings:" + str(e))
 
-			# - Image / Thumbnail
-			self._grabImage(payload)
+			# - Image / Thumbnail already taken at the end of the print
 
 			# - FilamentInformations e.g. length
-			self._createAndAssignFilamentModel(self._currentPrintJobModel, payload)
+			self._createAndAssignFilamentModel(printJobModel,
+											   pendingCapture.get("fileMetaData"),
+											   pendingCapture.get("measuredFilament"),
+											   pendingCapture.get("selectedSpools"))
 
 			# - Costs
-			self._addCostsToPrintModel(self._currentPrintJobModel)
+			self._addCostsToPrintModel(printJobModel)
 
-			# store everything in the database
+			# store everything in the database, incl. the technical log (already read at the end of the print)
 			self._logger.info("----- Try storing printjob model ----")
-			databaseId = self._databaseManager.insertPrintJob(self._currentPrintJobModel)
+			databaseId = self._databaseManager.insertPrintJob(printJobModel)
 			if (databaseId == None):
-				self._logger.error("PrintJob not captured, see previous error log!")
-				return None
-			printJobItem = None
-			if self._settings.get_boolean([SettingsKeys.SETTINGS_KEY_SHOW_PRINTJOB_DIALOG_AFTER_PRINT]):
+				# retried by the capture queue
+				raise Exception("PrintJob not captured, see previous error log!")
+			self._logger.info("----- ... End PrintJob captured! -----")
+			try:
+				self._sendCapturedPrintJobToClient(printJobModel, databaseId)
+			except Exception as e:
+				# no exception to the capture queue, a retry would insert the printjob again
+				self._logger.exception("Could not inform the client about the captured printjob:" + str(e))
+		else:
+			self._logger.info("----- ... PrintJob not captured, because not activated! -----")
 
-				self._settings.set_int([SettingsKeys.SETTINGS_KEY_SHOW_PRINTJOB_DIALOG_AFTER_PRINT_JOB_ID], databaseId)
-				self._settings.save()
+		return databaseId
 
-				# inform client to show job edit dialog
-				printJobModel = self._databaseManager.loadPrintJob(databaseId)
 
-				# check the correct status (redundent code, see event client_open)
-				printJobItem = None
-				showDisplayAfterPrintMode = self._settings.get(
-					[SettingsKeys.SETTINGS_KEY_SHOWPRINTJOBDIALOGAFTERPRINT_MODE])
-				printJobModelStatus = printJobModel.printStatusResult
+	# after the printjob is stored: show the edit dialog (depends on the settings) and update the table
+	def _sendCapturedPrintJobToClient(self, printJobModel, databaseId):
+		# all relations are in memory, so the printjob is not loaded again
+		printJobCosts = printJobModel.getCosts()
+		printJobModel.assignPrefetchedRelations(list(printJobModel.getFilamentModels()),
+												printJobModel.allTemperatures if printJobModel.allTemperatures != None else [],
+												[printJobCosts] if printJobCosts != None else [])
 
-				if (showDisplayAfterPrintMode == SettingsKeys.KEY_SHOWPRINTJOBDIALOGAFTERPRINT_MODE_SUCCESSFUL):
-					# show only when succesfull
-					if ("success" == printJobModelStatus):
-						printJobItem = TransformPrintJob2JSON.transformPrintJobModel(printJobModel, self._file_manager)
-				elif (showDisplayAfterPrintMode == SettingsKeys.KEY_SHOWPRINTJOBDIALOGAFTERPRINT_MODE_FAILED):
-					if ("failed" == printJobModelStatus or "canceled" == printJobModelStatus):
-						printJobItem = TransformPrintJob2JSON.transformPrintJobModel(printJobModel, self._file_manager)
+		printJobItem = None
+		if self._settings.get_boolean([SettingsKeys.SETTINGS_KEY_SHOW_PRINTJOB_DIALOG_AFTER_PRINT]):
 
-				else:
-					# always
-					printJobItem = TransformPrintJob2JSON.transformPrintJobModel(printJobModel, self._file_manager)
+			self._settings.set_int([SettingsKeys.SETTINGS_KEY_SHOW_PRINTJOB_DIALOG_AFTER_PRINT_JOB_ID], databaseId)
+			self._settings.save()
 
-			# inform client for a reload (and show dialog)
-			payLoadForClient = {
-				"action": "printFinished",
-				"printJobItem": printJobItem  # if present then the editor dialog is shown
-			}
-			# self._sendDataToClient(payLoadForClient)
-			self._logger.info("----- ... End PrintJob captured! -----")
-		else:
-			self._logger.info("----- ... PrintJob not captured, because not activated! -----")
+			# inform client to show job edit dialog
+			# check the correct status (redundent code, see event client_open)
+			showDisplayAfterPrintMode = self._settings.get(
+				[SettingsKeys.SETTINGS_KEY_SHOWPRINTJOBDIALOGAFTERPRINT_MODE])
+			printJobModelStatus = printJobModel.printStatusResult
 
-		# capture the technical log and send updated model to browser
-		self._resetableFileLogHandler.stopLogging()
-		if (databaseId != None):
-			techLog = self._resetableFileLogHandler.readLogContent()
-			lastPrintJobModel = self._databaseManager.loadPrintJob(databaseId)
-			lastPrintJobModel.technicalLog = techLog
-			self._databaseManager.updatePrintJob(lastPrintJobModel)
-			if (payload != None):
-				if (payLoadForClient["printJobItem"] != None):
-					printJobItem = TransformPrintJob2JSON.transformPrintJobModel(lastPrintJobModel, self._file_manager)
-					payLoadForClient["printJobItem"] = printJobItem
-				self._sendDataToClient(payLoadForClient)
-			pass
+			if (showDisplayAfterPrintMode == SettingsKeys.KEY_SHOWPRINTJOBDIALOGAFTERPRINT_MODE_SUCCESSFUL):
+				# show only when succesfull
+				if ("success" == printJobModelStatus):
+					printJobItem = TransformPrintJob2JSON.transformPrintJobModel(printJobModel, self._file_manager)
+			elif (showDisplayAfterPrintMode == SettingsKeys.KEY_SHOWPRINTJOBDIALOGAFTERPRINT_MODE_FAILED):
+				if ("failed" == printJobModelStatus or "canceled" == printJobModelStatus):
+					printJobItem = TransformPrintJob2JSON.transformPrintJobModel(printJobModel, self._file_manager)
 
-		return databaseId
+			else:
+				# always
+				printJobItem = TransformPrintJob2JSON.transformPrintJobModel(printJobModel, self._file_manager)
+
+		# inform client (show dialog), the table is updated by the "printJobChanged" message
+		self._sendDataToClient({
+			"action": "printFinished",
+			"printJobItem": printJobItem  # if present then the editor dialog is shown
+		})
 
 
-	def _grabImage(self, payload):
+	def _grabImage(self, payload, printJobModel):
 		self._logger.info("----- Start grab Image/thumbnail... -----")
 		isCameraPresent = self._cameraManager.isCamaraSnahotURLPresent()
 
@@ -1058,7 +1171,7 @@ class PrintJobHistoryPlugin(
 		preferedThumbnail = self._settings.get(
 			[SettingsKeys.SETTINGS_KEY_PREFERED_IMAGE_SOURCE]) == SettingsKeys.KEY_PREFERED_IMAGE_SOURCE_THUMBNAIL
 
-		isThumbnailPresent = self._isThumbnailPresent(payload)
+		isThumbnailPresent = self._isThumbnailPresent(payload, printJobModel)
 
 		# - No Image
 		if (takeSnapshotAfterPrint == False and takeSnapshotOnGCode == False and takeSnapshotOnM118Code == False and takeThumbnailAfterPrint == False):
@@ -1068,11 +1181,11 @@ class PrintJobHistoryPlugin(
 		if (takeThumbnailAfterPrint == True and takeSnapshotAfterPrint == False and takeSnapshotOnGCode == False and takeSnapshotOnM118Code == False):
 			# Try to take the thumbnail
 			self._logger.info("Try to take thumbnail, because afterprint/gcode not selected")
-			self._takeThumbnailImage(payload)
+			self._takeThumbnailImage(payload, printJobModel)
 			return
 		if (takeThumbnailAfterPrint == True and isThumbnailPresent == True and preferedThumbnail == True):
 			self._logger.info("Try to take thumbnail, because thumbnail is present and prefered")
-			self._takeThumbnailImage(payload)
+			self._takeThumbnailImage(payload, printJobModel)
 			return
 		# - Only Camera
 		if ((takeSnapshotAfterPrint == True) and takeThumbnailAfterPrint == False):
@@ -1081,7 +1194,7 @@ class PrintJobHistoryPlugin(
 				return
 			self._logger.info("Try capturing snapshot asyc from camera, because thumbnail not selected")
 			self._cameraManager.takeSnapshotAsync(
-				CameraManager.buildSnapshotFilename(self._currentPrintJobModel.printStartDateTime),
+				CameraManager.buildSnapshotFilename(printJobModel.printStartDateTime),
 				self._sendErrorMessageToClient,
 				self._sendReloadTableToClient
 			)
@@ -1091,24 +1204,24 @@ class PrintJobHistoryPlugin(
 		if (isCameraPresent == True and takeSnapshotAfterPrint == True):
 			self._logger.info("Try capturing snapshot asyc")
 			self._cameraManager.takeSnapshotAsync(
-				CameraManager.buildSnapshotFilename(self._currentPrintJobModel.printStartDateTime),
+				CameraManager.buildSnapshotFilename(printJobModel.printStartDateTime),
 				self._sendErrorMessageToClient,
 				self._sendReloadTableToClient
 			)
 
 
-	def _isThumbnailPresent(self, payload):
-		return self._takeThumbnailImage(payload, storeImage=False)
+	def _isThumbnailPresent(self, payload, printJobModel):
+		return self._takeThumbnailImage(payload, printJobModel, storeImage=False)
 
 
-	def _takeThumbnailImage(self, payload, storeImage=True):
+	def _takeThumbnailImage(self, payload, printJobModel, storeImage=True):
 		self._logger.info("Try reading Thumbnail")
 		thumbnailPresent = False
 		metadata = self._file_manager.get_metadata(payload["origin"], payload["path"])
 		# check if available
 		if ("thumbnail" in metadata):
 			thumbnailPresent = self._cameraManager.takePluginThumbnail(
-				CameraManager.buildSnapshotFilename(self._currentPrintJobModel.printStartDateTime),
+				CameraManager.buildSnapshotFilename(printJobModel.printStartDateTime),
 				metadata["thumbnail"],
 				storeImage=storeImage
 			)
@@ -1156,6 +1269,15 @@ class PrintJobHistoryPlugin(
 		pluginLogger = logging.getLogger(self._logger.name)
 		pluginLogger.addHandler(self._resetableFileLogHandler)
 
+		# incl. the captures pending from the last run
+		self._captureQueue.start()
+
+		# parse the existing uploads in the background
+		self._slicerSettingsCache.start()
+		slicerSettingsExpressions = self._settings.get([SettingsKeys.SETTINGS_KEY_SLICERSETTINGS_KEYVALUE_EXPRESSION])
+		if (slicerSettingsExpressions != None and len(slicerSettingsExpressions) != 0):
+			self._slicerSettingsCache.addFolder(self._settings.getBaseFolder("uploads"), slicerSettingsExpressions)
+
 		self._logger.info("on after startup done")
 		pass
 
@@ -1230,9 +1352,29 @@ class PrintJobHistoryPlugin(
 		# print(event)
 		# print("****************************")
 		# WebBrowser opened
-		# TODO when OP 1.8.0 is release, implement FileMoved event
-		if ("FileMoved" == event):
-			print("******* MOVED ***********")
+		# the reprintable state of the printjobs (part of the cached table results) could be changed
+		if (event in [Events.FILE_ADDED, Events.FILE_REMOVED, "FileMoved", "FolderRemoved", "FolderMoved"]):
+			if (event in [Events.FILE_ADDED, Events.FILE_REMOVED]):
+				PrintJobUtils.invalidateReprintableCache(payload.get("storage"), payload.get("path"))
+			elif ("FileMoved" == event):
+				PrintJobUtils.invalidateReprintableCache(payload.get("source_storage"), payload.get("source_path"))
+				PrintJobUtils.invalidateReprintableCache(payload.get("destination_storage"), payload.get("destination_path"))
+			else:
+				# all files of the folder
+				PrintJobUtils.invalidateReprintableCache()
+			if (hasattr(self, "_databaseManager") == True):
+				self._databaseManager.getResultCache().invalidate()
+
+		# slicer settings of the uploaded/changed gcode files
+		if (event == Events.FILE_ADDED and "gcode" in payload.get("type", [])):
+			self._addFileToSlicerSettingsCache(payload.get("storage"), payload.get("path"))
+		elif (event == Events.METADATA_ANALYSIS_FINISHED):
+			self._addFileToSlicerSettingsCache(payload.get("origin"), payload.get("path"))
+		elif (event == Events.FILE_REMOVED):
+			self._removeFileFromSlicerSettingsCache(payload.get("storage"), payload.get("path"))
+		elif (event == "FileMoved"):
+			self._removeFileFromSlicerSettingsCache(payload.get("source_storage"), payload.get("source_path"))
+			self._addFileToSlicerSettingsCache(payload.get("destination_storage"), payload.get("destination_path"))
 
 		if Events.CLIENT_OPENED == event:
 
@@ -1324,6 +1466,14 @@ class PrintJobHistoryPlugin(
 		sqlLoggingEnabled = self._settings.get_boolean([SettingsKeys.SETTINGS_KEY_SQL_LOGGING_ENABLED])
 		self._databaseManager.showSQLLogging(sqlLoggingEnabled)
 
+		# the key-values of the slicer settings table depend on the expressions
+		self._databaseManager.setSlicerSettingsExpressions(self._settings.get([SettingsKeys.SETTINGS_KEY_SLICERSETTINGS_KEYVALUE_EXPRESSION]))
+		if (self._databaseManager.isSlicerSettingTableUpToDate() == False):
+			# the rebuilds are done one after the other, see DatabaseManager.rebuildSlicerSettings
+			rebuildThread = threading.Thread(name="SlicerSettingsRebuild", target=self._databaseManager.rebuildSlicerSettings)
+			rebuildThread.daemon = True
+			rebuildThread.start()
+
 
 
 	# to allow the frontend to trigger an GET call
@@ -1380,9 +1530,10 @@ class PrintJobHistoryPlugin(
 
 		## Export / Import
 		settings[SettingsKeys.SETTINGS_KEY_IMPORT_CSV_MODE] = SettingsKeys.KEY_IMPORTCSV_MODE_APPEND
+		settings[SettingsKeys.SETTINGS_KEY_IMPORT_CSV_PROCESS_COUNT] = 1
 
 		settings["datbaseSettings"] = {
-			"useExternal": "true",
+			"useExternal": "false",
 			"type": "postgres",
 			"host": "localhost",
 			"port": 5432,
@@ -1391,6 +1542,16 @@ class PrintJobHistoryPlugin(
 			"password": "illO"
 		}
 
+		## Storage
+		settings[SettingsKeys.SETTINGS_KEY_DATABASE_JOURNAL_MODE] = "wal"
+		settings[SettingsKeys.SETTINGS_KEY_DATABASE_SYNCHRONOUS] = "normal"
+		settings[SettingsKeys.SETTINGS_KEY_DATABASE_CACHE_SIZE_KB] = 8192
+		settings[SettingsKeys.SETTINGS_KEY_DATABASE_MMAP_SIZE_MB] = 32
+		settings[SettingsKeys.SETTINGS_KEY_DATABASE_BUSY_TIMEOUT] = 10
+		settings[SettingsKeys.SETTINGS_KEY_DATABASE_WAL_AUTOCHECKPOINT] = 1000
+		settings[SettingsKeys.SETTINGS_KEY_DATABASE_MAX_CONNECTIONS] = 8
+		settings[SettingsKeys.SETTINGS_KEY_DATABASE_STALE_TIMEOUT] = 300
+
 		## Debugging
 		settings[SettingsKeys.SETTINGS_KEY_SQL_LOGGING_ENABLED] = False
 
@@ -5,6 +5,7 @@ import shutil
 import sqlite3
 import tempfile
 import threading
+import time
 
 import octoprint.plugin
 from flask import jsonify, request, make_response, Response, send_file
@@ -26,13 +27,20 @@ from octoprint_PrintJobHistory.api import TransformPrintJob2JSON, TransformSlice
 
 from octoprint_PrintJobHistory.common import StringUtils
 from octoprint_PrintJobHistory.common import PrintJobUtils
+from octoprint_PrintJobHistory.common.ChangeFeed import ChangeFeed
 
 from octoprint_PrintJobHistory.common.SettingsKeys import SettingsKeys
 
 from octoprint_PrintJobHistory.CameraManager import CameraManager
+from octoprint_PrintJobHistory.DatabaseManager import STATISTIC_TIME_SERIES_BUCKETS
 from octoprint_PrintJobHistory.common import CSVExportImporter
 from octoprint_PrintJobHistory.services.SlicerSettingsService import SlicerSettingsService
 
+# seconds between two csv-import status messages to the client
+CSV_IMPORT_STATUS_INTERVAL = 0.5
+# request values without influence on the result (cache-busting, authentication)
+CACHE_KEY_IGNORED_REQUEST_VALUES = ["_", "apikey"]
+
 #############################################################
 # Internal API for all Frontend communications
 #############################################################
@@ -169,6 +177,28 @@ class PrintJobHistoryAPI(octoprint.plugin.BlueprintPlugin):
 									)
 							   )
 
+	# request values as cache key, independent of the order of the values
+	def _buildCacheKeyFromRequest(self, endpointName):
+		requestValues = tuple(sorted((key, value) for key, value in flask.request.values.items(multi=True)
+									 if key not in CACHE_KEY_IGNORED_REQUEST_VALUES))
+		return (endpointName, requestValues)
+
+	# JSON response from the result cache (see DatabaseManager.getResultCache) with an ETag,
+	# if the client already has the current result (If-None-Match) only a 304 is send
+	def _buildCachedJsonResponse(self, cacheKey, calculateResult):
+		# changes of other instances (external database) invalidate the cache, before the ETag is build
+		self._databaseManager.checkExternalChanges()
+		resultCache = self._databaseManager.getResultCache()
+		eTag = resultCache.buildETag(cacheKey)
+		if (flask.request.if_none_match.contains_weak(eTag)):
+			response = flask.Response(status=304)
+		else:
+			response = flask.jsonify(resultCache.get(cacheKey, calculateResult))
+		response.set_etag(eTag)
+		# the browser must always revalidate, the printjobs could be changed by an other client
+		response.headers["Cache-Control"] = "no-cache"
+		return response
+
 	def _createSamplePrintModels(self):
 		return [
 			self._createSamplePrintModel(),
@@ -260,17 +290,76 @@ class PrintJobHistoryAPI(octoprint.plugin.BlueprintPlugin):
 	def get_statisticByQuery(self):
 
 		tableQuery = flask.request.values
-		statistic = self._databaseManager.calculatePrintJobsStatisticByQuery(tableQuery)
-
-		return flask.jsonify(statistic)
+		cacheKey = self._buildCacheKeyFromRequest("loadStatisticByQuery")
+
+		return self._buildCachedJsonResponse(cacheKey, lambda: self._databaseManager.calculatePrintJobsStatisticByQuery(tableQuery))
+
+	#######################################################################################   LOAD STATISTIC TIME SERIES
+	# e.g. /loadStatisticTimeSeries?bucket=day&filterName=onlySuccess&startDate=01.01.2021&endDate=31.01.2021
+	@octoprint.plugin.BlueprintPlugin.route("/loadStatisticTimeSeries", methods=["GET"])
+	def get_statisticTimeSeries(self):
+
+		bucket = flask.request.values.get("bucket", "day")
+		if (bucket not in STATISTIC_TIME_SERIES_BUCKETS):
+			return flask.make_response("Invalid bucket '" + bucket + "', allowed: " + ", ".join(STATISTIC_TIME_SERIES_BUCKETS.keys()), 400)
+		# same filter as the table-query, all optional
+		tableQuery = {
+			"filterName": flask.request.values.get("filterName", "all"),
+			"startDate": flask.request.values.get("startDate", ""),
+			"endDate": flask.request.values.get("endDate", ""),
+			"searchQuery": flask.request.values.get("searchQuery", "")
+		}
+		cacheKey = self._buildCacheKeyFromRequest("loadStatisticTimeSeries")
+		try:
+			return self._buildCachedJsonResponse(cacheKey, lambda: {
+				"bucket": bucket,
+				"series": self._databaseManager.calculatePrintJobsTimeSeriesByQuery(bucket, tableQuery)
+			})
+		except ValueError as e:
+			# e.g. not valid date format
+			return flask.make_response("Invalid request: " + str(e), 400)
 
 	#######################################################################################   COMPARE Slicer Settings
 	@octoprint.plugin.BlueprintPlugin.route("/compareSlicerSettings/", methods=["GET"])
 	def get_compareSlicerSettings(self):
 
+		slicerSettingsExpressions = self._settings.get([SettingsKeys.SETTINGS_KEY_SLICERSETTINGS_KEYVALUE_EXPRESSION])
+		# the compare result depends on the expressions as well
+		cacheKey = self._buildCacheKeyFromRequest("compareSlicerSettings") + (slicerSettingsExpressions,)
+
+		return self._buildCachedJsonResponse(cacheKey, lambda: self._compareSlicerSettings(slicerSettingsExpressions))
+
+	def _compareSlicerSettings(self, slicerSettingsExpressions):
+
 		if "databaseIds" in flask.request.values:
 			selectedDatabaseIds = flask.request.values["databaseIds"]
 
+			if (slicerSettingsExpressions == None or len(slicerSettingsExpressions) == 0):
+				return {}
+
+			# optional, e.g. onlyDifferentKeys=true&keyFrom=0&keyTo=200
+			onlyDifferentKeys = flask.request.values.get("onlyDifferentKeys", "false") == "true"
+			keyFrom = StringUtils.transformToIntOrNone(flask.request.values.get("keyFrom", None))
+			keyTo = StringUtils.transformToIntOrNone(flask.request.values.get("keyTo", None))
+
+			slicerService = SlicerSettingsService(self._logger)
+			# already extracted key-values, without loading/parsing the settings text of each printjob
+			selectedSlicerSettings = self._databaseManager.loadSelectedSlicerSettings(selectedDatabaseIds, slicerSettingsExpressions)
+			if (selectedSlicerSettings != None):
+				slicerSettingssJobToCompareList = []
+				for selectedSlicerSetting in selectedSlicerSettings:
+					settingsForCompare = SlicerSettingsService.SlicerSettingsJob()
+					settingsForCompare.databaseId = selectedSlicerSetting["databaseId"]
+					settingsForCompare.fileName = selectedSlicerSetting["fileName"]
+					# not loaded
+					settingsForCompare.slicerSettingsAsText = None
+					slicerSettingssJobToCompareList.append(settingsForCompare)
+				compareResult = slicerService.compareExtractedSlicerSettings(slicerSettingssJobToCompareList,
+																			 [selectedSlicerSetting["keyValues"] for selectedSlicerSetting in selectedSlicerSettings],
+																			 onlyDifferentKeys, keyFrom, keyTo)
+				return TransformSlicerSettings2JSON.transformSlicerSettingsCompareResult(compareResult)
+
+			# e.g. the slicer settings table is rebuild after the slicer expressions were changed
 			# selectedDatabaseIds = "21, 17"
 			allJobsModels = self._databaseManager.loadSelectedPrintJobs(selectedDatabaseIds)
 
@@ -283,31 +372,101 @@ class PrintJobHistoryAPI(octoprint.plugin.BlueprintPlugin):
 
 				slicerSettingssJobToCompareList.append(settingsForCompare)
 
-			slicerService = SlicerSettingsService(self._logger)
-			slicerSettingsExpressions = self._settings.get([SettingsKeys.SETTINGS_KEY_SLICERSETTINGS_KEYVALUE_EXPRESSION])
-			if (slicerSettingsExpressions != None and len(slicerSettingsExpressions) != 0):
-				compareResult = slicerService.compareSlicerSettings(slicerSettingssJobToCompareList, slicerSettingsExpressions)
-				compoareResultAsJson = TransformSlicerSettings2JSON.transformSlicerSettingsCompareResult(compareResult)
+			compareResult = slicerService.compareSlicerSettings(slicerSettingssJobToCompareList, slicerSettingsExpressions,
+																onlyDifferentKeys, keyFrom, keyTo)
+			compoareResultAsJson = TransformSlicerSettings2JSON.transformSlicerSettingsCompareResult(compareResult)
 
-				return flask.jsonify(compoareResultAsJson)
+			return compoareResultAsJson
 
-		return flask.jsonify()
+		return {}
 
 	#######################################################################################   LOAD ALL JOBS BY QUERY
 	@octoprint.plugin.BlueprintPlugin.route("/loadPrintJobHistoryByQuery", methods=["GET"])
 	def get_printjobhistoryByQuery(self):
 
 		tableQuery = flask.request.values
-		allJobsModels = self._databaseManager.loadPrintJobsByQuery(tableQuery)
+		cacheKey = self._buildCacheKeyFromRequest("loadPrintJobHistoryByQuery")
+
+		return self._buildCachedJsonResponse(cacheKey, lambda: self._loadPrintJobHistoryByQuery(tableQuery))
+
+	def _loadPrintJobHistoryByQuery(self, tableQuery):
+		# before loading, so a change during the loading is send to the client again (see loadPrintJobHistoryChanges)
+		lastChangeId = self._databaseManager.getChangeFeed().getLastChangeId()
+		nextCursor = None
+		if ("cursor" in tableQuery):
+			# keyset pagination, the client sends the 'nextCursor' of the previous page (empty for first page)
+			allJobRows, nextCursor = self._databaseManager.loadPrintJobsByCursor(tableQuery, asDicts=True)
+		else:
+			allJobRows = self._databaseManager.loadPrintJobsByQuery(tableQuery, asDicts=True)
 		# allJobsAsDict = self._convertPrintJobHistoryModelsToDict(allJobsModels)
 		# selectedFile = self._file_manager.path_on_disk(fileLocation, selectedFilename)
-		allJobsAsDict = TransformPrintJob2JSON.transformAllPrintJobModels(allJobsModels, self._file_manager)
-
-		totalItemCount = self._databaseManager.countPrintJobsByQuery(tableQuery)
+		# plain rows, without model instances
+		allJobsAsDict = TransformPrintJob2JSON.transformAllPrintJobRows(allJobRows, self._file_manager)
+
+		# counting is a full scan, so the client can skip it (e.g. for the next pages)
+		totalItemCount = None
+		if (tableQuery.get("withTotalCount", "true") != "false"):
+			totalItemCount = self._databaseManager.countPrintJobsByQuery(tableQuery)
+		return {
+			"totalItemCount": totalItemCount,
+			"allPrintJobs": allJobsAsDict,
+			"nextCursor": nextCursor,
+			"lastChangeId": lastChangeId
+		}
+
+	#######################################################################################   LOAD CHANGED JOBS
+	# Only the printjobs changed since the last sync of the client (sinceChangeId = lastChangeId of the
+	# table response or of the last change), instead of reloading the complete table
+	@octoprint.plugin.BlueprintPlugin.route("/loadPrintJobHistoryChanges", methods=["GET"])
+	def get_printjobhistoryChanges(self):
+		# changes of other instances (external database) are a "reload" in the change feed
+		self._databaseManager.checkExternalChanges()
+		changeFeed = self._databaseManager.getChangeFeed()
+		lastChangeId = changeFeed.getLastChangeId()
+		allChanges = changeFeed.getChangesSince(flask.request.values.get("sinceChangeId"))
+		if (allChanges == None):
+			# client is too far behind
+			return flask.jsonify({
+				"fullReload": True,
+				"lastChangeId": lastChangeId,
+				"changes": []
+			})
 		return flask.jsonify({
-								"totalItemCount": totalItemCount,
-								"allPrintJobs": allJobsAsDict
-							})
+			"fullReload": False,
+			"lastChangeId": lastChangeId,
+			"changes": self._buildPrintJobChanges(allChanges)
+		})
+
+	# only the last change per printjob, insert/update incl. the current printjob as JSON ("printJobItem")
+	def _buildPrintJobChanges(self, allChanges):
+		lastChangeByDatabaseId = dict()
+		for change in allChanges:
+			previousChange = lastChangeByDatabaseId.pop(change["databaseId"], None)
+			change = dict(change)
+			if (previousChange != None and previousChange["changeType"] == ChangeFeed.CHANGE_TYPE_INSERT and change["changeType"] == ChangeFeed.CHANGE_TYPE_UPDATE):
+				# the client doesn't know the printjob yet
+				change["changeType"] = ChangeFeed.CHANGE_TYPE_INSERT
+			lastChangeByDatabaseId[change["databaseId"]] = change
+
+		changedDatabaseIds = []
+		for databaseId, change in lastChangeByDatabaseId.items():
+			if (change["changeType"] != ChangeFeed.CHANGE_TYPE_DELETE):
+				changedDatabaseIds.append(str(databaseId))
+		printJobItemsByDatabaseId = dict()
+		if (len(changedDatabaseIds) != 0):
+			allJobRows = self._databaseManager.loadSelectedPrintJobs(",".join(changedDatabaseIds), asDicts=True)
+			for jobAsDict in TransformPrintJob2JSON.transformAllPrintJobRows(allJobRows, self._file_manager):
+				printJobItemsByDatabaseId[jobAsDict["databaseId"]] = jobAsDict
+
+		result = []
+		for databaseId, change in lastChangeByDatabaseId.items():
+			if (change["changeType"] != ChangeFeed.CHANGE_TYPE_DELETE):
+				change["printJobItem"] = printJobItemsByDatabaseId.get(databaseId)
+				if (change["printJobItem"] == None):
+					# already deleted again
+					change["changeType"] = ChangeFeed.CHANGE_TYPE_DELETE
+			result.append(change)
+		return result
 
 	#######################################################################################   SELECT JOB FOR PRINTING
 	@octoprint.plugin.BlueprintPlugin.route("/selectPrintJobForPrint/<int:databaseId>", methods=["PUT"])
@@ -323,10 +482,12 @@ class PrintJobHistoryAPI(octoprint.plugin.BlueprintPlugin):
 										message=message))
 			return flask.jsonify()
 
+		# without cache, the file must be there now
 		printJobPrintable = PrintJobUtils.isPrintJobReprintable(self._file_manager,
 																printJobModel.fileOrigin,
 																printJobModel.filePathName,
-																printJobModel.fileName)
+																printJobModel.fileName,
+																useCache=False)
 		fullFileLocation = printJobPrintable["fullFileLocation"]
 		if (printJobPrintable["isRePrintable"] == False):
 			message = "PrintJob not found in: " +fullFileLocation
@@ -483,6 +644,10 @@ class PrintJobHistoryAPI(octoprint.plugin.BlueprintPlugin):
 	#######################################################################################   DOWNLOAD DATABASE-FILE
 	@octoprint.plugin.BlueprintPlugin.route("/downloadDatabase", methods=["GET"])
 	def get_download_database(self):
+		if (self._databaseManager.isExternalDatabase() == True):
+			return flask.make_response("Download not possible, the printjobs are stored in an external database", 400)
+		# all changes from the WAL-file into the database-file
+		self._databaseManager.checkpointDatabase()
 		return send_file(self._databaseManager.getDatabaseFileLocation(),
 						 mimetype='application/octet-stream',
 						 attachment_filename='printJobHistory.db',
@@ -492,6 +657,9 @@ class PrintJobHistoryAPI(octoprint.plugin.BlueprintPlugin):
 	#######################################################################################   DELETE DATABASE
 	@octoprint.plugin.BlueprintPlugin.route("/deleteDatabase", methods=["DELETE"])
 	def delete_database(self):
+		# the external database contains the printjobs of all printers
+		if (self._databaseManager.isExternalDatabase() == True):
+			return flask.make_response("Delete not possible, the printjobs are stored in an external database", 400)
 
 		self._databaseManager.reCreateDatabase()
 
@@ -508,11 +676,14 @@ class PrintJobHistoryAPI(octoprint.plugin.BlueprintPlugin):
 				selectedDatabaseIds = flask.request.values["databaseIds"]
 				allJobsModels = self._databaseManager.loadSelectedPrintJobs(selectedDatabaseIds)
 			else:
-				allJobsModels = self._databaseManager.loadAllPrintJobs()
+				# streamed in chunks, without loading all printjobs into memory
+				allJobsModels = self._databaseManager.iterateAllPrintJobs()
 
+			currentDate = datetime.now().strftime("%Y%m%d-%H%M")
+			# no Content-Length -> chunked response
 			return Response(CSVExportImporter.transform2CSV(allJobsModels),
 							mimetype='text/csv',
-							headers={'Content-Disposition': 'attachment; filename=OctoprintPrintJobHistory.csv'}) # TODO add timestamp
+							headers={'Content-Disposition': 'attachment; filename=OctoprintPrintJobHistory-' + currentDate + '.csv'})
 
 		else:
 			if (exportType == "legacyPrintHistory"):
@@ -543,61 +714,78 @@ class PrintJobHistoryAPI(octoprint.plugin.BlueprintPlugin):
 
 	######################################################################################   UPLOAD CSV FILE (in Thread)
 
-	def _processCSVUploadAsync(self, path, importCSVMode, databaseManager, cameraManager, backupFolder, sendCSVUploadStatusToClient, logger):
+	def _processCSVUploadAsync(self, path, importCSVMode, processCount, databaseManager, cameraManager, backupFolder, sendCSVUploadStatusToClient, logger):
 		errorCollection = list()
 
-		# - parsing
+		# - parsing (validation only, nothing is kept in memory)
 		# - backup
 		# - append or replace
+		# - parsing again and insert the printjobs in batches
 
+		# only every CSV_IMPORT_STATUS_INTERVAL seconds a message, not for every line
+		lastStatusUpdate = {"time": 0}
 		def updateParsingStatus(lineNumber):
+			now = time.time()
+			if (now - lastStatusUpdate["time"] < CSV_IMPORT_STATUS_INTERVAL):
+				return
+			lastStatusUpdate["time"] = now
 			# importStatus, currenLineNumber, backupFilePath, backupSnapshotFilePath, successMessages, errorCollection
 			sendCSVUploadStatusToClient("running", lineNumber, "", "", "", errorCollection)
 
+		try:
+			printJobCount = 0
+			for printJobModel in CSVExportImporter.iterateCSV(path, updateParsingStatus, errorCollection, logger, processCount):
+				printJobCount += 1
+
+			if (len(errorCollection) != 0):
+				successMessage = "Some error(s) occurs during parsing! No jobs imported!"
+				sendCSVUploadStatusToClient("finished", "", "", "", successMessage, errorCollection)
+				return
+
+			importModeText = "append"
+			backupDatabaseFilePath = None
+			backupSnapshotFilePath = None
+			if (printJobCount > 0):
+				# we could import some jobs
+
+				# - backup
+				backupDatabaseFilePath = databaseManager.backupDatabaseFile(backupFolder)
+				backupSnapshotFilePath = cameraManager.backupAllSnapshots(backupFolder)
+
+				# - import mode append/replace
+				if (SettingsKeys.KEY_IMPORTCSV_MODE_REPLACE == importCSVMode):
+					# delete old database and init a clean database
+					if (databaseManager.reCreateDatabase() == False):
+						successMessage = "Replace not possible, the printjobs are stored in an external database! No jobs imported!"
+						sendCSVUploadStatusToClient("finished", "", backupDatabaseFilePath, backupSnapshotFilePath, successMessage, errorCollection)
+						return
+					cameraManager.reCreateSnapshotFolder()
+
+					importModeText = "fully replaced"
+
+				# - insert all printjobs in database (in batches), the file is already validated
+				lastStatusUpdate["time"] = 0
+				allPrintJobModels = CSVExportImporter.iterateCSV(path, lambda lineNumber: None, errorCollection, logger, processCount)
+				insertedCount = databaseManager.insertPrintJobs(allPrintJobModels, insertedCallback=updateParsingStatus)
+				if (insertedCount != printJobCount):
+					errorCollection.append("Only '" + str(insertedCount) + "' of '" + str(printJobCount) + "' print jobs imported. See OctoPrint.log for details!")
+				pass
+			else:
+				errorCollection.append("Nothing to import!")
 
-		resultOfPrintJobs = CSVExportImporter.parseCSV(path, updateParsingStatus, errorCollection, logger)
-
-		if (len(errorCollection) != 0):
-			successMessage = "Some error(s) occurs during parsing! No jobs imported!"
-			sendCSVUploadStatusToClient("finished", "", "", "", successMessage, errorCollection)
-			return
-
-		importModeText = "append"
-		backupDatabaseFilePath = None
-		backupSnapshotFilePath = None
-		if (len(resultOfPrintJobs) > 0):
-			# we could import some jobs
-
-			# - backup
-			backupDatabaseFilePath = databaseManager.backupDatabaseFile(backupFolder)
-			backupSnapshotFilePath = cameraManager.backupAllSnapshots(backupFolder)
-
-			# - import mode append/replace
-			if (SettingsKeys.KEY_IMPORTCSV_MODE_REPLACE == importCSVMode):
-				# delete old database and init a clean database
-				databaseManager.reCreateDatabase()
-				cameraManager.reCreateSnapshotFolder()
-
-				importModeText = "fully replaced"
-
-			# - insert all printjobs in database
-			currentPrintJobNumber = 0
-			for printJob in resultOfPrintJobs:
-				currentPrintJobNumber = currentPrintJobNumber + 1
-				updateParsingStatus(currentPrintJobNumber)
-				databaseManager.insertPrintJob(printJob)
-				# print(printJob)
-			pass
-		else:
-			errorCollection.append("Nothing to import!")
-
-		successMessage = ""
-		if (len(errorCollection) == 0):
-			successMessage = "All data is successful " + importModeText + " with '" + str(len(resultOfPrintJobs)) + "' print jobs."
-		else:
-			successMessage = "Some error(s) occurs! Maybe you need to manually rollback the database!"
+			successMessage = ""
+			if (len(errorCollection) == 0):
+				successMessage = "All data is successful " + importModeText + " with '" + str(printJobCount) + "' print jobs."
+			else:
+				successMessage = "Some error(s) occurs! Maybe you need to manually rollback the database!"
 
-		sendCSVUploadStatusToClient("finished","", backupDatabaseFilePath, backupSnapshotFilePath, successMessage, errorCollection)
+			sendCSVUploadStatusToClient("finished","", backupDatabaseFilePath, backupSnapshotFilePath, successMessage, errorCollection)
+		finally:
+			logger.info("Removing uploded csv temp-file")
+			try:
+				os.remove(path)
+			except Exception:
+				pass
 		pass
 
 
@@ -610,6 +798,13 @@ class PrintJobHistoryAPI(octoprint.plugin.BlueprintPlugin):
 		if input_upload_path in flask.request.values:
 
 			importMode = flask.request.form["importCSVMode"]
+			if (SettingsKeys.KEY_IMPORTCSV_MODE_REPLACE == importMode and self._databaseManager.isExternalDatabase() == True):
+				# the external database contains the printjobs of all printers
+				return flask.make_response("Replace not possible, the printjobs are stored in an external database", 400)
+			# >1 parse the lines in parallel worker processes
+			processCount = StringUtils.transformToIntOrNone(self._settings.get([SettingsKeys.SETTINGS_KEY_IMPORT_CSV_PROCESS_COUNT]))
+			if (processCount == None or processCount < 1):
+				processCount = 1
 			# file was uploaded
 			sourceLocation = flask.request.values[input_upload_path]
 
@@ -623,6 +818,7 @@ class PrintJobHistoryAPI(octoprint.plugin.BlueprintPlugin):
 			thread = threading.Thread(target=self._processCSVUploadAsync,
 									  args=(sourceLocation,
 											importMode,
+											processCount,
 											self._databaseManager,
 											self._cameraManager,
 											self.get_plugin_data_folder(),
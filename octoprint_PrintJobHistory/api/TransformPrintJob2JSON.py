@@ -6,86 +6,134 @@ from octoprint_PrintJobHistory.CameraManager import CameraManager
 from octoprint_PrintJobHistory.common import StringUtils
 from octoprint_PrintJobHistory.common import PrintJobUtils
 
+DATE_TIME_FORMAT = '%d.%m.%Y %H:%M'
+_formatTwoDecimals = "{:.02f}".format
+
 def transformPrintJobModel(job, fileManager, deleteDateTimeFromDict = True):
-	jobAsDict = job.__data__
-
-	jobAsDict["printStartDateTimeFormatted"] = job.printStartDateTime.strftime('%d.%m.%Y %H:%M')
-	if (job.printEndDateTime):
-		jobAsDict["printEndDateTimeFormatted"] = job.printEndDateTime.strftime('%d.%m.%Y %H:%M')
-	# # Calculate duration
-	# duration = job.printEndDateTime - job.printStartDateTime
-	duration = job.duration
-	durationFormatted = StringUtils.secondsToText(duration)
-	jobAsDict["durationFormatted"] = durationFormatted
-
-	fileSize = job.fileSize
-	fileSizeFormatted = StringUtils.get_formatted_size(fileSize)
-	jobAsDict["fileSizeFormatted"] = fileSizeFormatted
+	# only copies of __data__, the model is not changed (could be saved afterwards)
+	jobAsDict = _copyModelData(job)
 	# -- filament
+	allFilamentDicts = None
 	allFilaments = job.getFilamentModels()
 	if allFilaments != None:
-		allFilamentDict = {}
+		allFilamentDicts = []
 		for filament in allFilaments:
+			allFilamentDicts.append(_copyModelData(filament))
+	# -- temperatures
+	allTemperatureDicts = []
+	allTemperatures = job.getTemperatureModels()
+	if not allTemperatures == None:
+		for temp in allTemperatures:
+			allTemperatureDicts.append(temp.__data__)
+	# -- costs
+	costsAsDict = None
+	costs = job.getCosts()
+	if (costs != None):
+		costsAsDict = _copyModelData(costs)
+
+	return _transformPrintJobDict(jobAsDict, allFilamentDicts, allTemperatureDicts, costsAsDict, fileManager, deleteDateTimeFromDict)
+
+def transformAllPrintJobModels(allJobsModels, fileManager, deleteDateTimeFromDict = True):
+
+	result = []
+	for job in allJobsModels:
+		jobAsDict = transformPrintJobModel(job, fileManager, deleteDateTimeFromDict)
+		result.append(jobAsDict)
+
+	return result
+
+# Same result as transformPrintJobModel, but for the plain printjob rows of
+# DatabaseManager.loadPrintJobsByQuery/loadPrintJobsByCursor(asDicts=True), so no model instances are needed.
+# The row is a fresh dict of the query and is reused for the result.
+def transformPrintJobRow(jobRow, fileManager):
+	jobAsDict = jobRow
+	jobAsDict.pop("cursorSortValue", None)
+	allFilamentDicts = jobAsDict.pop("filamentRows")
+	allTemperatureDicts = jobAsDict.pop("temperatureRows")
+	costRows = jobAsDict.pop("costRows")
+	costsAsDict = costRows[0] if len(costRows) > 0 else None
+
+	return _transformPrintJobDict(jobAsDict, allFilamentDicts, allTemperatureDicts, costsAsDict, fileManager, True)
 
-			filamentDict = filament.__data__
-			filamentDict["usedWeight"] = StringUtils.formatFloatSave("{:.02f}", filamentDict["usedWeight"], "")
+def transformAllPrintJobRows(allJobRows, fileManager):
 
-			filamentDict["usedLengthFormatted"] = StringUtils.formatFloatSave("{:.02f}", convertMM2M(filamentDict["usedLength"]), "")
-			filamentDict["calculatedLengthFormatted"] = StringUtils.formatFloatSave("{:.02f}", convertMM2M(filamentDict["calculatedLength"]), "")
+	result = []
+	for jobRow in allJobRows:
+		result.append(transformPrintJobRow(jobRow, fileManager))
+
+	return result
+
+def _transformPrintJobDict(jobAsDict, allFilamentDicts, allTemperatureDicts, costsAsDict, fileManager, deleteDateTimeFromDict):
+	printStartDateTime = jobAsDict.get("printStartDateTime")
+	printEndDateTime = jobAsDict.get("printEndDateTime")
+
+	jobAsDict["printStartDateTimeFormatted"] = printStartDateTime.strftime(DATE_TIME_FORMAT)
+	if (printEndDateTime):
+		jobAsDict["printEndDateTimeFormatted"] = printEndDateTime.strftime(DATE_TIME_FORMAT)
+	jobAsDict["durationFormatted"] = StringUtils.secondsToText(jobAsDict.get("duration"))
+	jobAsDict["fileSizeFormatted"] = StringUtils.get_formatted_size(jobAsDict.get("fileSize"))
+	# -- filament
+	if allFilamentDicts != None:
+		allFilamentDict = {}
+		for filamentDict in allFilamentDicts:
+			filamentDict["usedWeight"] = _formatFloat(filamentDict.get("usedWeight"))
+
+			filamentDict["usedLengthFormatted"] = _formatFloat(convertMM2M(filamentDict.get("usedLength")))
+			filamentDict["calculatedLengthFormatted"] = _formatFloat(convertMM2M(filamentDict.get("calculatedLength")))
 
-			filamentDict["usedCost"] = StringUtils.formatFloatSave("{:.02f}", filamentDict["usedCost"], "")
+			filamentDict["usedCost"] = _formatFloat(filamentDict.get("usedCost"))
 			# remove datetime, because not json serializable
 			if (deleteDateTimeFromDict):
-				del filamentDict["created"]
+				filamentDict.pop("created", None)
 			# put to overall model
 			allFilamentDict[filamentDict["toolId"]] = filamentDict
 
 		jobAsDict['filamentModels'] = allFilamentDict
 	# -- temperatures
-	allTemperatures = job.getTemperatureModels()
-	if not allTemperatures == None and len(allTemperatures) > 0:
+	if len(allTemperatureDicts) > 0:
 		allTempsAsList = list()
 
-		for temp in allTemperatures:
+		for temp in allTemperatureDicts:
 			tempAsDict = dict()
-			tempAsDict["sensorName"] = temp.sensorName
-			tempAsDict["sensorValue"] = temp.sensorValue
+			tempAsDict["sensorName"] = temp["sensorName"]
+			tempAsDict["sensorValue"] = temp["sensorValue"]
 			allTempsAsList.append(tempAsDict)
 
 		jobAsDict["temperatureModels"] = allTempsAsList
 	# -- costs
 	isCostsAvailable = False
-	costs = job.getCosts()
-	if (costs != None):
-		costsAsDict = costs.__data__
-		del costsAsDict["created"]
+	if (costsAsDict != None):
+		costsAsDict.pop("created", None)
 		jobAsDict["costs"] = costsAsDict
 		isCostsAvailable = True
 	jobAsDict["isCostsAvailable"] = isCostsAvailable
 	# -- images
-	jobAsDict["snapshotFilename"] = CameraManager.buildSnapshotFilename(job.printStartDateTime)
+	jobAsDict["snapshotFilename"] = CameraManager.buildSnapshotFilename(printStartDateTime)
 	# remove timedelta object, because could not transfered to client
 	if (deleteDateTimeFromDict):
-		del jobAsDict["printStartDateTime"]
-		del jobAsDict["printEndDateTime"]
-		del jobAsDict["created"]
+		jobAsDict.pop("printStartDateTime", None)
+		jobAsDict.pop("printEndDateTime", None)
+		jobAsDict.pop("created", None)
 
 	# not the best approach to check this value here
-	printJobReprintable = PrintJobUtils.isPrintJobReprintable(fileManager, job.fileOrigin, job.filePathName, job.fileName)
+	printJobReprintable = PrintJobUtils.isPrintJobReprintable(fileManager, jobAsDict.get("fileOrigin"), jobAsDict.get("filePathName"), jobAsDict.get("fileName"))
 
 	jobAsDict["isRePrintable"] = printJobReprintable["isRePrintable"]
 	jobAsDict["fullFileLocation"] = printJobReprintable["fullFileLocation"]
 
 	return jobAsDict
 
-def transformAllPrintJobModels(allJobsModels, fileManager, deleteDateTimeFromDict = True):
-
-	result = []
-	for job in allJobsModels:
-		jobAsDict = transformPrintJobModel(job, fileManager, deleteDateTimeFromDict)
-		result.append(jobAsDict)
-
-	return result
+# all fields, also the not assigned ones of a not loaded model (e.g. directly after the capture)
+def _copyModelData(model):
+	modelData = dict.fromkeys(model._meta.fields.keys(), None)
+	modelData.update(model.__data__)
+	return modelData
+
+# same as StringUtils.formatFloatSave("{:.02f}", value, ""), without parsing the pattern for each value
+def _formatFloat(value):
+	if (isinstance(value, float)):
+		return _formatTwoDecimals(value)
+	return ""
 
 #  convert mm to m
 def convertMM2M(value):
@@ -14,7 +14,7 @@ def transformSlicerSettingsCompareResult(compareResult):
 		return obj.__dict__
 
 	import json
-	compareResultAsJson = json.dumps(compareResult.__dict__, default=serialize, indent=4)
+	compareResultAsJson = json.dumps(compareResult.__dict__, default=serialize, separators=(",", ":"))
 	return compareResultAsJson
 
 
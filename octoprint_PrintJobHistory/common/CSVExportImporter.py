@@ -1,7 +1,9 @@
+import collections
 import io
 from io import StringIO
 import csv
 import datetime
+import multiprocessing
 import os
 import re
 
@@ -200,7 +202,7 @@ class TemperaturCSVFormattorParser:
 		valueToFormat = getattr(printJob, fieldName)
 
 		if (valueToFormat == None):
-			valueToFormat = printJob.temperatures
+			valueToFormat = printJob.getTemperatureModels()
 
 		if valueToFormat is None:
 			return "-"
@@ -434,39 +436,34 @@ ALL_COLUMNS = {
 
 ####################################################################################################### -> EXPORT TO CSV
 
-def transform2CSV(allJobsDict):
-	result = None
-	si = StringIO()	#TODO maybe a bad idea to use a internal memory based string, needs to be switched to response stream
-	# si = io.BytesIO()
+# Number of printjobs written into the buffer before it is yielded
+CSV_EXPORT_ROWS_PER_CHUNK = 200
+
+# Generator of CSV-bytes (utf-8), one chunk per CSV_EXPORT_ROWS_PER_CHUNK printjobs
+# allJobsModels could be a generator (e.g. DatabaseManager.iterateAllPrintJobs), so only one chunk is in memory
+def transform2CSV(allJobsModels):
+	# buffer is reused for all chunks
+	si = StringIO()
+	writer = csv.writer(si, quoting=csv.QUOTE_ALL, lineterminator="\n")
+
+	allColumns = [ALL_COLUMNS[columnKey] for columnKey in ALL_COLUMNS_SORTED]
 
-	writer = csv.writer(si, quoting=csv.QUOTE_ALL)
 	#  Write HEADER
-	headerList = list()
-	csvLine = ""
-	for columnKey in ALL_COLUMNS_SORTED:
-		csvColumn = ALL_COLUMNS[columnKey]
-		label = '"' + csvColumn.columnLabel + '"'
-		headerList.append(label)
-
-	csvLine =  "," .join(headerList) + "\n"
-	# writer.writerow(headerList)
-	# print(csvLine)
-	yield csvLine
+	writer.writerow([csvColumn.columnLabel for csvColumn in allColumns])
 
 	# Write CSV-Content
-	for job in allJobsDict:
-		csvRow = list()
-		for columnKey in ALL_COLUMNS_SORTED:
-			# print(columnKey)
-			csvColumn = ALL_COLUMNS[columnKey]
-			csvColumnValue = '"' + csvColumn.getCSV(job)  + '"'
-			csvRow.append(csvColumnValue)
-		csvLine = ",".join(csvRow) + "\n"
-		# print(csvLine)
-		yield csvLine
-		# writer.writerow(csvRow)
-	# result = si.getvalue()
-	# return result
+	rowCount = 0
+	for job in allJobsModels:
+		writer.writerow([csvColumn.getCSV(job) for csvColumn in allColumns])
+		rowCount += 1
+		if (rowCount % CSV_EXPORT_ROWS_PER_CHUNK == 0):
+			yield si.getvalue().encode("utf-8")
+			si.seek(0)
+			si.truncate(0)
+
+	# rest (and header, if no jobs)
+	if (si.tell() != 0):
+		yield si.getvalue().encode("utf-8")
 
 
 ########################################################################################################## -> IMPORT CSV
@@ -479,12 +476,39 @@ mandatoryFieldNames = [
 
 # mandatoryFieldAvaiable = list()
 
-columnOrderInFile = dict()
+# Lines per task for the parallel parsing (see iterateCSV processCount)
+CSV_PARSE_LINES_PER_TASK = 1000
 
 
 def parseCSV(csvFile4Import, updateParsingStatus, errorCollection, logger, deleteAfterParsing=True):
 
 	result = list()	# List with printJobModels
+	try:
+		for printJobModel in iterateCSV(csvFile4Import, updateParsingStatus, errorCollection, logger):
+			result.append(printJobModel)
+	finally:
+		if (deleteAfterParsing):
+			logger.info("Removing uploded csv temp-file")
+			try:
+				os.remove(csvFile4Import)
+			except Exception:
+				pass
+	return result
+
+# Generator of the parsed printJobModels, so only one line is in memory.
+# After the first error no printjob is yielded anymore, but all other lines are still parsed to collect all errors.
+# The file is not deleted, e.g. to parse it again:
+#  - first run to validate the whole file (errorCollection)
+#  - second run to stream the printjobs into the database
+# processCount > 1: the lines are parsed in parallel by worker processes (same result/order, useful for huge files)
+def iterateCSV(csvFile4Import, updateParsingStatus, errorCollection, logger, processCount=1):
+	if (processCount > 1):
+		return _iterateCSVParallel(csvFile4Import, updateParsingStatus, errorCollection, logger, processCount)
+	return _iterateCSVSequential(csvFile4Import, updateParsingStatus, errorCollection, logger)
+
+def _iterateCSVSequential(csvFile4Import, updateParsingStatus, errorCollection, logger):
+
+	columnOrderInFile = None
 	lineNumber = 0
 	try:
 		with open(csvFile4Import) as csv_file:
@@ -498,68 +522,169 @@ def parseCSV(csvFile4Import, updateParsingStatus, errorCollection, logger, delet
 				updateParsingStatus(str(lineNumber))
 
 				if lineNumber == 1:
-					# createColumnOrderFromHeader(row)
-					# mandatoryFieldCount = 0
-					mandatoryFieldAvaiable = list()
-					columnIndex = 0
-					for column in row:
-						column = column.strip()
-						if column in ALL_COLUMNS:
-							columnOrderInFile[columnIndex] = ALL_COLUMNS[column]
-							if column in mandatoryFieldNames:
-								mandatoryFieldAvaiable.append(column)
-								# mandatoryFieldCount += 1
-						columnIndex += 1
-					if len(mandatoryFieldAvaiable) != len(mandatoryFieldNames):
-					# if mandatoryFieldCount != len(mandatoryFieldNames):
-						# identify missing files
-						# mandatoryFieldMissing = mandatoryFieldNames - mandatoryFieldAvaiable
-						mandatoryFieldMissing = list( set(mandatoryFieldNames) - set(mandatoryFieldAvaiable) )
-						errorCollection.append("Mandatory column is missing! <br/><b>'" + "".join(mandatoryFieldMissing) + "'</b><br/>")
+					columnOrderInFile = _readColumnOrderFromHeader(row, errorCollection)
+					if (columnOrderInFile == None):
 						break
 				else:
-					# pre check, do we have values in the line?
-					isEmptyLine = True
-					for columnValue in row:
-						if (StringUtils.isNotEmpty(columnValue)):
-							isEmptyLine = False
-							break
-					if (isEmptyLine == True):
-						# errorCollection.append("CSV Line: "+str(lineNumber)+" without values! <br/>")
-						# just skip this line
+					printJobModel = _parseRow(row, lineNumber, columnOrderInFile, errorCollection)
+					if (printJobModel == None):
+						# just skip this empty line
 						continue
-					printJobModel = PrintJobModel()
-					# parse line with header defined order
-					columnIndex = 0
-					for columnValue in row:
-						if columnIndex in columnOrderInFile:
-							csvColumn = columnOrderInFile[columnIndex]
-							if not csvColumn == None:
-								columnValue = columnValue.strip()
-								# check if mandatory value is missing
-								if (len(columnValue) == 0):
-									columnName = csvColumn.columnLabel
-									if columnName in mandatoryFieldNames:
-										errorCollection.append("["+str(lineNumber)+"] Mandatory value for column '" + columnName + "' is missing!")
-										pass
-								else:
-									csvColumn.parseAndAssignFieldValue(columnValue, printJobModel, errorCollection, lineNumber)
-								pass
-						columnIndex += 1
 					if (len(errorCollection) != 0):
-						logger.error("Reading error line '" + str(lineNumber) + "' in Column '" + column + "' ")
+						logger.error("Reading error line '" + str(lineNumber) + "'")
 					else:
-						result.append(printJobModel)
+						yield printJobModel
 			pass
 	except Exception as e:
 		errorMessage = "CSV Parsing error. Line:'" + str(lineNumber) + "' Error:'" + str(e) + "' File:'" + csvFile4Import + "'"
 		errorCollection.append(errorMessage)
 		logger.error(errorMessage)
+
+# The main process reads the lines and sends them in tasks of CSV_PARSE_LINES_PER_TASK lines to the worker processes.
+# The workers return plain dicts (no peewee-models over process borders) and the errors of each line, the results are
+# processed in the original line order, so errorCollection and yielded printjobs are the same as sequential
+# Only 2 tasks per process are pending, so the memory stays flat
+def _iterateCSVParallel(csvFile4Import, updateParsingStatus, errorCollection, logger, processCount):
+
+	lineNumber = 0
+	pool = None
+	try:
+		with open(csvFile4Import) as csv_file:
+			csv_reader = csv.reader(csv_file, delimiter=',')
+			headerRow = next(csv_reader, None)
+			if (headerRow == None):
+				return
+			lineNumber = 1
+			updateParsingStatus(str(lineNumber))
+			if (_readColumnOrderFromHeader(headerRow, errorCollection) == None):
+				return
+
+			# spawn instead of fork: a forked worker would inherit the threads, locks and database connections of OctoPrint
+			pool = multiprocessing.get_context("spawn").Pool(processCount)
+			pendingResults = collections.deque()
+			taskLines = []
+			for row in csv_reader:
+				lineNumber += 1
+				taskLines.append(row)
+				if (len(taskLines) == CSV_PARSE_LINES_PER_TASK):
+					pendingResults.append(pool.apply_async(_parseLinesTask, (headerRow, lineNumber - len(taskLines) + 1, taskLines)))
+					taskLines = []
+					if (len(pendingResults) >= processCount * 2):
+						for printJobModel in _processTaskResult(pendingResults.popleft().get(), updateParsingStatus, errorCollection, logger):
+							yield printJobModel
+			if (len(taskLines) != 0):
+				pendingResults.append(pool.apply_async(_parseLinesTask, (headerRow, lineNumber - len(taskLines) + 1, taskLines)))
+			while (len(pendingResults) != 0):
+				for printJobModel in _processTaskResult(pendingResults.popleft().get(), updateParsingStatus, errorCollection, logger):
+					yield printJobModel
+	except Exception as e:
+		errorMessage = "CSV Parsing error. Line:'" + str(lineNumber) + "' Error:'" + str(e) + "' File:'" + csvFile4Import + "'"
+		errorCollection.append(errorMessage)
+		logger.error(errorMessage)
 	finally:
-		if (deleteAfterParsing):
-			logger.info("Removing uploded csv temp-file")
-			try:
-				os.remove(csvFile4Import)
-			except Exception:
-				pass
+		if (pool != None):
+			pool.terminate()
+
+def _processTaskResult(taskResult, updateParsingStatus, errorCollection, logger):
+	for (lineNumber, printJobDict, lineErrors) in taskResult:
+		updateParsingStatus(str(lineNumber))
+		if (printJobDict == None):
+			# empty line
+			continue
+		errorCollection.extend(lineErrors)
+		if (len(errorCollection) != 0):
+			logger.error("Reading error line '" + str(lineNumber) + "'")
+		else:
+			yield _fromPlainDict(printJobDict)
+
+# Runs in the worker process
+# return: list of (lineNumber, printjob as plain dict or None for empty lines, errors of the line)
+def _parseLinesTask(headerRow, firstLineNumber, rows):
+	columnOrderInFile = _readColumnOrderFromHeader(headerRow, [])
+	result = []
+	lineNumber = firstLineNumber
+	for row in rows:
+		lineErrors = []
+		printJobModel = _parseRow(row, lineNumber, columnOrderInFile, lineErrors)
+		printJobDict = _toPlainDict(printJobModel) if printJobModel != None else None
+		result.append((lineNumber, printJobDict, lineErrors))
+		lineNumber += 1
 	return result
+
+def _toPlainDict(printJobModel):
+	def modelData(model):
+		data = dict(model.__data__)
+		data.pop("printJob", None)
+		return data
+	return {
+		"printJob": modelData(printJobModel),
+		"filaments": [modelData(filamentModel) for filamentModel in printJobModel.filamentModelsByToolId.values()],
+		"temperatures": [modelData(temperatureModel) for temperatureModel in printJobModel.allTemperatures],
+		"cost": modelData(printJobModel.costModel) if printJobModel.costModel != None else None
+	}
+
+# The models are created directly with the already parsed field values (no defaults, no setattr per field),
+# because this runs in the main process for each line
+def _fromPlainDict(printJobDict):
+	def createModel(modelClass, data):
+		model = modelClass(__no_default__=True)
+		model.__data__ = data
+		return model
+	printJobModel = createModel(PrintJobModel, printJobDict["printJob"])
+	filamentModels = [createModel(FilamentModel, filamentData) for filamentData in printJobDict["filaments"]]
+	temperatureModels = [createModel(TemperatureModel, temperatureData) for temperatureData in printJobDict["temperatures"]]
+	costModels = [createModel(CostModel, printJobDict["cost"])] if printJobDict["cost"] != None else []
+	printJobModel.assignPrefetchedRelations(filamentModels, temperatureModels, costModels)
+	return printJobModel
+
+# return: dict columnIndex -> CSVColumn or None if a mandatory column is missing (error is added to errorCollection)
+def _readColumnOrderFromHeader(row, errorCollection):
+	columnOrderInFile = dict()
+	mandatoryFieldAvaiable = list()
+	columnIndex = 0
+	for column in row:
+		column = column.strip()
+		if column in ALL_COLUMNS:
+			columnOrderInFile[columnIndex] = ALL_COLUMNS[column]
+			if column in mandatoryFieldNames:
+				mandatoryFieldAvaiable.append(column)
+		columnIndex += 1
+	if len(mandatoryFieldAvaiable) != len(mandatoryFieldNames):
+		# identify missing files
+		mandatoryFieldMissing = list( set(mandatoryFieldNames) - set(mandatoryFieldAvaiable) )
+		errorCollection.append("Mandatory column is missing! <br/><b>'" + "".join(mandatoryFieldMissing) + "'</b><br/>")
+		return None
+	return columnOrderInFile
+
+# return: printJobModel or None if the line is empty, errors are added to errorCollection
+def _parseRow(row, lineNumber, columnOrderInFile, errorCollection):
+	# pre check, do we have values in the line?
+	isEmptyLine = True
+	for columnValue in row:
+		if (StringUtils.isNotEmpty(columnValue)):
+			isEmptyLine = False
+			break
+	if (isEmptyLine == True):
+		# errorCollection.append("CSV Line: "+str(lineNumber)+" without values! <br/>")
+		return None
+	printJobModel = PrintJobModel()
+	# new printjob, there are no relations in the database to load
+	printJobModel.assignPrefetchedRelations([], [], [])
+	# parse line with header defined order
+	columnIndex = 0
+	for columnValue in row:
+		if columnIndex in columnOrderInFile:
+			csvColumn = columnOrderInFile[columnIndex]
+			if not csvColumn == None:
+				columnValue = columnValue.strip()
+				# check if mandatory value is missing
+				if (len(columnValue) == 0):
+					columnName = csvColumn.columnLabel
+					if columnName in mandatoryFieldNames:
+						errorCollection.append("["+str(lineNumber)+"] Mandatory value for column '" + columnName + "' is missing!")
+						pass
+				else:
+					csvColumn.parseAndAssignFieldValue(columnValue, printJobModel, errorCollection, lineNumber)
+				pass
+		columnIndex += 1
+	return printJobModel
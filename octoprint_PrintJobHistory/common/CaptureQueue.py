@@ -0,0 +1,123 @@
+# coding=utf-8
+from __future__ import absolute_import
+
+import json
+import logging
+import os
+import threading
+import time
+from queue import Queue, Full
+
+
+# Bounded queue with one worker thread for the capture at the end of a print, so the OctoPrint event handler only
+# adds the capture and returns immediately (the capture reads files, converts images and writes into the database).
+# Each capture (JSON serializable dict) is stored as a "pending capture" file until it is done, so it is not lost if
+# OctoPrint is stopped during the capture. All pending captures are added again on start.
+class CaptureQueue(object):
+
+	PENDING_CAPTURE_EXTENSION = ".json"
+	FAILED_CAPTURE_EXTENSION = ".failed"
+
+	# captureHandler(capture) must raise an exception, if the capture should be retried
+	def __init__(self, parentLogger, pendingCaptureFolder, captureHandler, maxSize = 10, maxAttempts = 3, retryDelaySeconds = 5):
+		self._logger = logging.getLogger(parentLogger.name + "." + self.__class__.__name__)
+		self._pendingCaptureFolder = pendingCaptureFolder
+		self._captureHandler = captureHandler
+		self._maxAttempts = maxAttempts
+		self._retryDelaySeconds = retryDelaySeconds
+		self._queue = Queue(maxSize)
+		self._captureCounter = 0
+		self._thread = None
+
+	def start(self):
+		if (os.path.exists(self._pendingCaptureFolder) == False):
+			os.makedirs(self._pendingCaptureFolder)
+
+		# oldest first
+		for pendingCaptureFileName in sorted(os.listdir(self._pendingCaptureFolder)):
+			if (pendingCaptureFileName.endswith(self.PENDING_CAPTURE_EXTENSION) == False):
+				continue
+			pendingCaptureFile = os.path.join(self._pendingCaptureFolder, pendingCaptureFileName)
+			try:
+				with open(pendingCaptureFile, "r") as captureFile:
+					capture = json.load(captureFile)
+			except Exception as e:
+				self._logger.exception("Could not read pending capture '" + pendingCaptureFile + "':" + str(e))
+				self._markAsFailed(pendingCaptureFile)
+				continue
+			self._logger.info("Capture pending capture '" + pendingCaptureFile + "' again")
+			try:
+				self._queue.put_nowait((pendingCaptureFile, capture))
+			except Full:
+				# still stored, next start
+				self._logger.error("Too many pending captures, '" + pendingCaptureFile + "' is captured after the next start")
+
+		self._thread = threading.Thread(name="PrintJobCapture", target=self._processCaptures)
+		self._thread.daemon = True
+		self._thread.start()
+
+	# called from the OctoPrint event handler, only the pending capture file is written (no database access)
+	# the file is written before the capture is queued, so a waiting capture is not lost if OctoPrint stops
+	# return: False, if the queue is full (the capture is stored and done after the next start)
+	def addCapture(self, capture):
+		pendingCaptureFile = self._storePendingCapture(capture)
+		try:
+			# pendingCaptureFile None (not stored), the capture is still done, but only in memory
+			self._queue.put_nowait((pendingCaptureFile, capture))
+			return True
+		except Full:
+			self._logger.error("Capture queue is full, the capture is done after the next start")
+		return False
+
+	# blocks until all added captures are done (e.g. for tests)
+	def waitUntilDone(self):
+		self._queue.join()
+
+	def _processCaptures(self):
+		while True:
+			pendingCaptureFile, capture = self._queue.get()
+			try:
+				isCaptured = False
+				for attempt in range(1, self._maxAttempts + 1):
+					try:
+						self._captureHandler(capture)
+						isCaptured = True
+						break
+					except Exception as e:
+						self._logger.exception("Capture attempt " + str(attempt) + " of " + str(self._maxAttempts) + " failed:" + str(e))
+						if (attempt < self._maxAttempts):
+							time.sleep(self._retryDelaySeconds)
+
+				if (pendingCaptureFile != None):
+					if (isCaptured == True):
+						os.remove(pendingCaptureFile)
+					else:
+						# kept for analysis, but not captured again
+						self._markAsFailed(pendingCaptureFile)
+			except Exception as e:
+				self._logger.exception("Could not process capture:" + str(e))
+			finally:
+				self._queue.task_done()
+
+	# return: location of the pending capture file or None if not stored
+	def _storePendingCapture(self, capture):
+		self._captureCounter += 1
+		pendingCaptureFileName = str(int(time.time() * 1000)) + "-" + str(self._captureCounter) + self.PENDING_CAPTURE_EXTENSION
+		pendingCaptureFile = os.path.join(self._pendingCaptureFolder, pendingCaptureFileName)
+		try:
+			# write and rename, so there is never a half-written pending capture
+			with open(pendingCaptureFile + ".tmp", "w") as captureFile:
+				json.dump(capture, captureFile, default=str)
+				captureFile.flush()
+				os.fsync(captureFile.fileno())
+			os.replace(pendingCaptureFile + ".tmp", pendingCaptureFile)
+			return pendingCaptureFile
+		except Exception as e:
+			self._logger.exception("Could not store pending capture '" + pendingCaptureFile + "':" + str(e))
+		return None
+
+	def _markAsFailed(self, pendingCaptureFile):
+		try:
+			os.replace(pendingCaptureFile, pendingCaptureFile + self.FAILED_CAPTURE_EXTENSION)
+		except Exception as e:
+			self._logger.exception("Could not mark pending capture '" + pendingCaptureFile + "' as failed:" + str(e))
@@ -0,0 +1,77 @@
+# coding=utf-8
+from __future__ import absolute_import
+
+import collections
+import threading
+import time
+
+
+# In-process log of the last printjob changes (insert/update/delete), so a browser could update only the changed rows
+# instead of reloading the complete table.
+# A client remembers the changeId of its last sync and asks for the changes since then. If this changeId is unknown
+# (too old, or from before a restart) or one of the changes is a "reload" (e.g. CSV import), the client must reload.
+# Changes of other instances (external database) are a "reload", see DatabaseManager.checkExternalChanges
+class ChangeFeed(object):
+
+	CHANGE_TYPE_INSERT = "insert"
+	CHANGE_TYPE_UPDATE = "update"
+	CHANGE_TYPE_DELETE = "delete"
+	CHANGE_TYPE_RELOAD = "reload"	# many printjobs changed, no databaseId
+
+	def __init__(self, maxSize):
+		self._changes = collections.deque(maxlen=maxSize)
+		self._lastChangeNumber = 0
+		# part of the changeId, so a changeId from before a restart never matches
+		self._instanceId = str(int(time.time() * 1000))
+		self._lock = threading.Lock()
+
+	# must be called after the change is committed
+	# return: change as dict (changeId, previousChangeId, changeType, databaseId)
+	def addChange(self, changeType, databaseId = None):
+		with self._lock:
+			previousChangeId = self._buildChangeId(self._lastChangeNumber)
+			self._lastChangeNumber += 1
+			change = {
+				"changeId": self._buildChangeId(self._lastChangeNumber),
+				"previousChangeId": previousChangeId,
+				"changeType": changeType,
+				"databaseId": databaseId
+			}
+			self._changes.append((self._lastChangeNumber, change))
+			return change
+
+	def getLastChangeId(self):
+		with self._lock:
+			return self._buildChangeId(self._lastChangeNumber)
+
+	# return: list of changes after sinceChangeId (oldest first) or None if the client must reload the complete table
+	def getChangesSince(self, sinceChangeId):
+		sinceChangeNumber = self._parseChangeNumber(sinceChangeId)
+		if (sinceChangeNumber == None):
+			return None
+		with self._lock:
+			if (sinceChangeNumber > self._lastChangeNumber):
+				return None
+			if (sinceChangeNumber == self._lastChangeNumber):
+				return []
+			# the oldest change the client needs, must be still in the log
+			if (len(self._changes) == 0 or self._changes[0][0] > sinceChangeNumber + 1):
+				return None
+			result = []
+			for changeNumber, change in self._changes:
+				if (changeNumber > sinceChangeNumber):
+					if (change["changeType"] == self.CHANGE_TYPE_RELOAD):
+						return None
+					result.append(change)
+			return result
+
+	def _buildChangeId(self, changeNumber):
+		return self._instanceId + "-" + str(changeNumber)
+
+	def _parseChangeNumber(self, changeId):
+		if (changeId == None):
+			return None
+		changeIdParts = str(changeId).split("-")
+		if (len(changeIdParts) != 2 or changeIdParts[0] != self._instanceId or changeIdParts[1].isdigit() == False):
+			return None
+		return int(changeIdParts[1])
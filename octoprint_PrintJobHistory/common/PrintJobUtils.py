@@ -1,19 +1,32 @@
 # coding=utf-8
 from __future__ import absolute_import
+import os
+
 from octoprint.filemanager import FileDestinations
 from octoprint_PrintJobHistory.common import StringUtils
 
-def isPrintJobReprintable(fileManager, fileOrigin, filePathName, fileName):
-	resultPrintJobPrintable = {}
+# reprintable result per (fileOrigin, filePath), so a table page doesn't check the same files again and again
+# must be invalidated by the OctoPrint file events, see invalidateReprintableCache
+_reprintableCache = dict()
 
-	isRePrintable = False
-	fullFileLocation = ""
+# useCache = False e.g. before the file is selected for printing
+def isPrintJobReprintable(fileManager, fileOrigin, filePathName, fileName, useCache = True):
 	filePath = filePathName if StringUtils.isNotEmpty(filePathName) else fileName
 
 	if (fileOrigin == None):
 		# could be during csv import, assumption it is local
 		fileOrigin = FileDestinations.LOCAL
 
+	cacheKey = _buildReprintableCacheKey(fileOrigin, filePath)
+	if (useCache == True and cacheKey in _reprintableCache):
+		# copy, the caller could change the result
+		return dict(_reprintableCache[cacheKey])
+
+	resultPrintJobPrintable = {}
+
+	isRePrintable = False
+	fullFileLocation = ""
+
 	if (fileOrigin == FileDestinations.LOCAL):
 		# local filesystem
 		fullFileLocation = fileManager.path_on_disk(fileOrigin, filePath)
@@ -27,16 +40,23 @@ def isPrintJobReprintable(fileManager, fileOrigin, filePathName, fileName):
 
 	resultPrintJobPrintable["isRePrintable"] = isRePrintable
 	resultPrintJobPrintable["fullFileLocation"] = fullFileLocation
+	_reprintableCache[cacheKey] = dict(resultPrintJobPrintable)
 	return resultPrintJobPrintable
 
+# fileOrigin/filePath of the added/removed/moved file, without a file (e.g. folder changes) the complete cache is cleared
+def invalidateReprintableCache(fileOrigin = None, filePath = None):
+	if (fileOrigin == None or filePath == None):
+		_reprintableCache.clear()
+	else:
+		_reprintableCache.pop(_buildReprintableCacheKey(fileOrigin, filePath), None)
 
+# event payload path is without a leading slash
+def _buildReprintableCacheKey(fileOrigin, filePath):
+	if (filePath != None):
+		filePath = filePath.lstrip("/")
+	return (fileOrigin, filePath)
 
 
 def _isFileReadable(fullFileLocation):
-	result = False
-	try:
-		with open(fullFileLocation) as fp:
-			result = True
-	except IOError as err:
-		print ("Error reading the file {0}: {1}".format(fullFileLocation, err))
-	return result
+	# only the file-system metadata, without opening the file (slow on a SD-card storage)
+	return os.path.isfile(fullFileLocation) and os.access(fullFileLocation, os.R_OK)
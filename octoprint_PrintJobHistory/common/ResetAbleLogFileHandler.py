@@ -2,6 +2,7 @@
 from __future__ import absolute_import
 
 import logging
+import os
 
 
 class ResetAbleLogFileHandler(logging.FileHandler):
@@ -35,6 +36,9 @@ class ResetAbleLogFileHandler(logging.FileHandler):
 
 	def readLogContent(self):
 		self.close()
+		# e.g. removed by resetLog of the next print and nothing logged since then
+		if (os.path.exists(self.baseFilename) == False):
+			return ""
 		# self.baseFilename = os.path.abspath(filename)
 		with open(self.baseFilename) as f:
 			contents = f.read()
@@ -0,0 +1,49 @@
+# coding=utf-8
+from __future__ import absolute_import
+
+import collections
+import hashlib
+import threading
+import time
+
+
+# In-process LRU cache for the results of the query endpoints (table, statistic, compare...)
+# The printjobs are only changed by capture, edit, delete, import, so each change increments the generation and
+# removes all results. The ETag contains the generation, so a client gets a 304 as long as nothing is changed.
+# Changes of other instances (external database) see DatabaseManager.checkExternalChanges
+class ResultCache(object):
+
+	def __init__(self, maxSize):
+		self._maxSize = maxSize
+		self._results = collections.OrderedDict()
+		self._generation = 0
+		# part of the ETag, so an ETag from before a restart never matches
+		self._instanceId = str(int(time.time() * 1000))
+		self._lock = threading.Lock()
+
+	# must be called after a change of the printjobs is committed
+	def invalidate(self):
+		with self._lock:
+			self._generation += 1
+			self._results.clear()
+
+	# cacheKey: hashable and normalized, e.g. tuple of the request values
+	def buildETag(self, cacheKey):
+		cacheKeyHash = hashlib.sha1(repr(cacheKey).encode("utf-8")).hexdigest()[:16]
+		return self._instanceId + "-" + str(self._generation) + "-" + cacheKeyHash
+
+	# return: cached result or the result of calculateResult()
+	def get(self, cacheKey, calculateResult):
+		with self._lock:
+			generation = self._generation
+			if (cacheKey in self._results):
+				self._results.move_to_end(cacheKey)
+				return self._results[cacheKey]
+		result = calculateResult()
+		with self._lock:
+			# not stored, if the printjobs were changed during the calculation
+			if (generation == self._generation):
+				self._results[cacheKey] = result
+				if (len(self._results) > self._maxSize):
+					self._results.popitem(last=False)
+		return result
@@ -63,10 +63,20 @@ class SettingsKeys():
 	SETTINGS_KEY_IMPORT_CSV_MODE = "importCSVMode"
 	KEY_IMPORTCSV_MODE_REPLACE = "replace"
 	KEY_IMPORTCSV_MODE_APPEND = "append"
+	SETTINGS_KEY_IMPORT_CSV_PROCESS_COUNT = "importCSVProcessCount"
 
 	## Storage
 	SETTINGS_KEY_DATABASE_PATH = "databaseFileLocation"
 	SETTINGS_KEY_SNAPSHOT_PATH = "snapshotFileLocation"
+	# SQLite connection, changes need a restart (see DatabaseManager.DEFAULT_CONNECTION_SETTINGS)
+	SETTINGS_KEY_DATABASE_JOURNAL_MODE = "databaseJournalMode"
+	SETTINGS_KEY_DATABASE_SYNCHRONOUS = "databaseSynchronous"
+	SETTINGS_KEY_DATABASE_CACHE_SIZE_KB = "databaseCacheSizeKB"
+	SETTINGS_KEY_DATABASE_MMAP_SIZE_MB = "databaseMmapSizeMB"
+	SETTINGS_KEY_DATABASE_BUSY_TIMEOUT = "databaseBusyTimeout"
+	SETTINGS_KEY_DATABASE_WAL_AUTOCHECKPOINT = "databaseWalAutoCheckpoint"
+	SETTINGS_KEY_DATABASE_MAX_CONNECTIONS = "databaseMaxConnections"
+	SETTINGS_KEY_DATABASE_STALE_TIMEOUT = "databaseStaleTimeout"
 
 	## Debugging
 	SETTINGS_KEY_SQL_LOGGING_ENABLED = "sqlLoggingEnabled"
@@ -0,0 +1,109 @@
+# coding=utf-8
+from __future__ import absolute_import
+
+import collections
+import logging
+import os
+import threading
+from queue import Queue
+
+from .SlicerSettingsParser import SlicerSettingsParser
+
+
+# In-process LRU cache of the parsed slicer settings per gcode file, so the end of a print doesn't depend on the size
+# of the gcode file (the same file is printed again and again).
+# The files are parsed in the background, when they are added/analysed (and at startup for the existing uploads).
+# An entry is only valid for the same file size, modification time and slicer expressions; if the file was changed
+# (or not parsed till now) the file is parsed during getSlicerSettings.
+class SlicerSettingsCache(object):
+
+	GCODE_FILE_EXTENSIONS = (".gcode", ".gco", ".g")
+
+	def __init__(self, parentLogger, maxSize = 100):
+		self._logger = logging.getLogger(parentLogger.name + "." + self.__class__.__name__)
+		self._parentLogger = parentLogger
+		self._maxSize = maxSize
+		# filePath -> (cacheKey, slicerSettings)
+		self._slicerSettingsByFile = collections.OrderedDict()
+		self._lock = threading.Lock()
+		self._queue = Queue()
+		self._thread = None
+
+	def start(self):
+		self._thread = threading.Thread(name="SlicerSettingsParsing", target=self._processFiles)
+		self._thread.daemon = True
+		self._thread.start()
+
+	# return: SlicerSettings of the file, from the cache or parsed now
+	def getSlicerSettings(self, filePath, slicerSettingsExpressions):
+		cacheKey = self._buildCacheKey(filePath, slicerSettingsExpressions)
+		if (cacheKey != None):
+			with self._lock:
+				cacheEntry = self._slicerSettingsByFile.get(filePath)
+				if (cacheEntry != None and cacheEntry[0] == cacheKey):
+					self._slicerSettingsByFile.move_to_end(filePath)
+					self._logger.debug("Slicer-Settings of '" + filePath + "' already parsed")
+					return cacheEntry[1]
+
+		slicerSettings = SlicerSettingsParser(self._parentLogger).extractSlicerSettings(filePath, slicerSettingsExpressions)
+		if (cacheKey != None):
+			with self._lock:
+				self._slicerSettingsByFile[filePath] = (cacheKey, slicerSettings)
+				self._slicerSettingsByFile.move_to_end(filePath)
+				if (len(self._slicerSettingsByFile) > self._maxSize):
+					self._slicerSettingsByFile.popitem(last=False)
+		return slicerSettings
+
+	# parse the file in the background, e.g. after upload
+	def addFile(self, filePath, slicerSettingsExpressions):
+		self._queue.put(("file", filePath, slicerSettingsExpressions))
+
+	# parse the newest gcode files of the folder (incl. subfolders) in the background
+	def addFolder(self, folderPath, slicerSettingsExpressions):
+		self._queue.put(("folder", folderPath, slicerSettingsExpressions))
+
+	def removeFile(self, filePath):
+		with self._lock:
+			self._slicerSettingsByFile.pop(filePath, None)
+
+	# blocks until all added files are parsed (e.g. for tests)
+	def waitUntilDone(self):
+		self._queue.join()
+
+	def _processFiles(self):
+		while True:
+			taskType, path, slicerSettingsExpressions = self._queue.get()
+			try:
+				if (taskType == "folder"):
+					for filePath in self._findNewestGcodeFiles(path):
+						self.getSlicerSettings(filePath, slicerSettingsExpressions)
+				else:
+					self.getSlicerSettings(path, slicerSettingsExpressions)
+			except Exception as e:
+				self._logger.exception("Could not parse Slicer-Settings of '" + str(path) + "':" + str(e))
+			finally:
+				self._queue.task_done()
+
+	# return: max. maxSize files, oldest first (so the newest files are the last evicted)
+	def _findNewestGcodeFiles(self, folderPath):
+		allGcodeFiles = []
+		for currentFolder, subFolders, fileNames in os.walk(folderPath):
+			for fileName in fileNames:
+				if (fileName.lower().endswith(self.GCODE_FILE_EXTENSIONS) == False):
+					continue
+				filePath = os.path.join(currentFolder, fileName)
+				try:
+					allGcodeFiles.append((os.path.getmtime(filePath), filePath))
+				except OSError:
+					# removed in the meantime
+					pass
+		allGcodeFiles.sort()
+		return [filePath for modificationTime, filePath in allGcodeFiles[-self._maxSize:]]
+
+	# return: None, if the file is not readable (not cached, the parser reports the error)
+	def _buildCacheKey(self, filePath, slicerSettingsExpressions):
+		try:
+			fileStat = os.stat(filePath)
+		except OSError:
+			return None
+		return (fileStat.st_size, fileStat.st_mtime_ns, slicerSettingsExpressions)
@@ -9,6 +9,159 @@ MAX_GCODE_LINES_BEFORE_STOP_READING = 10
 LINE_RESULT_GCODE = "LR:gcode"
 LINE_RESULT_SETTINGS = "LR:settings"
 LINE_RESULT_OTHERS = "LR:others"
+# reverse reading of the bottom-region in blocks instead of byte by byte
+REVERSE_READING_BLOCK_SIZE = 64 * 1024
+
+# compiled matcher per expression text, shared by the parser (capture) and the SlicerSettingsService (compare)
+_slicerSettingsMatcherCache = dict()
+MAX_CACHED_SLICER_SETTINGS_MATCHERS = 10
+
+def getSlicerSettingsMatcher(slicerSettingsExpressions, logger):
+	slicerSettingsMatcher = _slicerSettingsMatcherCache.get(slicerSettingsExpressions)
+	if (slicerSettingsMatcher == None):
+		slicerSettingsMatcher = SlicerSettingsMatcher(slicerSettingsExpressions, logger)
+		if (len(_slicerSettingsMatcherCache) >= MAX_CACHED_SLICER_SETTINGS_MATCHERS):
+			_slicerSettingsMatcherCache.clear()
+		_slicerSettingsMatcherCache[slicerSettingsExpressions] = slicerSettingsMatcher
+	return slicerSettingsMatcher
+
+###########################################################
+# Matcher of all key-value expressions (one per line, e.g. ";(.*)=(.*)\n;   (.*),(.*)", group 1=key, group 2=value)
+# - All expressions are combined to one alternation, each expression is a named group -> one regex run per line
+# - The first matching expression wins (same as trying the expressions one after the other)
+# - Pre-filter without regex: the line must contain one of the separators of the expressions (only if all
+#   expressions have such a character, e.g. '=' or ','). Lines without ';' are already skipped by the parser
+# - matchAllKeyValues runs the combined expressions over a complete settings text (compare), without splitting
+class SlicerSettingsMatcher(object):
+
+	SEPARATOR_CHARACTERS = "=,:"
+	# line breaks of str.splitlines (besides "\n" and "\r"), that are not a line end for the regex
+	OTHER_LINE_BREAKS = ("\x0b", "\x0c", "\x1c", "\x1d", "\x1e", "\x85", "\u2028", "\u2029")
+
+	def __init__(self, slicerSettingsExpressions, logger):
+		allExpressions = []
+		for line in slicerSettingsExpressions.split("\n"):
+			if (len(line.strip()) == 0):
+				continue
+			try:
+				re.compile(line)
+				allExpressions.append(line)
+			except (ValueError, RuntimeError) as error:
+				logger.exception("Invalid slicer expression '" + line + "':" + str(error))
+
+		self._combinedPattern = None
+		self._multiLinePattern = None
+		# group index of the named group -> (key group index, value group index)
+		self._keyValueGroupIndicesByGroupIndex = dict()
+		# fallback, if the expressions could not be combined (e.g. back references)
+		self._allSlicerPatterns = []
+		if (self._isCombinable(allExpressions) == True):
+			combinedExpressions = []
+			groupIndex = 1
+			for index, expression in enumerate(allExpressions):
+				groupName = "expression" + str(index)
+				combinedExpressions.append("(?P<" + groupName + ">" + expression + ")")
+				# key/value are the first groups inside of the named group
+				self._keyValueGroupIndicesByGroupIndex[groupIndex] = (groupIndex + 1, groupIndex + 2)
+				groupIndex += 1 + re.compile(expression).groups
+			self._combinedPattern = re.compile("|".join(combinedExpressions))
+			# a complete settings text in one regex run, only if no expression could match over the end of a line
+			if (self._isSingleLineOnly(allExpressions) == True):
+				self._multiLinePattern = re.compile("^(?:" + "|".join(combinedExpressions) + ")", re.MULTILINE)
+		else:
+			for expression in allExpressions:
+				self._allSlicerPatterns.append(re.compile(expression))
+
+		# None, if there is no pre-filter
+		self._requiredSeparators = self._findRequiredSeparators(allExpressions)
+
+	# return: (key, value) of the first matching expression or None
+	def matchKeyValue(self, line):
+		if (self._requiredSeparators != None):
+			for separator in self._requiredSeparators:
+				if (separator in line):
+					break
+			else:
+				return None
+
+		if (self._combinedPattern != None):
+			matched = self._combinedPattern.match(line)
+			if (matched == None):
+				return None
+			# the named group of the expression is closed after its key/value groups
+			key, value = matched.group(*self._keyValueGroupIndicesByGroupIndex[matched.lastindex])
+			return (str(key).strip(), str(value).strip())
+
+		for slicerPattern in self._allSlicerPatterns:
+			matched = slicerPattern.match(line)
+			if (matched):
+				return (str(matched.group(1)).strip(), str(matched.group(2)).strip())
+		return None
+
+	# return: (key, value) of all lines of the text, e.g. the slicer settings of a printjob
+	def matchAllKeyValues(self, text):
+		if (self._multiLinePattern != None and self._hasOtherLineBreaks(text) == False):
+			keyValueGroupIndicesByGroupIndex = self._keyValueGroupIndicesByGroupIndex
+			for matched in self._multiLinePattern.finditer(text):
+				key, value = matched.group(*keyValueGroupIndicesByGroupIndex[matched.lastindex])
+				yield (str(key).strip(), str(value).strip())
+			return
+
+		for line in text.splitlines(False):
+			keyValue = self.matchKeyValue(line)
+			if (keyValue != None):
+				yield keyValue
+
+	def _hasOtherLineBreaks(self, text):
+		for lineBreak in self.OTHER_LINE_BREAKS:
+			if (lineBreak in text):
+				return True
+		# "\r" only as part of "\r\n"
+		return text.count("\r") != text.count("\r\n")
+
+	def _isCombinable(self, allExpressions):
+		for expression in allExpressions:
+			# the group numbers are changed by combining (back references), 2 groups needed for key/value
+			if ("(?" in expression or re.search(r"\\[0-9]", expression) != None or re.compile(expression).groups < 2):
+				return False
+		return len(allExpressions) > 0
+
+	# "." never matches a line break, but e.g. "\\s" or "[^=]" does
+	def _isSingleLineOnly(self, allExpressions):
+		for expression in allExpressions:
+			if ("\\" in expression or "[" in expression):
+				return False
+		return True
+
+	# return: all separators, one of them must be part of the line or None if not each expression has a separator
+	def _findRequiredSeparators(self, allExpressions):
+		if (len(allExpressions) == 0):
+			return None
+		requiredSeparators = []
+		for expression in allExpressions:
+			separator = self._findRequiredSeparator(expression)
+			if (separator == None):
+				return None
+			if (separator not in requiredSeparators):
+				requiredSeparators.append(separator)
+		return requiredSeparators
+
+	# separator must be a literal outside of groups, classes and alternations and without a quantifier
+	def _findRequiredSeparator(self, expression):
+		if ("|" in expression or "[" in expression or "\\" in expression):
+			return None
+		groupDepth = 0
+		for index, character in enumerate(expression):
+			if (character == "("):
+				groupDepth += 1
+			elif (character == ")"):
+				groupDepth -= 1
+			elif (groupDepth == 0 and character in self.SEPARATOR_CHARACTERS):
+				nextCharacter = expression[index + 1] if index + 1 < len(expression) else ""
+				if (nextCharacter != "" and nextCharacter in "?*{"):
+					continue
+				return character
+		return None
 
 # Model of Slicer Settings
 class SlicerSettings(object):
@@ -36,7 +189,7 @@ class SlicerSettingsParser(object):
 	def __init__(self, parentLogger):
 		self._logger = logging.getLogger(parentLogger.name + "." + self.__class__.__name__)
 		# self._logger.setLevel(logging.DEBUG)
-		self._allSlicerPatterns = []
+		self._slicerSettingsMatcher = None
 
 	def extractSlicerSettings(self, gcodeFilePath, slicerSettingsExpressions):
 
@@ -57,6 +210,7 @@ class SlicerSettingsParser(object):
 		reverseReadinStarted = False
 		lastTopFilePosition = 0	# needed for overlapping detection of top-region and bottom-region
 		lineNumber = 0
+		reversedLines = None
 		with open(gcodeFilePath, 'rb') as fileHandle:
 			while True:
 				if (readingOrder == 0):
@@ -69,11 +223,11 @@ class SlicerSettingsParser(object):
 					# Reverse reading
 					# Jump to the end
 					if (reverseReadinStarted == False):
-						fileHandle.seek(0, os.SEEK_END)
+						reversedLines = self._readReversedLines(fileHandle, lastTopFilePosition)
 						reverseReadinStarted = True
 						lineNumber = 0
 						gcodeCount = 0
-					line = self.nextReversedLine(fileHandle, lastTopFilePosition)
+					line = next(reversedLines, b'')
 					lineNumber += 1
 
 				if (line == b''):
@@ -141,70 +295,48 @@ class SlicerSettingsParser(object):
 			# KeyValue extraction
 			# ;   (.*),(.*)
 			# ;(.*)=(.*)
-			for slicerPattern in self._allSlicerPatterns:
-				matched = slicerPattern.match(line)
-				if (matched):
-				# if ('=' in line):
-				# 	keyValue = line.split('=', 1) # 1 == only the first =
-				# 	key = keyValue[0].strip()
-				# 	value = keyValue[1].strip()
-					key = str(matched.group(1)).strip()
-					value = str(matched.group(2)).strip()
-					if (slicerSettings.isKeyAlreadyExtracted(key) == False):
-						slicerSettings.addKeyValueSetting(key, value)
-						slicerSettings.addKeyValueSettingsAsText(line)
-					return LINE_RESULT_SETTINGS
+			keyValue = self._slicerSettingsMatcher.matchKeyValue(line)
+			if (keyValue != None):
+				key, value = keyValue
+				if (slicerSettings.isKeyAlreadyExtracted(key) == False):
+					slicerSettings.addKeyValueSetting(key, value)
+					slicerSettings.addKeyValueSettingsAsText(line)
+				return LINE_RESULT_SETTINGS
 
 			return LINE_RESULT_OTHERS
 
 		# Must be a gcode
 		return LINE_RESULT_GCODE
 
-	def nextReversedLine(self, fileHandle, lastTopFilePosition):
-		line = b''
-
+	# Generator of all lines from the end of the file till lastTopFilePosition (bottom line first, each line incl. "\n").
+	# The file is read in blocks from the end, the lines are splitted from the buffered blocks
+	# - No overlapping: the top-region (before lastTopFilePosition) is never read
+	def _readReversedLines(self, fileHandle, lastTopFilePosition):
+		fileHandle.seek(0, os.SEEK_END)
 		filePosition = fileHandle.tell()
-		if (filePosition <=0):
-			return line
-		if (filePosition <= lastTopFilePosition):
-			self._logger.debug("We reached the already parsed top-region during reverse-parsing")
-			# print("We reached the already parsed top-region during reverse-parsing")
-			return line
-
-		while filePosition >= 0:
+
+		# start of the buffer is the (maybe incomplete) line, that is continued by the next block
+		buffer = b''
+		while (filePosition > lastTopFilePosition):
+			blockSize = min(REVERSE_READING_BLOCK_SIZE, filePosition - lastTopFilePosition)
+			filePosition -= blockSize
 			fileHandle.seek(filePosition)
-			current_byte = fileHandle.read(1)
-			line += current_byte
-
-			if (filePosition == 0):
-				line = line[::-1]
-				fileHandle.seek(0)
-				break
-
-			fileHandle.seek(filePosition - 1)
-			next_byte = fileHandle.read(1)
-			if next_byte == b"\n":
-				line = line[::-1]
-				# HACK
-				if len(line)==0:
-					line = b" "
-				fileHandle.seek(filePosition - 1)
-				break
-			filePosition -= 1
-
-		return line
+			buffer = fileHandle.read(blockSize) + buffer
+
+			# all lines after the first "\n" are complete
+			lineEnd = len(buffer)
+			lineStart = buffer.rfind(b"\n", 0, lineEnd - 1)
+			while (lineStart != -1):
+				yield buffer[lineStart + 1:lineEnd]
+				lineEnd = lineStart + 1
+				lineStart = buffer.rfind(b"\n", 0, lineEnd - 1)
+			buffer = buffer[:lineEnd]
+
+		if (len(buffer) > 0):
+			# first line of the bottom-region
+			yield buffer
+		self._logger.debug("We reached the already parsed top-region during reverse-parsing")
 
 	def _parseSlicerExpressions(self, slicerSettingsExpressions):
-		self._allSlicerPatterns = []
 		# slicerSettingsExpressions = ;(.*)=(.*)\n;   (.*),(.*)
-		lines = slicerSettingsExpressions.split("\n")
-		try:
-			for line in lines:
-				if (len(line.strip()) == 0):
-					continue
-				slicerExpression = re.compile(line)
-				self._allSlicerPatterns.append(slicerExpression)
-		except (ValueError, RuntimeError) as error:
-			self._logger.exception(""+str(error))
-		pass
-
+		self._slicerSettingsMatcher = getSlicerSettingsMatcher(slicerSettingsExpressions, self._logger)
@@ -9,6 +9,10 @@ class PluginMetaDataModel(BaseModel):
 
 	KEY_PLUGIN_VERSION = "pluginVersion"
 	KEY_DATABASE_SCHEME_VERSION = "databaseSchemeVersion"
+	# since V12, see DatabaseManager.rebuildSlicerSettings
+	KEY_SLICER_SETTINGS_EXPRESSIONS_HASH = "slicerSettingsExpressionsHash"
+	# only external database, see DatabaseManager.checkExternalChanges
+	KEY_PRINTJOB_CHANGE_COUNTER = "printJobChangeCounter"
 
 	key = CharField(null=False)
 	value = CharField(null=False)
@@ -34,6 +34,9 @@ class PrintJobModel(BaseModel):
 	filamentModelsByToolId = {}
 
 	costModel = None
+
+	# True, if all relations (filaments, temperatures, costs) are already assigned via DatabaseManager-prefetch
+	relationsPrefetched = False
 	# def initialize(self):
 	# 	#  initialize with some a default
 	# 	filamentModel = FilamentModel()
@@ -41,8 +44,17 @@ class PrintJobModel(BaseModel):
 	# 	print("PrintJobModel.initialize")
 	# 	pass
 
+	# Assign the already loaded relations, so that no lazy loading (one query per printjob) is needed
+	def assignPrefetchedRelations(self, filamentModels, temperatureModels, costModels):
+		self.filamentModelsByToolId = {}
+		for filamentModel in filamentModels:
+			self.filamentModelsByToolId[filamentModel.toolId] = filamentModel
+		self.allTemperatures = list(temperatureModels)
+		self.costModel = costModels[0] if (len(costModels) > 0) else None
+		self.relationsPrefetched = True
+
 	def getCosts(self):
-		if (self.costModel == None):
+		if (self.costModel == None and self.relationsPrefetched == False and self.databaseId != None):
 			# load costs from database
 			if (self.costs != None and len(self.costs) > 0):
 				self.costModel = self.costs[0]
@@ -93,6 +105,9 @@ class PrintJobModel(BaseModel):
 	def _loadFilamentModels(self):
 		# clear and build up
 		self.filamentModelsByToolId = {}
+		if (self.relationsPrefetched == True or self.databaseId == None):
+			# already loaded or not stored yet (e.g. new printjob), so no query needed
+			return
 		# load from database
 		allFilaments = self._getFilamentModelsFromAsso()
 		if (allFilaments != None and len(allFilaments) > 0):
@@ -115,6 +130,8 @@ class PrintJobModel(BaseModel):
 	def getTemperatureModels(self):
 		if (self.allTemperatures == None):
 			self.allTemperatures = []
+		if (self.relationsPrefetched == True or self.databaseId == None):
+			return self.allTemperatures
 
 		tempAssos = self._getTemperatureModelsFromAsso()
 		for temps in tempAssos:
@@ -0,0 +1,24 @@
+# coding=utf-8
+from __future__ import absolute_import
+
+from octoprint_PrintJobHistory.models.BaseModel import make_table_name
+from playhouse.sqlite_ext import FTS5Model, SearchField, RowIDField
+
+
+# Full-text search index (SQLite FTS5) for the table search, since V10
+# One row per printjob, rowid == PrintJobModel.databaseId
+# Content is maintained by the DatabaseManager (insert/update/delete printjob)
+class PrintJobSearchModel(FTS5Model):
+
+	rowid = RowIDField()
+
+	fileName = SearchField()
+	filePathName = SearchField()
+	noteText = SearchField()
+	userName = SearchField()
+	spoolNames = SearchField()	# all spoolNames of the filaments, separated by space
+	materials = SearchField()	# all materials of the filaments, separated by space
+
+	class Meta:
+		table_function = make_table_name
+		options = {"tokenize": "unicode61"}
@@ -0,0 +1,18 @@
+# coding=utf-8
+from __future__ import absolute_import
+
+from octoprint_PrintJobHistory.models.BaseModel import BaseModel
+from octoprint_PrintJobHistory.models.PrintJobModel import PrintJobModel
+from peewee import TextField, ForeignKeyField
+
+
+# Key-value slicer settings of a printjob, extracted from PrintJobModel.slicerSettingsAsText, since V12
+# One row per printjob x key, so the compare doesn't parse the settings text again and again
+# Content is maintained by the DatabaseManager (insert/update/delete printjob, rebuild after the slicer expressions
+# were changed)
+class SlicerSettingModel(BaseModel):
+
+	printJob = ForeignKeyField(PrintJobModel, backref='slicerSettings', on_delete='CASCADE')
+
+	key = TextField(null=False)
+	value = TextField(null=True)
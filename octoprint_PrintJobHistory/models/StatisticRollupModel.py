@@ -0,0 +1,29 @@
+# coding=utf-8
+from __future__ import absolute_import
+
+from octoprint_PrintJobHistory.models.BaseModel import BaseModel
+from peewee import CharField, IntegerField, FloatField, DateField, DateTimeField
+
+
+# Pre-aggregated statistic values per day and print status, since V11
+# - rollupType "printJob": one row per day x status (printjob values)
+# - rollupType "filament": one row per day x status x material x spool (filament values, without "total")
+# Content is maintained by the DatabaseManager (insert/update/delete printjob, rebuild)
+class StatisticRollupModel(BaseModel):
+
+	ROLLUP_TYPE_PRINTJOB = "printJob"
+	ROLLUP_TYPE_FILAMENT = "filament"
+
+	rollupType = CharField(null=False)
+	day = DateField(null=True)	# day of printStartDateTime
+	printStatusResult = CharField(null=True)
+	material = CharField(null=True)
+	spoolName = CharField(null=True)
+
+	itemCount = IntegerField(null=False, default=0)	# number of printjobs or filaments
+	duration = IntegerField(null=True)
+	fileSize = IntegerField(null=True)
+	usedLength = FloatField(null=True)
+	usedWeight = FloatField(null=True)
+	firstStartDateTime = DateTimeField(null=True)
+	firstFilamentId = IntegerField(null=True)	# to order the materials/spools by first usage
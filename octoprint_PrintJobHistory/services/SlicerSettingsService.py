@@ -3,7 +3,8 @@ from __future__ import absolute_import
 
 import logging
 import os
-import re
+
+from octoprint_PrintJobHistory.common.SlicerSettingsParser import getSlicerSettingsMatcher
 
 class SlicerSettingsService(object):
 
@@ -16,113 +17,117 @@ class SlicerSettingsService(object):
 	class SlicerSettingsCompareResult:
 		allKeys = []
 		slicerSettingsJobList = []
+		# number of keys before paging (only the different keys, if onlyDifferentKeys)
+		totalKeyCount = 0
+		differentKeyCount = 0
 		pass
 
+	NOT_PRESENT_VALUE = "NOT PRESENT"
+
 	def __init__(self, parentLogger):
 		self._logger = logging.getLogger(parentLogger.name + "." + self.__class__.__name__)
 		# self._logger.setLevel(logging.DEBUG)
-		self._allSlicerPatterns = []
+		self._slicerSettingsMatcher = None
 
-	def compareSlicerSettings(self, slicerSettingsJobList, slicerSettingsExpressions):
+	# onlyDifferentKeys: only the keys with a different/missing value in one of the jobs
+	# keyFrom/keyTo: page of the sorted keys (like from/to of the table query), None for all keys
+	def compareSlicerSettings(self, slicerSettingsJobList, slicerSettingsExpressions, onlyDifferentKeys = False, keyFrom = None, keyTo = None):
 
 		self._parseSlicerExpressions(slicerSettingsExpressions)
 
-		allKeys = []
+		allKeys = set()
+		keyValuesByJob = []
 		for slicerSettingsJob in slicerSettingsJobList:
-			slicerSettingsJob.keyValuesSettings = self.parseKeyValues(slicerSettingsJob.slicerSettingsAsText, allKeys)
+			keyValuesByJob.append(self.parseKeyValues(slicerSettingsJob.slicerSettingsAsText, allKeys))
+
+		compareResult = self.markDiff(allKeys, slicerSettingsJobList, keyValuesByJob, onlyDifferentKeys, keyFrom, keyTo)
 
-		allKeys = sorted(allKeys)
-		compareResult = self.markDiff(allKeys, slicerSettingsJobList)
+		return compareResult
+
+	# same as compareSlicerSettings, but the key-values are already extracted (e.g. slicer settings table)
+	# keyValuesByJob: list of dicts key -> value, same order as slicerSettingsJobList
+	def compareExtractedSlicerSettings(self, slicerSettingsJobList, keyValuesByJob, onlyDifferentKeys = False, keyFrom = None, keyTo = None):
+		allKeys = set()
+		for keyValues in keyValuesByJob:
+			allKeys.update(keyValues.keys())
+
+		compareResult = self.markDiff(allKeys, slicerSettingsJobList, keyValuesByJob, onlyDifferentKeys, keyFrom, keyTo)
 
 		return compareResult
 
+	# return: dict key -> value (the last value of a key wins), all keys are added to the allKeys set
 	def parseKeyValues(self, jobSettings, allKeys):
 		keyValueSettings = {}
 		if (jobSettings != None):
-			settingsLines = jobSettings.splitlines(False)
-			for line in settingsLines:
-
-				# KeyValue extraction
-				# ;   (.*),(.*)
-				# ;(.*)=(.*)
-				for slicerPattern in self._allSlicerPatterns:
-					matched = slicerPattern.match(line)
-					if (matched):
-						# if ('=' in line):
-						# 	keyValue = line.split('=', 1) # 1 == only the first =
-						# 	key = keyValue[0].strip()
-						# 	value = keyValue[1].strip()
-						key = str(matched.group(1)).strip()
-						value = str(matched.group(2)).strip()
-
-						keyValueSettings[key] = {"key": key, "value":value }
-						# keyValueSettings["value"] = value
-						#
-						# keyValueSettings["key"] = key
-						# keyValueSettings["value"] = value
-
-						if ( (key in allKeys) == False):
-							allKeys.append(key)
-						# print("Key:" + key)
-						# print("Value:" + value)
-						# print()
+			# KeyValue extraction of all lines
+			# ;   (.*),(.*)
+			# ;(.*)=(.*)
+			for key, value in self._slicerSettingsMatcher.matchAllKeyValues(jobSettings):
+				keyValueSettings[key] = value
+			allKeys.update(keyValueSettings.keys())
 		return keyValueSettings
 
-	def markDiff(self, allKeys, slicerSettingsJobList):
+	# Compares the values of each key with the value of the first job, one pass over the keys.
+	# Only the key-values of the resulting keys (page) are added to keyValuesSettings of the jobs, e.g.
+	# {"key": k, "value": v, "isDifferent": "yes"|"no"|"notPresent"} (the first job without "isDifferent")
+	def markDiff(self, allKeys, slicerSettingsJobList, keyValuesByJob, onlyDifferentKeys = False, keyFrom = None, keyTo = None):
 
 		compareResult = SlicerSettingsService.SlicerSettingsCompareResult()
-		compareResult.allKeys = allKeys
+		compareResult.allKeys = []
 		compareResult.slicerSettingsJobList = slicerSettingsJobList
-		for currentKey in allKeys:
-
-			diffCount = 0
-			# loop over all jobs and look for the key
-
-			firstKeyValue = {}
-			index = 0
-			for slicerSettingsJob in slicerSettingsJobList:
-				if (index == 0):
-					if (currentKey in slicerSettingsJob.keyValuesSettings):
-						firstKeyValue = slicerSettingsJob.keyValuesSettings[currentKey]
-						index = index + 1
-						continue
+		if (len(keyValuesByJob) == 0):
+			return compareResult
+
+		firstKeyValues = keyValuesByJob[0]
+		otherKeyValues = keyValuesByJob[1:]
+		notPresent = self.NOT_PRESENT_VALUE
+		resultKeys = []
+		differentKeyCount = 0
+		for currentKey in sorted(allKeys):
+			firstValue = firstKeyValues.get(currentKey, notPresent)
+			isDifferent = False
+			for keyValues in otherKeyValues:
+				# missing key or other value (NOT PRESENT in the first job is different, because the key is missing there)
+				if (keyValues.get(currentKey, None) != firstValue or (currentKey in firstKeyValues) == False):
+					isDifferent = True
+					break
+			if (isDifferent == True):
+				differentKeyCount += 1
+			elif (onlyDifferentKeys == True):
+				continue
+			resultKeys.append(currentKey)
+
+		compareResult.totalKeyCount = len(resultKeys)
+		compareResult.differentKeyCount = differentKeyCount
+		if (keyFrom != None or keyTo != None):
+			resultKeys = resultKeys[keyFrom:keyTo]
+		compareResult.allKeys = resultKeys
+
+		for jobIndex, (slicerSettingsJob, keyValues) in enumerate(zip(slicerSettingsJobList, keyValuesByJob)):
+			isFirstJob = jobIndex == 0
+			keyValueSettings = {}
+			for currentKey in resultKeys:
+				if (currentKey in keyValues):
+					value = keyValues[currentKey]
+					if (isFirstJob == True):
+						keyValueSettings[currentKey] = {"key": currentKey, "value": value}
 					else:
-						firstKeyValue = {
+						keyValueSettings[currentKey] = {
 							"key": currentKey,
-							"value": "NOT PRESENT",
-							"isDifferent": "no" # use no, because we don't want to colorize the first column
+							"value": value,
+							"isDifferent": "yes" if value != firstKeyValues.get(currentKey, notPresent) else "no"
 						}
-						slicerSettingsJob.keyValuesSettings[currentKey] = firstKeyValue
-						index = index + 1
-						continue
-				index = index + 1
-				isDiffResult = "no"
-				if (currentKey in slicerSettingsJob.keyValuesSettings):
-					currentKeyValue = slicerSettingsJob.keyValuesSettings[currentKey]
-					if (currentKeyValue["value"] != firstKeyValue["value"] ):
-						isDiffResult = "yes"
-					slicerSettingsJob.keyValuesSettings[currentKey]["isDifferent"] = isDiffResult
-					pass
 				else:
-					slicerSettingsJob.keyValuesSettings[currentKey] = {
+					keyValueSettings[currentKey] = {
 						"key": currentKey,
-						"value": "NOT PRESENT",
-						"isDifferent": "notPresent"
+						"value": notPresent,
+						# use no for the first job, because we don't want to colorize the first column
+						"isDifferent": "no" if isFirstJob == True else "notPresent"
 					}
-					pass
+			slicerSettingsJob.keyValuesSettings = keyValueSettings
 
 		return compareResult
 
 	def _parseSlicerExpressions(self, slicerSettingsExpressions):
-		self._allSlicerPatterns = []
 		# slicerSettingsExpressions = ;(.*)=(.*)\n;   (.*),(.*)
-		lines = slicerSettingsExpressions.split("\n")
-		try:
-			for line in lines:
-				if (len(line.strip()) == 0):
-					continue
-				slicerExpression = re.compile(line)
-				self._allSlicerPatterns.append(slicerExpression)
-		except (ValueError, RuntimeError) as error:
-			self._logger.exception(""+str(error))
-		pass
+		self._slicerSettingsMatcher = getSlicerSettingsMatcher(slicerSettingsExpressions, self._logger)
@@ -97,6 +97,17 @@ function PrintJobHistoryAPIClient(pluginId, baseUrl) {
             //countdownCircle = null;
         });
     }
+    // load only the PrintJob-Items changed since the last sync
+    this.callLoadPrintJobChanges = function (sinceChangeId, responseHandler){
+        urlToCall = this.baseUrl + "plugin/"+this.pluginId+"/loadPrintJobHistoryChanges?sinceChangeId="+encodeURIComponent(sinceChangeId);
+        return $.ajax({
+            url: urlToCall,
+            type: "GET"
+        }).done(function( data ){
+            responseHandler(data)
+        });
+    }
+
     // load STATISTICS PrintJob-Items
     this.callLoadStatisticsByQuery = function (tableQuery, responseHandler){
         query = _buildRequestQuery(tableQuery);
@@ -114,8 +125,12 @@ function PrintJobHistoryAPIClient(pluginId, baseUrl) {
     }
 
     // load COMPARE SlicerSettigs
-    this.callCompareSlicerSettings = function (selectedJobDatabaseIds, responseHandler){
-        urlToCall = this.baseUrl + "plugin/"+this.pluginId+"/compareSlicerSettings/?databaseIds="+selectedJobDatabaseIds;
+    // keyFrom/keyTo: page of the compared keys
+    this.callCompareSlicerSettings = function (selectedJobDatabaseIds, onlyDifferentKeys, keyFrom, keyTo, responseHandler){
+        urlToCall = this.baseUrl + "plugin/"+this.pluginId+"/compareSlicerSettings/?databaseIds="+selectedJobDatabaseIds +
+                                    "&onlyDifferentKeys=" + onlyDifferentKeys +
+                                    "&keyFrom=" + keyFrom +
+                                    "&keyTo=" + keyTo;
         $.ajax({
             url: urlToCall,
             type: "GET"
@@ -13,6 +13,12 @@ function CompareSlicerSettingsDialog(){
     // self.printJobCount = ko.observable();
     self.compareResultTableHeaders = ko.observableArray();
     self.compareResultTableItems = ko.observableArray();
+    self.onlyDifferentKeys = ko.observable(false);
+    self.totalKeyCount = ko.observable(0);
+    self.differentKeyCount = ko.observable(0);
+
+    // number of keys loaded with one call, the next keys are loaded with "Load more"
+    var KEY_PAGE_SIZE = 200;
 
 
     /////////////////////////////////////////////////////////////////////////////////////////////////// INIT
@@ -49,13 +55,15 @@ function CompareSlicerSettingsDialog(){
         self.selectedJobs = selectedJobIds;
         self.closeDialogHandler = closeDialogHandler;
 
-        // Clear compare table
-        self.compareResultTableHeaders([]);
-        self.compareResultTableItems([]);
-
-        self.loadSlicerSettingsCompareResult();
+        self.reloadSlicerSettingsCompareResult();
     }
 
+    self.onlyDifferentKeys.subscribe(function(newValue){
+        if (self.selectedJobs != null){
+            self.reloadSlicerSettingsCompareResult();
+        }
+    });
+
     self._openDialog = function(){
         self.compareSlicerSettingsDialog.modal({
             //minHeight: function() { return Math.max($.fn.modal.defaults.maxHeight() - 80, 250); }
@@ -72,25 +80,48 @@ function CompareSlicerSettingsDialog(){
     }
 
     /////////////////////////////////////////////////////////////////////////////////////////////////// SOME FUNCTIONs
+    self.reloadSlicerSettingsCompareResult = function(){
+        // Clear compare table
+        self.compareResultTableHeaders([]);
+        self.compareResultTableItems([]);
+        self.totalKeyCount(0);
+        self.differentKeyCount(0);
+
+        self.loadSlicerSettingsCompareResult();
+    }
+
+    self.hasMoreKeys = function(){
+        return self.compareResultTableItems().length < self.totalKeyCount();
+    }
+
+    // load the next page of keys, the rows are added to the table
     self.loadSlicerSettingsCompareResult = function(){
         self.busyIndicatorActive(true);
-        self.apiClient.callCompareSlicerSettings(self.selectedJobs, function(responseData){
+        var keyFrom = self.compareResultTableItems().length;
+        self.apiClient.callCompareSlicerSettings(self.selectedJobs, self.onlyDifferentKeys(), keyFrom, keyFrom + KEY_PAGE_SIZE, function(responseData){
 
                 var compareResult = JSON.parse(responseData);
+                self.totalKeyCount(compareResult.totalKeyCount);
+                self.differentKeyCount(compareResult.differentKeyCount);
                 // Fill headers
-                self.compareResultTableHeaders.push({fileName:"Keys"});
-                for (slicerSettingJob of compareResult.slicerSettingsJobList){
-                    self.compareResultTableHeaders.push({fileName:slicerSettingJob.fileName});
+                if (self.compareResultTableHeaders().length == 0){
+                    self.compareResultTableHeaders.push({fileName:"Keys"});
+                    for (slicerSettingJob of compareResult.slicerSettingsJobList){
+                        self.compareResultTableHeaders.push({fileName:slicerSettingJob.fileName});
+                    }
                 }
                 // Fill rows
+                var rowItems = [];
                 for (currentKey of compareResult.allKeys){
                     var rowItem = [{value:currentKey}];
                     for (currentJob of compareResult.slicerSettingsJobList) {
                         var keyValue = currentJob.keyValuesSettings[currentKey];
                         rowItem.push(keyValue)
                     }
-                    self.compareResultTableItems.push({row: rowItem});
+                    rowItems.push({row: rowItem});
                 }
+                // one update of the table
+                ko.utils.arrayPushAll(self.compareResultTableItems, rowItems);
                 self.busyIndicatorActive(false);
                 self._openDialog();
             });
@@ -815,8 +815,13 @@ $(function() {
                 return;
             }
 
+            if ("printJobChanged" == data.action){
+                self.applyPrintJobChange(data.printJobChange);
+                return;
+            }
+
             if ("printFinished" == data.action){
-                self.printJobHistoryTableHelper.reloadItems();
+                // the table is already updated by the "printJobChanged" messages
                 if (data.printJobItem != null){
                     self.printJobToShowAfterStartup = data.printJobItem;
                     self.showPrintJobDetailsDialogAction(data.printJobItem, true);
@@ -992,6 +997,7 @@ $(function() {
                 // handle response
                 totalItemCount = responseData["totalItemCount"];
                 allPrintJobs = responseData["allPrintJobs"];
+                self.printJobHistoryTableHelper.lastChangeId = responseData["lastChangeId"];
                 var dataRows = ko.utils.arrayMap(allPrintJobs, function (data) {
                     return new PrintJobItem(data);
                 });
@@ -1005,6 +1011,45 @@ $(function() {
             });
         }
 
+        // apply a pushed printjob change to the table, missed changes (e.g. after a reconnect) are loaded from the server
+        self.applyPrintJobChange = function(printJobChange){
+            var tableHelper = self.printJobHistoryTableHelper;
+            if (tableHelper.lastChangeId == null){
+                // table not loaded yet
+                return;
+            }
+            if ("reload" == printJobChange.changeType){
+                tableHelper.reloadItems();
+                return;
+            }
+            if (printJobChange.previousChangeId == tableHelper.lastChangeId){
+                if (self._applyPrintJobChangeToTable(printJobChange) == false){
+                    tableHelper.reloadItems();
+                    return;
+                }
+                tableHelper.lastChangeId = printJobChange.changeId;
+                return;
+            }
+            self.apiClient.callLoadPrintJobChanges(tableHelper.lastChangeId, function(responseData){
+                var isReloadNeeded = responseData.fullReload;
+                ko.utils.arrayForEach(responseData.changes, function(change){
+                    if (isReloadNeeded == false && self._applyPrintJobChangeToTable(change) == false){
+                        isReloadNeeded = true;
+                    }
+                });
+                if (isReloadNeeded){
+                    tableHelper.reloadItems();
+                    return;
+                }
+                tableHelper.lastChangeId = responseData.lastChangeId;
+            });
+        }
+
+        self._applyPrintJobChangeToTable = function(printJobChange){
+            var newItem = printJobChange.printJobItem != null ? new PrintJobItem(printJobChange.printJobItem) : null;
+            return self.printJobHistoryTableHelper.applyItemChange(printJobChange.changeType, printJobChange.databaseId, newItem);
+        }
+
         self.printJobHistoryTableHelper = new PrintJobTableItemHelper(
             loadJobFunction,
             DEFAULT_TABLE_PAGE_SIZE,
@@ -35,8 +35,12 @@
     self.queryStartDate = ko.observable(null);
     self.queryEndDate = ko.observable(null);
     self.searchQuery = ko.observable("")
+    // sorting before the search switched to "searchRank", restored when the search is cleared
+    self.sortBeforeSearch = null;
 
     self.isInitialLoadDone = false;
+    // changeId of the loaded items, see applyItemChange
+    self.lastChangeId = null;
 
     self.selectAll = function(checkedValue){
         if (checkedValue == false){
@@ -117,6 +121,54 @@
     }
 
 
+    // delta of a single item (insert/update/delete by an other client or the capture), without reloading the page
+    // return: false, if the change could not be applied and the items must be reloaded
+    self.applyItemChange = function(changeType, databaseId, newItem){
+        var currentItem = ko.utils.arrayFirst(self.items(), function(item) {
+            return item.databaseId() == databaseId;
+        });
+        var isUnfiltered = self.selectedFilterName() == "all" &&
+                           (self.queryStartDate() == null || self.queryStartDate() == "") &&
+                           (self.queryEndDate() == null || self.queryEndDate() == "") &&
+                           (self.searchQuery() == null || self.searchQuery() == "");
+
+        if ("delete" == changeType){
+            if (currentItem == null){
+                // not on this page, but maybe on a previous page (page boundaries) and/or part of the total count
+                return false;
+            }
+            self.items.remove(currentItem);
+            self.selectedTableItems.remove(currentItem);
+            self.currentItemCount(self.items().length);
+            self.totalItemCount(Math.max(self.totalItemCount() - 1, 0));
+            return true;
+        }
+        if (currentItem != null){
+            // only at the same position, otherwise the printjob could be on an other page or not part of the filter anymore
+            var sortColumn = self.sortColumn();
+            if (isUnfiltered && newItem != null && ko.unwrap(currentItem[sortColumn]) == ko.unwrap(newItem[sortColumn])){
+                self.items.replace(currentItem, newItem);
+                return true;
+            }
+            return false;
+        }
+        if ("update" == changeType){
+            // not on this page, but could match the filter now
+            return isUnfiltered;
+        }
+        // insert, only the first page of the newest printjobs is updated in place
+        if (isUnfiltered && self.currentPage() == 0 && self.sortColumn() == "printStartDateTime" && self.sortOrder() == "desc"){
+            self.items.unshift(newItem);
+            if (self.items().length > self.pageSize()){
+                self.items.pop();
+            }
+            self.currentItemCount(self.items().length);
+            self.totalItemCount(self.totalItemCount() + 1);
+            return true;
+        }
+        return false;
+    }
+
     self.toggleIsInBackground = (setIsInBackground) => {
         if (setIsInBackground === isInBackground) {
             return;
@@ -148,7 +200,11 @@
     });
     // ############################################## SORTING
     self.changeSortOrder = function(newSortColumn){
-        if (newSortColumn == self.sortColumn()){
+        if ("searchRank" == newSortColumn){
+            // best matches first, no toggle
+            self.sortColumn(newSortColumn);
+            self.sortOrder("desc");
+        } else if (newSortColumn == self.sortColumn()){
             // toggle
             if ("desc" == self.sortOrder()){
                 self.sortOrder("asc");
@@ -164,6 +220,9 @@
     }
 
     self.sortOrderLabel = function(sortColumn){
+        if ("searchRank" == sortColumn){
+            return sortColumn == self.sortColumn() ? "(best matches first)" : "";
+        }
         if (sortColumn == self.sortColumn()){
             // toggle
             if ("desc" == self.sortOrder()){
@@ -175,6 +234,33 @@
         return "";
     }
 
+    self.isSearchActive = function(){
+        return self.searchQuery() != null && self.searchQuery().trim() != "";
+    }
+
+    // sort by relevance while searching, back to the previous sorting if the search is cleared
+    // (subscribed before the reload of the view model, so the next load already uses the new sorting)
+    self.searchQuery.subscribe(function(newValue){
+        if (self.isSearchActive()){
+            if ("searchRank" != self.sortColumn() && self.sortBeforeSearch == null){
+                self.sortBeforeSearch = [self.sortColumn(), self.sortOrder()];
+                self.sortColumn("searchRank");
+                self.sortOrder("desc");
+            }
+        } else {
+            if ("searchRank" == self.sortColumn()){
+                if (self.sortBeforeSearch != null){
+                    self.sortColumn(self.sortBeforeSearch[0]);
+                    self.sortOrder(self.sortBeforeSearch[1]);
+                } else {
+                    self.sortColumn(defaultSortColumn);
+                    self.sortOrder("desc");
+                }
+            }
+            self.sortBeforeSearch = null;
+        }
+    });
+
     // ############################################## FILTERING
     self.changeFilter = function(newFilterName) {
         self.selectedFilterName(newFilterName)
@@ -0,0 +1,66 @@
+import time
+import unittest
+
+from octoprint_PrintJobHistory.common.ChangeFeed import ChangeFeed
+
+
+class TestChangeFeed(unittest.TestCase):
+
+	def setUp(self):
+		self.changeFeed = ChangeFeed(3)
+
+	def _changeTypesAndIds(self, allChanges):
+		return [(change["changeType"], change["databaseId"]) for change in allChanges]
+
+	def test_getChangesSince(self):
+		firstChangeId = self.changeFeed.getLastChangeId()
+		self.assertEqual([], self.changeFeed.getChangesSince(firstChangeId))
+
+		self.changeFeed.addChange(ChangeFeed.CHANGE_TYPE_INSERT, 1)
+		secondChange = self.changeFeed.addChange(ChangeFeed.CHANGE_TYPE_UPDATE, 1)
+		self.assertEqual([(ChangeFeed.CHANGE_TYPE_INSERT, 1), (ChangeFeed.CHANGE_TYPE_UPDATE, 1)],
+						 self._changeTypesAndIds(self.changeFeed.getChangesSince(firstChangeId)))
+		self.assertEqual([], self.changeFeed.getChangesSince(secondChange["changeId"]))
+		self.assertEqual(secondChange["changeId"], self.changeFeed.getLastChangeId())
+
+	# the client has missed changes that are not in the log anymore
+	def test_getChangesSinceTooOld(self):
+		firstChangeId = self.changeFeed.getLastChangeId()
+		for databaseId in range(1, 4):
+			self.changeFeed.addChange(ChangeFeed.CHANGE_TYPE_INSERT, databaseId)
+		# all 3 changes are still in the log
+		self.assertEqual(3, len(self.changeFeed.getChangesSince(firstChangeId)))
+
+		fourthChange = self.changeFeed.addChange(ChangeFeed.CHANGE_TYPE_DELETE, 2)
+		# change 1 is dropped, the gap between the client and the oldest change means reload
+		self.assertIsNone(self.changeFeed.getChangesSince(firstChangeId))
+		self.assertEqual([(ChangeFeed.CHANGE_TYPE_DELETE, 2)],
+						 self._changeTypesAndIds(self.changeFeed.getChangesSince(fourthChange["previousChangeId"])))
+
+	def test_getChangesSinceReload(self):
+		firstChangeId = self.changeFeed.getLastChangeId()
+		self.changeFeed.addChange(ChangeFeed.CHANGE_TYPE_INSERT, 1)
+		reloadChange = self.changeFeed.addChange(ChangeFeed.CHANGE_TYPE_RELOAD)
+		self.assertIsNone(self.changeFeed.getChangesSince(firstChangeId))
+		# after the reload the client continues with the changeId of the reload
+		self.assertEqual([], self.changeFeed.getChangesSince(reloadChange["changeId"]))
+
+	# a changeId from before a restart (other instance) or an unknown/future changeId
+	def test_getChangesSinceRestart(self):
+		changeIdBeforeRestart = self.changeFeed.getLastChangeId()
+		self.changeFeed.addChange(ChangeFeed.CHANGE_TYPE_INSERT, 1)
+		# different instanceId (milliseconds since epoch)
+		time.sleep(0.002)
+		restartedChangeFeed = ChangeFeed(3)
+		self.assertIsNone(restartedChangeFeed.getChangesSince(changeIdBeforeRestart))
+		self.assertIsNone(restartedChangeFeed.getChangesSince(self.changeFeed.getLastChangeId()))
+
+		instanceId = self.changeFeed.getLastChangeId().split("-")[0]
+		self.assertIsNone(self.changeFeed.getChangesSince(instanceId + "-99"))
+		self.assertIsNone(self.changeFeed.getChangesSince(None))
+		self.assertIsNone(self.changeFeed.getChangesSince("no-changeId"))
+		self.assertIsNone(self.changeFeed.getChangesSince("1234"))
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -1,18 +1,33 @@
+import datetime
 import pprint
+import shutil
+import tempfile
+import threading
+import time
 import unittest
 
 import peewee
 
 from octoprint_PrintJobHistory import DatabaseManager, CostModel
+from octoprint_PrintJobHistory.DatabaseManager import CURRENT_DATABASE_SCHEME_VERSION
 from octoprint_PrintJobHistory.api import TransformPrintJob2JSON, TransformSlicerSettings2JSON
 from octoprint_PrintJobHistory.common import StringUtils
 from octoprint_PrintJobHistory.common import CSVExportImporter
+from octoprint_PrintJobHistory.common.ChangeFeed import ChangeFeed
 import logging
 
 from octoprint_PrintJobHistory.models.PrintJobModel import PrintJobModel
 from octoprint_PrintJobHistory.models.FilamentModel import FilamentModel
+from octoprint_PrintJobHistory.models.TemperatureModel import TemperatureModel
+from octoprint_PrintJobHistory.models.PluginMetaDataModel import PluginMetaDataModel
+from octoprint_PrintJobHistory.models.SlicerSettingModel import SlicerSettingModel
 from octoprint_PrintJobHistory.services.SlicerSettingsService import SlicerSettingsService
 
+# PrusaSlicer "; key = value" and Cura-like ";   key,value"
+SLICER_SETTINGS_TEXT = "; layer_height = 0.2\n; infill = 20%\n;   perimeters,3\n"
+SLICER_SETTINGS_EXPRESSION_ASSIGNMENT = ";(.*)=(.*)"
+SLICER_SETTINGS_EXPRESSION_LIST = ";   (.*),(.*)"
+
 
 class TestDatabase(unittest.TestCase):
 
@@ -30,6 +45,7 @@ class TestDatabase(unittest.TestCase):
 		testLogger = logging.getLogger("testLogger")
 		logging.info("Start Database-Test")
 		self.databaseManager = DatabaseManager(testLogger, True)
+		self.databaseManager.setSlicerSettingsExpressions(";(.*)=(.*)\n;   (.*),(.*)")
 		self.databaseManager.initDatabase(self.databaselocation, self._clientOutput)
 
 	# TimeFrameSelection
@@ -120,6 +136,20 @@ class TestDatabase(unittest.TestCase):
 		print(compoareResultAsJson)
 		pass
 
+	# key-values of the slicer settings table vs. parsing the settings text
+	def _test_slicerSettingTable(self):
+		selectedDatabaseIds = "102, 97"
+		self.assertTrue(self.databaseManager.isSlicerSettingTableUpToDate())
+		selectedSlicerSettings = self.databaseManager.loadSelectedSlicerSettings(selectedDatabaseIds, ";(.*)=(.*)\n;   (.*),(.*)")
+
+		slicerService = SlicerSettingsService(logging.getLogger("testLogger"))
+		slicerService._parseSlicerExpressions(";(.*)=(.*)\n;   (.*),(.*)")
+		allJobsModels = self.databaseManager.loadSelectedPrintJobs(selectedDatabaseIds)
+		for job, selectedSlicerSetting in zip(allJobsModels, selectedSlicerSettings):
+			keyValueSettings = slicerService.parseKeyValues(job.slicerSettingsAsText, set())
+			self.assertEqual(job.databaseId, selectedSlicerSetting["databaseId"])
+			self.assertEqual(keyValueSettings, selectedSlicerSetting["keyValues"])
+
 	def _test_deletePrinjob(self):
 		self.databaseManager.deletePrintJob(105)
 
@@ -212,6 +242,481 @@ class TestDatabase(unittest.TestCase):
 
 		print("ende")
 
+# Tests with an own temporary database, independent of the local OctoPrint database
+class TestDatabaseWithTempFolder(unittest.TestCase):
+
+	def setUp(self):
+		logging.basicConfig(level=logging.DEBUG)
+		self.databaselocation = tempfile.mkdtemp()
+		self.databaseManager = DatabaseManager(logging.getLogger("testLogger"), False)
+		self.databaseManager.initDatabase(self.databaselocation, lambda message1, message2: None)
+
+	def tearDown(self):
+		self.databaseManager._database.close_all()
+		shutil.rmtree(self.databaselocation)
+
+	# printStartDateTime None e.g. CSV import with "-"
+	def _insertPrintJob(self, fileName, printStartDateTime):
+		printJobModel = PrintJobModel()
+		printJobModel.fileName = fileName
+		printJobModel.printStartDateTime = printStartDateTime
+		printJobModel.printStatusResult = "success"
+		return self.databaseManager.insertPrintJob(printJobModel)
+
+	def _insertPrintJobsWithNullStart(self):
+		firstStartDateTime = datetime.datetime(2021, 3, 1, 10, 0)
+		for index in range(12):
+			if (index % 3 == 1):
+				self._insertPrintJob(None, None)
+			else:
+				# two printjobs with the same start
+				self._insertPrintJob("Benchy" + str(index) + ".gcode", firstStartDateTime + datetime.timedelta(hours=index // 2))
+
+	def _loadAllPagesByCursor(self, sortColumn, sortOrder, pageSize):
+		tableQuery = {
+			"to": pageSize,
+			"sortColumn": sortColumn,
+			"sortOrder": sortOrder,
+			"filterName": "all",
+			"cursor": ""
+		}
+		allDatabaseIds = []
+		while True:
+			printJobModels, nextCursor = self.databaseManager.loadPrintJobsByCursor(tableQuery)
+			allDatabaseIds += [printJobModel.databaseId for printJobModel in printJobModels]
+			if (nextCursor == None):
+				break
+			tableQuery["cursor"] = nextCursor
+		return allDatabaseIds
+
+	# PostgreSQL sorts NULLs the other way round than SQLite, so the order must be explicit (same as the seek predicate)
+	def test_loadPrintJobsByCursorNullOrderingForPostgres(self):
+		postgresDatabase = peewee.PostgresqlDatabase("printJobHistory")
+		with postgresDatabase.bind_ctx([PrintJobModel]):
+			for sortColumn in ["printStartDateTime", "fileName"]:
+				for sortOrder, expectedNullOrdering in [("desc", "NULLS LAST"), ("asc", "NULLS FIRST")]:
+					for lastSortValue in [None, "2021-03-01 10:00:00"]:
+						tableQuery = {
+							"to": 5,
+							"sortColumn": sortColumn,
+							"sortOrder": sortOrder,
+							"filterName": "all",
+							"cursor": self.databaseManager._encodeCursor(sortColumn, sortOrder, lastSortValue, 7)
+						}
+						cursorQuery = self.databaseManager._buildPrintJobsCursorQuery(tableQuery)[0]
+						querySql = cursorQuery.sql()[0]
+						self.assertIn(expectedNullOrdering, querySql, sortColumn + " " + sortOrder)
+
+	# the external database is shared with the other printers, it must never be dropped
+	def test_reCreateDatabaseNotForExternalDatabase(self):
+		localDatabase = self.databaseManager._database
+		self.databaseManager._database = peewee.PostgresqlDatabase("printJobHistory")
+		try:
+			self.assertTrue(self.databaseManager.isExternalDatabase())
+			self.assertFalse(self.databaseManager.reCreateDatabase())
+			self.assertFalse(self.databaseManager._database.is_connection_usable())
+		finally:
+			self.databaseManager._database = localDatabase
+		self.assertTrue(self.databaseManager.reCreateDatabase())
+
+	# other instances (printers) with the same external database, simulated with the SQLite database
+	def test_checkExternalChangesOfOtherInstance(self):
+		self.databaseManager.isExternalDatabase = lambda: True
+		self.databaseManager._externalChangeCounter = 0
+		resultCache = self.databaseManager.getResultCache()
+		changeFeed = self.databaseManager.getChangeFeed()
+		cacheKey = ("loadPrintJobHistoryByQuery", ())
+
+		# own change: in the change feed, no reload
+		lastChangeId = changeFeed.getLastChangeId()
+		databaseId = self._insertPrintJob("Benchy.gcode", datetime.datetime(2021, 3, 1, 10, 0))
+		self.databaseManager.checkExternalChanges()
+		allChanges = changeFeed.getChangesSince(lastChangeId)
+		self.assertEqual([(ChangeFeed.CHANGE_TYPE_INSERT, databaseId)], [(change["changeType"], change["databaseId"]) for change in allChanges])
+
+		# change of an other instance (same write transaction): result cache invalidated and the table must be reloaded
+		resultCache.get(cacheKey, lambda: "before")
+		eTag = resultCache.buildETag(cacheKey)
+		lastChangeId = changeFeed.getLastChangeId()
+		with self.databaseManager._databaseConnection():
+			with self.databaseManager._database.atomic():
+				self.assertEqual(2, self.databaseManager._incrementExternalChangeCounter())
+		self.assertEqual(eTag, resultCache.buildETag(cacheKey))
+		self.databaseManager.checkExternalChanges()
+		self.assertNotEqual(eTag, resultCache.buildETag(cacheKey))
+		self.assertEqual("after", resultCache.get(cacheKey, lambda: "after"))
+		self.assertIsNone(changeFeed.getChangesSince(lastChangeId))
+
+		# only once
+		lastChangeId = changeFeed.getLastChangeId()
+		self.databaseManager.checkExternalChanges()
+		self.assertEqual([], changeFeed.getChangesSince(lastChangeId))
+		self.assertEqual("after", resultCache.get(cacheKey, lambda: "again"))
+
+	# key-values of the slicer settings table of the printjobs (by databaseId)
+	def _loadSlicerSettingKeyValues(self, databaseIds, slicerSettingsExpressions):
+		selectedSlicerSettings = self.databaseManager.loadSelectedSlicerSettings(",".join(str(databaseId) for databaseId in databaseIds), slicerSettingsExpressions)
+		if (selectedSlicerSettings == None):
+			return None
+		return dict((selectedSlicerSetting["databaseId"], selectedSlicerSetting["keyValues"]) for selectedSlicerSetting in selectedSlicerSettings)
+
+	def _insertPrintJobWithSlicerSettings(self, fileName, slicerSettingsAsText):
+		printJobModel = PrintJobModel()
+		printJobModel.fileName = fileName
+		printJobModel.printStartDateTime = datetime.datetime(2021, 3, 1, 10, 0)
+		printJobModel.printStatusResult = "success"
+		printJobModel.slicerSettingsAsText = slicerSettingsAsText
+		return self.databaseManager.insertPrintJob(printJobModel)
+
+	def _reopenDatabase(self, slicerSettingsExpressions):
+		self.databaseManager._database.close_all()
+		self.databaseManager = DatabaseManager(logging.getLogger("testLogger"), False)
+		self.databaseManager.setSlicerSettingsExpressions(slicerSettingsExpressions)
+		self.databaseManager.initDatabase(self.databaselocation, lambda message1, message2: None)
+
+	# the slicer settings table is created and filled with the key-values of the existing printjobs
+	def test_upgradeFrom11To12SlicerSettingTable(self):
+		self._reopenDatabase(SLICER_SETTINGS_EXPRESSION_ASSIGNMENT)
+		databaseIds = [self._insertPrintJobWithSlicerSettings("Benchy" + str(index) + ".gcode", SLICER_SETTINGS_TEXT.replace("0.2", "0." + str(index)))
+					   for index in range(1, 4)]
+		databaseIds.append(self._insertPrintJobWithSlicerSettings("NoSettings.gcode", None))
+		# back to scheme V11
+		with self.databaseManager._databaseConnection():
+			self.databaseManager._database.drop_tables([SlicerSettingModel])
+			PluginMetaDataModel.delete().where(PluginMetaDataModel.key == PluginMetaDataModel.KEY_SLICER_SETTINGS_EXPRESSIONS_HASH).execute()
+			PluginMetaDataModel.update(value="11").where(PluginMetaDataModel.key == PluginMetaDataModel.KEY_DATABASE_SCHEME_VERSION).execute()
+
+		self._reopenDatabase(SLICER_SETTINGS_EXPRESSION_ASSIGNMENT)
+		with self.databaseManager._databaseConnection():
+			schemeVersion = PluginMetaDataModel.get(PluginMetaDataModel.key == PluginMetaDataModel.KEY_DATABASE_SCHEME_VERSION).value
+		self.assertEqual(str(CURRENT_DATABASE_SCHEME_VERSION), schemeVersion)
+		self.assertTrue(self.databaseManager.isSlicerSettingTableUpToDate())
+		self.assertEqual({
+			databaseIds[0]: {"layer_height": "0.1", "infill": "20%"},
+			databaseIds[1]: {"layer_height": "0.2", "infill": "20%"},
+			databaseIds[2]: {"layer_height": "0.3", "infill": "20%"},
+			databaseIds[3]: {}
+		}, self._loadSlicerSettingKeyValues(databaseIds, SLICER_SETTINGS_EXPRESSION_ASSIGNMENT))
+
+	def test_slicerSettingRowsOnInsertUpdateDelete(self):
+		self._reopenDatabase(SLICER_SETTINGS_EXPRESSION_ASSIGNMENT)
+		databaseId = self._insertPrintJobWithSlicerSettings("Benchy.gcode", SLICER_SETTINGS_TEXT)
+		otherDatabaseId = self._insertPrintJobWithSlicerSettings("Other.gcode", SLICER_SETTINGS_TEXT)
+		self.assertEqual({"layer_height": "0.2", "infill": "20%"}, self._loadSlicerSettingKeyValues([databaseId], SLICER_SETTINGS_EXPRESSION_ASSIGNMENT)[databaseId])
+
+		# changed settings text: rows replaced
+		printJobModel = self.databaseManager.loadPrintJob(databaseId)
+		printJobModel.slicerSettingsAsText = "; layer_height = 0.3\n"
+		self.databaseManager.updatePrintJob(printJobModel)
+		self.assertEqual({"layer_height": "0.3"}, self._loadSlicerSettingKeyValues([databaseId], SLICER_SETTINGS_EXPRESSION_ASSIGNMENT)[databaseId])
+		# other fields changed: rows unchanged
+		printJobModel = self.databaseManager.loadPrintJob(databaseId)
+		printJobModel.noteText = "changed"
+		self.databaseManager.updatePrintJob(printJobModel)
+		self.assertEqual({"layer_height": "0.3"}, self._loadSlicerSettingKeyValues([databaseId], SLICER_SETTINGS_EXPRESSION_ASSIGNMENT)[databaseId])
+
+		self.databaseManager.deletePrintJob(databaseId)
+		with self.databaseManager._databaseConnection():
+			self.assertEqual([otherDatabaseId], [slicerSettingRow.printJob_id for slicerSettingRow in SlicerSettingModel.select().group_by(SlicerSettingModel.printJob)])
+		self.assertEqual({otherDatabaseId: {"layer_height": "0.2", "infill": "20%"}},
+						 self._loadSlicerSettingKeyValues([databaseId, otherDatabaseId], SLICER_SETTINGS_EXPRESSION_ASSIGNMENT))
+
+	# new expressions: not up to date (the compare parses the settings text) until the rebuild is done
+	def test_rebuildSlicerSettingsAfterExpressionsChange(self):
+		self._reopenDatabase(SLICER_SETTINGS_EXPRESSION_ASSIGNMENT)
+		databaseIds = [self._insertPrintJobWithSlicerSettings("Benchy" + str(index) + ".gcode", SLICER_SETTINGS_TEXT) for index in range(5)]
+
+		self.databaseManager.setSlicerSettingsExpressions(SLICER_SETTINGS_EXPRESSION_LIST)
+		self.assertFalse(self.databaseManager.isSlicerSettingTableUpToDate())
+		self.assertIsNone(self._loadSlicerSettingKeyValues(databaseIds, SLICER_SETTINGS_EXPRESSION_LIST))
+
+		# several saves of the settings, the rebuilds are serialized
+		rebuildThreads = [threading.Thread(target=self.databaseManager.rebuildSlicerSettings, args=(2,)) for index in range(3)]
+		for rebuildThread in rebuildThreads:
+			rebuildThread.start()
+		for rebuildThread in rebuildThreads:
+			rebuildThread.join()
+		self.assertTrue(self.databaseManager.isSlicerSettingTableUpToDate())
+		self.assertIsNone(self._loadSlicerSettingKeyValues(databaseIds, SLICER_SETTINGS_EXPRESSION_ASSIGNMENT))
+		self.assertEqual(dict((databaseId, {"perimeters": "3"}) for databaseId in databaseIds),
+						 self._loadSlicerSettingKeyValues(databaseIds, SLICER_SETTINGS_EXPRESSION_LIST))
+		with self.databaseManager._databaseConnection():
+			self.assertEqual(len(databaseIds), SlicerSettingModel.select().count())
+
+		# still up to date after a restart
+		self._reopenDatabase(SLICER_SETTINGS_EXPRESSION_LIST)
+		self.assertTrue(self.databaseManager.isSlicerSettingTableUpToDate())
+
+	# the relations of a loaded printjob are used after the connection is given back to the pool (e.g. in the API),
+	# no lazy query may take a connection outside of withDatabaseConnection
+	def test_loadPrintJobRelationsWithoutConnection(self):
+		self.databaseManager._database.close_all()
+		self.databaseManager = DatabaseManager(logging.getLogger("testLogger"), False, {"maxConnections": 3, "busyTimeout": 1})
+		self.databaseManager.initDatabase(self.databaselocation, lambda message1, message2: None)
+		self._insertPrintJobsWithRelations(2)
+
+		errors = []
+		def loadRelations():
+			try:
+				for printJobModel in [self.databaseManager.loadPrintJob(1)] + self.databaseManager.loadSelectedPrintJobs("1,2"):
+					self.assertEqual(2, len(printJobModel.getFilamentModels()))
+					self.assertEqual(1, len(printJobModel.getTemperatureModels()))
+					self.assertEqual(1.5, printJobModel.getCosts().totalCosts)
+			except Exception as e:
+				errors.append(e)
+		for index in range(5):
+			loadThread = threading.Thread(target=loadRelations)
+			loadThread.start()
+			loadThread.join()
+		self.assertEqual([], errors)
+		self.assertEqual(0, len(self.databaseManager._database._in_use))
+
+		# new printjob (e.g. capture, CSV import) without any query
+		printJobModel = PrintJobModel()
+		filamentModel = FilamentModel()
+		filamentModel.toolId = "total"
+		printJobModel.addFilamentModel(filamentModel)
+		self.assertEqual(1, len(printJobModel.getFilamentModels()))
+		self.assertEqual([], printJobModel.getTemperatureModels())
+		self.assertIsNone(printJobModel.getCosts())
+
+	def _insertPrintJobsWithRelations(self, printJobCount):
+		firstStartDateTime = datetime.datetime(2021, 3, 1, 10, 0)
+		for index in range(printJobCount):
+			printJobModel = PrintJobModel()
+			printJobModel.fileName = "Benchy" + str(index) + ".gcode"
+			printJobModel.fileOrigin = "local"
+			printJobModel.filePathName = "folder/Benchy" + str(index) + ".gcode"
+			printJobModel.printStartDateTime = firstStartDateTime + datetime.timedelta(hours=index)
+			printJobModel.printEndDateTime = printJobModel.printStartDateTime + datetime.timedelta(minutes=30)
+			printJobModel.duration = 1800
+			printJobModel.printStatusResult = "success"
+			for toolId in ["total", "tool0"]:
+				filamentModel = FilamentModel()
+				filamentModel.toolId = toolId
+				filamentModel.material = "PLA"
+				filamentModel.spoolName = "Spool" + str(index % 3)
+				filamentModel.usedLength = 1000.0 + index
+				filamentModel.usedWeight = 3.0
+				printJobModel.addFilamentModel(filamentModel)
+			temperatureModel = TemperatureModel()
+			temperatureModel.sensorName = "bed"
+			temperatureModel.sensorValue = "60"
+			printJobModel.addTemperatureModel(temperatureModel)
+			costModel = CostModel()
+			costModel.totalCosts = 1.5
+			costModel.filamentCost = 1.5
+			printJobModel.setCosts(costModel)
+			self.databaseManager.insertPrintJob(printJobModel)
+
+	# Micro-benchmark: table page via models (prefetch) vs. plain rows
+	def test_transformBenchmark(self):
+		self._insertPrintJobsWithRelations(100)
+		tableQuery = {
+			"from": 0,
+			"to": 100,
+			"sortColumn": "printStartDateTime",
+			"sortOrder": "desc",
+			"filterName": "all",
+			"startDate": "",
+			"endDate": "",
+		}
+		class FileManager(object):
+			def path_on_disk(self, origin, path):
+				return self.databaselocation + "/" + path
+		fileManager = FileManager()
+		fileManager.databaselocation = self.databaselocation
+		loops = 10
+
+		startTime = time.perf_counter()
+		for i in range(loops):
+			allJobsModels = self.databaseManager.loadPrintJobsByQuery(tableQuery)
+			modelsAsList = TransformPrintJob2JSON.transformAllPrintJobModels(allJobsModels, fileManager)
+		modelsDuration = (time.perf_counter() - startTime) / loops
+
+		startTime = time.perf_counter()
+		for i in range(loops):
+			allJobRows = self.databaseManager.loadPrintJobsByQuery(tableQuery, asDicts=True)
+			rowsAsList = TransformPrintJob2JSON.transformAllPrintJobRows(allJobRows, fileManager)
+		rowsDuration = (time.perf_counter() - startTime) / loops
+
+		print("models: {:.2f}ms/page  rows: {:.2f}ms/page".format(modelsDuration * 1000, rowsDuration * 1000))
+		self.assertEqual(modelsAsList, rowsAsList)
+
+	# Statements per capture: insert + load + update (before) vs. one insert incl. the technical log
+	def test_captureWriteCount(self):
+		self._insertPrintJobsWithRelations(1)
+		executedStatements = []
+		database = self.databaseManager._database
+		originalExecuteSql = database.execute_sql
+		def countingExecuteSql(sql, params=None, *args, **kwargs):
+			executedStatements.append(sql)
+			return originalExecuteSql(sql, params, *args, **kwargs)
+		database.execute_sql = countingExecuteSql
+
+		try:
+			printJobModel = self.databaseManager.loadPrintJob(1)
+
+			del executedStatements[:]
+			databaseId = self._insertPrintJobCopy(printJobModel, None)
+			reloadedPrintJobModel = self.databaseManager.loadPrintJob(databaseId)
+			reloadedPrintJobModel.technicalLog = "technical log"
+			self.databaseManager.updatePrintJob(reloadedPrintJobModel)
+			twoWritesStatements = list(executedStatements)
+
+			del executedStatements[:]
+			self._insertPrintJobCopy(printJobModel, "technical log")
+			oneWriteStatements = list(executedStatements)
+		finally:
+			database.execute_sql = originalExecuteSql
+
+		writeCounts = []
+		printJobWriteCounts = []
+		for name, statements in [("insert+load+update", twoWritesStatements), ("insert", oneWriteStatements)]:
+			writeStatements = [sql for sql in statements if sql.lstrip().upper().startswith("SELECT") == False]
+			printJobWriteStatements = [sql for sql in writeStatements if '"pjh_printjobmodel" (' in sql or 'UPDATE "pjh_printjobmodel"' in sql]
+			writeCounts.append(len(writeStatements))
+			printJobWriteCounts.append(len(printJobWriteStatements))
+			print("{}: {} statements, {} writes".format(name, len(statements), len(writeStatements)))
+		# the printjob row is only inserted, not inserted and updated (incl. the relations and the statistic rollup)
+		self.assertEqual([2, 1], printJobWriteCounts)
+		self.assertLess(writeCounts[1], writeCounts[0])
+
+	def _insertPrintJobCopy(self, printJobModel, technicalLog):
+		newPrintJobModel = PrintJobModel()
+		newPrintJobModel.__data__.update(printJobModel.__data__)
+		newPrintJobModel.databaseId = None
+		newPrintJobModel.technicalLog = technicalLog
+		for filamentModel in printJobModel.getFilamentModels():
+			newFilamentModel = FilamentModel()
+			newFilamentModel.__data__.update(filamentModel.__data__)
+			newFilamentModel.databaseId = None
+			newPrintJobModel.addFilamentModel(newFilamentModel)
+		return self.databaseManager.insertPrintJob(newPrintJobModel)
+
+	# a search-query without any letter/digit matches nothing (not all printjobs)
+	def test_searchQueryWithoutWords(self):
+		self._insertPrintJobsWithRelations(3)
+		tableQuery = {
+			"from": 0,
+			"to": 25,
+			"sortColumn": "printStartDateTime",
+			"sortOrder": "desc",
+			"filterName": "all",
+			"startDate": "",
+			"endDate": "",
+			"searchQuery": "benchy1"
+		}
+		self.assertEqual(1, self.databaseManager.countPrintJobsByQuery(tableQuery))
+		for searchQuery in ["-", "*", '" -- ()', ":"]:
+			tableQuery["searchQuery"] = searchQuery
+			self.assertEqual(0, self.databaseManager.countPrintJobsByQuery(tableQuery), searchQuery)
+			self.assertEqual([], self.databaseManager.loadPrintJobsByQuery(tableQuery), searchQuery)
+			self.assertEqual(0, self.databaseManager.calculatePrintJobsStatisticByQuery(tableQuery)["printJobCount"], searchQuery)
+		# no search
+		for searchQuery in ["", "  "]:
+			tableQuery["searchQuery"] = searchQuery
+			self.assertEqual(3, self.databaseManager.countPrintJobsByQuery(tableQuery))
+
+	# the statistic rollup is updated with each change, same values as calculated from the printjobs
+	def test_statisticRollupEqualsPrintJobsStatistic(self):
+		self._insertPrintJobsWithRelations(5)
+		failedPrintJobModel = self.databaseManager.loadAllPrintJobs()[0]
+		failedPrintJobModel.printStatusResult = "failed"
+		self.databaseManager.updatePrintJob(failedPrintJobModel)
+
+		# - insert
+		self._insertPrintJobCopy(self.databaseManager.loadAllPrintJobs()[1], None)
+		self._assertStatisticRollupEqualsPrintJobsStatistic("insert")
+
+		# - start-date change, to an other day
+		printJobModel = self.databaseManager.loadAllPrintJobs()[2]
+		printJobModel.printStartDateTime = datetime.datetime(2021, 3, 3, 12, 0)
+		printJobModel.printEndDateTime = printJobModel.printStartDateTime + datetime.timedelta(minutes=30)
+		self.databaseManager.updatePrintJob(printJobModel)
+		self._assertStatisticRollupEqualsPrintJobsStatistic("start-date change")
+		otherDayQuery = {"filterName": "all", "startDate": "02.03.2021", "endDate": "05.03.2021", "searchQuery": ""}
+		self.assertEqual(1, self.databaseManager.calculatePrintJobsStatisticByQuery(otherDayQuery)["printJobCount"])
+
+		# - delete
+		self.databaseManager.deletePrintJob(printJobModel.databaseId)
+		self._assertStatisticRollupEqualsPrintJobsStatistic("delete")
+
+	def _assertStatisticRollupEqualsPrintJobsStatistic(self, changeName):
+		for filterName in ["all", "onlySuccess", "onlyFailed"]:
+			for startDate, endDate in [("", ""), ("01.03.2021", "01.03.2021"), ("02.03.2021", "05.03.2021")]:
+				tableQuery = {
+					"filterName": filterName,
+					"startDate": startDate,
+					"endDate": endDate,
+					"searchQuery": ""
+				}
+				with self.databaseManager._databaseConnection():
+					self.assertTrue(self.databaseManager._isStatisticRollupQuery(tableQuery))
+					rollupValues = self.databaseManager._calculateStatisticValuesFromRollup(tableQuery)
+					printJobsValues = self.databaseManager._calculateStatisticValuesFromPrintJobs(tableQuery)
+				self.assertEqual(printJobsValues, rollupValues, "{}, {}, {} - {}".format(changeName, filterName, startDate, endDate))
+
+	# "searchRank" (sent by the table while searching): best matches first, not the newest
+	def test_searchQuerySortedByRank(self):
+		if (self.databaseManager._fullTextSearchAvailable == False):
+			self.skipTest("SQLite FTS5 not available")
+		self._insertPrintJobsWithRelations(3)
+		allPrintJobModels = self.databaseManager.loadAllPrintJobs()
+		for printJobModel, noteText in zip(sorted(allPrintJobModels, key=lambda printJobModel: printJobModel.printStartDateTime), ["cube cube cube", None, "cube"]):
+			printJobModel.noteText = noteText
+			self.databaseManager.updatePrintJob(printJobModel)
+		tableQuery = {
+			"from": 0,
+			"to": 25,
+			"sortColumn": "searchRank",
+			"sortOrder": "desc",
+			"filterName": "all",
+			"startDate": "",
+			"endDate": "",
+			"searchQuery": "cube"
+		}
+		self.assertEqual(["Benchy0.gcode", "Benchy2.gcode"], [printJobModel.fileName for printJobModel in self.databaseManager.loadPrintJobsByQuery(tableQuery)])
+		self.assertEqual(2, self.databaseManager.countPrintJobsByQuery(tableQuery))
+		tableQuery["sortColumn"] = "printStartDateTime"
+		self.assertEqual(["Benchy2.gcode", "Benchy0.gcode"], [printJobModel.fileName for printJobModel in self.databaseManager.loadPrintJobsByQuery(tableQuery)])
+		# no search: newest first
+		tableQuery["sortColumn"] = "searchRank"
+		tableQuery["searchQuery"] = ""
+		self.assertEqual(["Benchy2.gcode", "Benchy1.gcode", "Benchy0.gcode"], [printJobModel.fileName for printJobModel in self.databaseManager.loadPrintJobsByQuery(tableQuery)])
+
+	# each printjob exactly once, also if the printjobs without start are in more than one chunk
+	def test_iterateAllPrintJobsWithNullStart(self):
+		self._insertPrintJobsWithNullStart()
+		with self.databaseManager._databaseConnection():
+			allDatabaseIds = [printJobModel.databaseId for printJobModel in PrintJobModel.select()]
+		for chunkSize in [1, 2, 5, 500]:
+			iteratedDatabaseIds = [printJobModel.databaseId for printJobModel in self.databaseManager.iterateAllPrintJobs(chunkSize)]
+			self.assertEqual(sorted(allDatabaseIds), sorted(iteratedDatabaseIds), "chunkSize " + str(chunkSize))
+			# the printjobs without start at the end
+			self.assertEqual([None] * 4, [self.databaseManager.loadPrintJob(databaseId).printStartDateTime for databaseId in iteratedDatabaseIds[-4:]])
+
+		csvContent = b"".join(CSVExportImporter.transform2CSV(self.databaseManager.iterateAllPrintJobs(5))).decode("utf-8")
+		# header + printjobs
+		self.assertEqual(1 + 12, len(csvContent.splitlines()))
+
+	# same order as one query without paging
+	def test_loadPrintJobsByCursorWithNullValues(self):
+		self._insertPrintJobsWithNullStart()
+		for sortColumn, sortKey in [("printStartDateTime", PrintJobModel.printStartDateTime), ("fileName", peewee.fn.Lower(PrintJobModel.fileName))]:
+			for sortOrder in ["desc", "asc"]:
+				if (sortOrder == "desc"):
+					expectedQuery = PrintJobModel.select().order_by(sortKey.desc(), PrintJobModel.databaseId.desc())
+				else:
+					expectedQuery = PrintJobModel.select().order_by(sortKey, PrintJobModel.databaseId)
+				with self.databaseManager._databaseConnection():
+					expectedDatabaseIds = [printJobModel.databaseId for printJobModel in expectedQuery]
+				self.assertEqual(12, len(expectedDatabaseIds))
+				for pageSize in [1, 2, 5, 100]:
+					self.assertEqual(expectedDatabaseIds, self._loadAllPagesByCursor(sortColumn, sortOrder, pageSize),
+									 sortColumn + " " + sortOrder + " pageSize " + str(pageSize))
+
+
 if __name__ == '__main__':
 	print("Start DatabaseManager Test")
 	unittest.main()
@@ -1,9 +1,17 @@
 # -*- encoding: utf-8 -*-
 
+import glob
 import logging
+import lzma
+import os
+import shutil
+import tempfile
+import time
 
 from octoprint_PrintJobHistory.common import StringUtils
-from octoprint_PrintJobHistory.common.SlicerSettingsParser import SlicerSettingsParser
+from octoprint_PrintJobHistory.common.SlicerSettingsParser import SlicerSettingsParser, getSlicerSettingsMatcher
+from octoprint_PrintJobHistory.common.SlicerSettingsCache import SlicerSettingsCache
+from octoprint_PrintJobHistory.services.SlicerSettingsService import SlicerSettingsService
 
 
 def test_parseSettings():
@@ -34,6 +42,127 @@ def test_slicerexpresions():
 	settingsParser = SlicerSettingsParser(testLogger)
 	settingsParser._parseSlicerExpressions(";(.*)=(.*)\n;   (.*),(.*)")
 
+def test_slicerSettingsMatcher():
+	testLogger = logging.getLogger("testLogger")
+	slicerSettingsMatcher = getSlicerSettingsMatcher(";(.*)=(.*)\n;   (.*),(.*)", testLogger)
+	assert slicerSettingsMatcher is getSlicerSettingsMatcher(";(.*)=(.*)\n;   (.*),(.*)", testLogger)
+
+	assert ("layer_height", "0.2") == slicerSettingsMatcher.matchKeyValue("; layer_height = 0.2")
+	assert ("bottom_layers", "4") == slicerSettingsMatcher.matchKeyValue(";   bottom_layers,4")
+	# first expression wins
+	assert ("extruder", "1,2") == slicerSettingsMatcher.matchKeyValue("; extruder = 1,2")
+	# pre-filter, no separator
+	assert None == slicerSettingsMatcher.matchKeyValue(";TYPE:External perimeter")
+
+	settingsAsText = "; layer_height = 0.2\r\n;   bottom_layers,4\n;LAYER:1\n; extruder = 1,2\n"
+	allKeyValues = list(slicerSettingsMatcher.matchAllKeyValues(settingsAsText))
+	assert [("layer_height", "0.2"), ("bottom_layers", "4"), ("extruder", "1,2")] == allKeyValues
+	# not combinable (back reference) -> one expression after the other
+	slicerSettingsMatcher = getSlicerSettingsMatcher(";(\\w)(\\w*)\\1=.*", testLogger)
+	assert ("a", "b") == slicerSettingsMatcher.matchKeyValue(";aba=1")
+
+# Benchmark: reverse reading of the complete file (block-based) vs. reading all lines forward
+def test_reverseReadingBenchmark():
+	testLogger = logging.getLogger("testLogger")
+	settingsParser = SlicerSettingsParser(testLogger)
+
+	tempFolder = tempfile.mkdtemp()
+	try:
+		for compressedGcode in glob.glob("../../testdata/gcode/*.gcode.xz"):
+			gcodeForParsing = os.path.join(tempFolder, os.path.basename(compressedGcode)[:-len(".xz")])
+			with lzma.open(compressedGcode, "rb") as compressedFile, open(gcodeForParsing, "wb") as gcodeFile:
+				shutil.copyfileobj(compressedFile, gcodeFile)
+
+			with open(gcodeForParsing, "rb") as fileHandle:
+				startTime = time.perf_counter()
+				reversedLines = list(settingsParser._readReversedLines(fileHandle, 0))
+				reverseDuration = time.perf_counter() - startTime
+
+				fileHandle.seek(0)
+				startTime = time.perf_counter()
+				forwardLines = fileHandle.readlines()
+				forwardDuration = time.perf_counter() - startTime
+			assert forwardLines[::-1] == reversedLines
+
+			startTime = time.perf_counter()
+			slicerSettings = settingsParser.extractSlicerSettings(gcodeForParsing, ";(.*)=(.*)")
+			parseDuration = time.perf_counter() - startTime
+			assert len(slicerSettings.settingsAsDict) > 0
+
+			print("{}: reverse {:.1f}ms, forward {:.1f}ms, extractSlicerSettings {:.1f}ms".format(
+				os.path.basename(gcodeForParsing), reverseDuration * 1000, forwardDuration * 1000, parseDuration * 1000))
+	finally:
+		shutil.rmtree(tempFolder)
+
+def test_slicerSettingsCache():
+	testLogger = logging.getLogger("testLogger")
+	slicerSettingsCache = SlicerSettingsCache(testLogger)
+	slicerSettingsCache.start()
+
+	tempFolder = tempfile.mkdtemp()
+	try:
+		gcodeForParsing = os.path.join(tempFolder, "CURA_schieberdeckel2.gcode")
+		shutil.copyfile("../../testdata/slicer-settings/CURA_schieberdeckel2.gcode", gcodeForParsing)
+
+		# parsed in the background, e.g. after the upload
+		slicerSettingsCache.addFolder(tempFolder, ";(.*)=(.*)")
+		slicerSettingsCache.waitUntilDone()
+		slicerSettings = slicerSettingsCache.getSlicerSettings(gcodeForParsing, ";(.*)=(.*)")
+		assert 4 == len(slicerSettings.settingsAsDict)
+		assert slicerSettings is slicerSettingsCache.getSlicerSettings(gcodeForParsing, ";(.*)=(.*)")
+
+		# changed file -> parsed again
+		with open(gcodeForParsing, "a") as gcodeFile:
+			gcodeFile.write(";added_key = 1\n")
+		slicerSettings = slicerSettingsCache.getSlicerSettings(gcodeForParsing, ";(.*)=(.*)")
+		assert "added_key" in slicerSettings.settingsAsDict
+	finally:
+		shutil.rmtree(tempFolder)
+
+# Benchmark: compare of 20 jobs with the complete Prusa profile, each job with other values
+def test_compareSlicerSettingsBenchmark():
+	testLogger = logging.getLogger("testLogger")
+	gcodeForParsing="../../testdata/slicer-settings/PRUSA_Treefrog_0.2mm_FLEX_MK3S_1h5m.gcode"
+	slicerSettings = SlicerSettingsParser(testLogger).extractSlicerSettings(gcodeForParsing, ";(.*)=(.*)")
+	settingsLines = slicerSettings.settingsAsText.split("\n")
+
+	def buildJobList():
+		slicerSettingsJobList = []
+		for jobIndex in range(20):
+			slicerSettingsJob = SlicerSettingsService.SlicerSettingsJob()
+			slicerSettingsJob.databaseId = jobIndex
+			slicerSettingsJob.fileName = "job" + str(jobIndex) + ".gcode"
+			# job 0 is the reference, every other job has one changed value and one missing key
+			jobLines = list(settingsLines)
+			if (jobIndex > 0):
+				jobLines[jobIndex] = jobLines[jobIndex] + "1"
+				jobLines[jobIndex + 100] = ""
+			slicerSettingsJob.slicerSettingsAsText = "\n".join(jobLines)
+			slicerSettingsJobList.append(slicerSettingsJob)
+		return slicerSettingsJobList
+
+	slicerService = SlicerSettingsService(testLogger)
+	startTime = time.perf_counter()
+	compareResult = slicerService.compareSlicerSettings(buildJobList(), ";(.*)=(.*)")
+	compareDuration = time.perf_counter() - startTime
+	assert 244 == compareResult.totalKeyCount == len(compareResult.allKeys)
+	assert compareResult.allKeys == sorted(compareResult.allKeys)
+	firstJob = compareResult.slicerSettingsJobList[0]
+	assert "isDifferent" not in firstJob.keyValuesSettings[compareResult.allKeys[0]]
+	allDifferentValues = [keyValue["isDifferent"] for slicerSettingsJob in compareResult.slicerSettingsJobList[1:] for keyValue in slicerSettingsJob.keyValuesSettings.values()]
+	assert 19 == allDifferentValues.count("yes")
+	assert 19 == allDifferentValues.count("notPresent")
+
+	startTime = time.perf_counter()
+	differentCompareResult = slicerService.compareSlicerSettings(buildJobList(), ";(.*)=(.*)", onlyDifferentKeys=True, keyFrom=0, keyTo=10)
+	differentCompareDuration = time.perf_counter() - startTime
+	assert 38 == differentCompareResult.totalKeyCount == differentCompareResult.differentKeyCount
+	assert 10 == len(differentCompareResult.allKeys)
+	for slicerSettingsJob in differentCompareResult.slicerSettingsJobList:
+		assert sorted(slicerSettingsJob.keyValuesSettings.keys()) == differentCompareResult.allKeys
+
+	print("compare all keys {:.1f}ms, only different keys (page) {:.1f}ms".format(compareDuration * 1000, differentCompareDuration * 1000))
+
 if __name__ == '__main__':
 	print("Start SlicerSettingsParser Test")
 	# test_parseSettings()
@@ -39,7 +39,6 @@ plugin_requires = [
 	"pillow",
 	"peewee"
 ]
-# "psycopg2-binary" # postgresdriver
 ### --------------------------------------------------------------------------------------------------------------------
 ### More advanced options that you usually shouldn't have to touch follow after this point
 ### --------------------------------------------------------------------------------------------------------------------
@@ -64,7 +63,8 @@ plugin_ignored_packages = []
 # Example:
 #     plugin_requires = ["someDependency==dev"]
 #     additional_setup_parameters = {"dependency_links": ["https://github.com/someUser/someRepo/archive/master.zip#egg=someDependency-dev"]}
-additional_setup_parameters = {}
+# - "postgres": driver for the external PostgreSQL database, e.g. pip install "OctoPrint-PrintJobHistory[postgres]"
+additional_setup_parameters = {"extras_require": {"postgres": ["psycopg2-binary"]}}
 
 ########################################################################################################################
 